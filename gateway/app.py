@@ -47,6 +47,20 @@ def _shutdown_db():
         except Exception:
             pass
 
+
+@app.on_event("startup")
+async def _startup_model_registry():
+    from gateway.model_registry import registry
+    registry.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown_provider_client():
+    from gateway import provider_client
+    from gateway.model_registry import registry
+    await registry.stop()
+    await provider_client.aclose()
+
 # CORS for dev
 origins = [o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",") if o.strip()]
 app.add_middleware(
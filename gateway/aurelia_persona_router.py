@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException, Request
-import os, json, pathlib, urllib.request, re, time
+from fastapi.responses import StreamingResponse
+import asyncio, os, json, pathlib, re, time
+
+from gateway.provider_client import auth_headers, post_json, stream_lines
 
 # Use the seedai_storage APIs for memory and conversation persistence
 try:
@@ -7,13 +10,18 @@ try:
         process_model_output,
         save_memory_entry,
         append_message,
+        conversation_window,
+        run_write,
     )
 except Exception:
     process_model_output = None
+    conversation_window = None
     def save_memory_entry(entry, source='aurelia', verbatim=False):
         return entry
     def append_message(conversation_id, role, text):
         return None
+    async def run_write(fn, *args, **kwargs):
+        return fn(*args, **kwargs)
 
 # memory store compatibility shim (uses gateway.memory_store which delegates to seedai_storage)
 try:
@@ -28,18 +36,21 @@ except Exception:
 try:
     from gateway.core_memory_handler import persist_conversation, strip_core_blocks as _strip_core_blocks
 except Exception:
-    def persist_conversation(conversation_id, conversation_obj):
+    def persist_conversation(conversation_id, conversation_obj, roles=None):
         return conversation_obj
     def _strip_core_blocks(text):
         return text
 
 # Import bootstrap loader
 try:
-    from gateway.memory_bootstrap import load_bootstrap_messages
+    from gateway.memory_bootstrap import pack_context, read_text_cached
 except Exception:
-    # fallback: define a noop loader
-    def load_bootstrap_messages():
-        return []
+    # fallback: persona + history only
+    def pack_context(history=None, persona=None, budgets=None):
+        return ([{"role": "system", "content": persona}] if persona else []) + list(history or [])
+    def read_text_cached(path):
+        p = pathlib.Path(path)
+        return p.read_text(encoding="utf-8") if p.exists() else ""
 
 router = APIRouter()
 
@@ -48,35 +59,218 @@ OLLAMA_BASE = os.environ.get("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
 OLLAMA_API_KEY = os.environ.get("OLLAMA_API_KEY", "ollama")
 DEFAULT_MODEL = os.environ.get("AURELIA_DEFAULT_MODEL", "llama3.2-vision:11b")
 PERSONA_PATH = os.environ.get("AURELIA_PERSONA_PATH", "seedai/persona_aurelia.md")
+# send older turns of the client-sent thread as a stored rolling summary
+SERVER_HISTORY = os.environ.get("AURELIA_SERVER_HISTORY", "true").lower() in ("1", "true", "yes")
 
 def _load_persona() -> str:
-    p = pathlib.Path(PERSONA_PATH)
-    if p.exists():
-        try:
-            return p.read_text(encoding="utf-8").strip()
-        except Exception:
-            pass
+    try:
+        text = read_text_cached(PERSONA_PATH).strip()
+        if text:
+            return text
+    except Exception:
+        pass
     return "You are Aurelia, the SeedAI assistant. Be warm, concise, and helpful."
 
 # Load persona text at import-time is fragile if the file is edited while the
-# server is running. We will call `_load_persona()` per-request so changes are
-# picked up immediately without restarting the backend.
-
-def _post_json(url: str, payload: dict, timeout: int = 60) -> dict:
-    body = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        url,
-        data=body,
-        headers={"Content-Type": "application/json", "Authorization": f"Bearer {OLLAMA_API_KEY}"},
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=timeout) as r:
-        text = r.read().decode("utf-8", errors="ignore")
+# server is running. We call `_load_persona()` per-request; the read is cached
+# on the file's mtime/size so changes are still picked up without a restart.
+
+
+_CORE_START = "CORE_MEMORY_UPDATE"
+_CORE_END = "END_CORE_MEMORY_UPDATE"
+# matched on the original text: str.upper() can change its length ("ß" -> "SS")
+_CORE_START_RE = re.compile(re.escape(_CORE_START), re.IGNORECASE)
+_CORE_END_RE = re.compile(re.escape(_CORE_END), re.IGNORECASE)
+# text appended to a reply whose upstream stream failed part-way
+_INCOMPLETE_NOTE = "\n\n[incomplete: upstream error]"
+# ... or whose client went away before it was finished
+_DISCONNECTED_NOTE = "\n\n[incomplete: client disconnected]"
+
+
+class _CoreBlockFilter:
+    """Incrementally hide CORE_MEMORY_UPDATE ... END_CORE_MEMORY_UPDATE blocks.
+
+    `feed()` returns the text that is safe to show so far; a marker split
+    across chunks is held back until it can be decided. The full raw text is
+    kept in `raw` for persistence once the stream ends.
+    """
+
+    def __init__(self):
+        self.raw = []
+        self._buf = ""
+        self._in_block = False
+
+    @staticmethod
+    def _held_prefix(text: str, marker: str) -> int:
+        # length of the longest suffix of text that starts the marker
+        for n in range(min(len(marker) - 1, len(text)), 0, -1):
+            if re.fullmatch(re.escape(marker[:n]), text[-n:], re.IGNORECASE):
+                return n
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        self.raw.append(chunk)
+        self._buf += chunk
+        out = []
+        while True:
+            if self._in_block:
+                m = _CORE_END_RE.search(self._buf)
+                if not m:
+                    break
+                self._buf = self._buf[m.end():]
+                self._in_block = False
+                continue
+            m = _CORE_START_RE.search(self._buf)
+            if not m:
+                keep = self._held_prefix(self._buf, _CORE_START)
+                out.append(self._buf[:len(self._buf) - keep])
+                self._buf = self._buf[len(self._buf) - keep:]
+                break
+            out.append(self._buf[:m.start()])
+            self._buf = self._buf[m.start():]
+            self._in_block = True
+        return "".join(out)
+
+    def finish(self) -> str:
+        # an unterminated block is not a memory update; show it as-is
+        rest, self._buf, self._in_block = self._buf, "", False
+        return rest
+
+    @property
+    def text(self) -> str:
+        return "".join(self.raw)
+
+
+def _sse(obj) -> bytes:
+    return f"data: {json.dumps(obj, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def _build_messages(messages: list) -> list:
+    # Persona first (loaded per request so edits take effect immediately), then
+    # core memory and digest, then the conversation, each within its token budget
+    try:
+        return pack_context(messages, persona=_load_persona())
+    except Exception:
+        return [{"role": "system", "content": _load_persona()}] + messages
+
+
+async def _persist_assistant(conv_id: str, assistant_text: str):
+    """Save any CORE_MEMORY_UPDATE block and the assistant message.
+
+    Returns (sanitized_text, parsed_core).
+    """
+    parsed = None
+    # Detect CORE_MEMORY_UPDATE JSON block and persist to core memory (server-only log)
+    try:
+        if process_model_output:
+            print(f"[Aurelia][chat] calling process_model_output for conv={conv_id}")
+            _, parsed = await run_write(process_model_output, conv_id, assistant_text, source="aurelia")
+            print(f"[Aurelia][chat] process_model_output parsed={bool(parsed)}")
+            # process_model_output already appended assistant message and saved memory
+        else:
+            # fallback: try to parse core JSON and save
+            from gateway.core_memory_handler import extract_core_json as _ext, append_memory_file as _app
+            parsed = _ext(assistant_text)
+            if parsed:
+                await run_write(_app, parsed, source="aurelia")
+            print("[Aurelia][chat] fallback parsed and saved")
+    except Exception:
+        pass
+
+    # Strip the CORE_MEMORY_UPDATE block from the assistant-visible text
+    try:
+        sanitized = _strip_core_blocks(assistant_text)
+    except Exception:
+        sanitized = assistant_text
+
+    # If process_model_output handled appending assistant message, we're done.
+    # Otherwise, persist assistant message to conversation store.
+    try:
+        if not process_model_output and conv_id:
+            assistant_msg = {'role': 'assistant', 'content': sanitized, 'timestamp': int(time.time())}
+            try:
+                from gateway.core_memory_handler import persist_conversation as _persist
+
+                await run_write(_persist, conv_id, {'messages': [assistant_msg]})
+                print(f"[Aurelia][chat] persisted assistant message to conv {conv_id} via core_memory_handler")
+            except Exception:
+                await run_write(append_message, conv_id, 'assistant', sanitized)
+                print(f"[Aurelia][chat] appended assistant message to conv {conv_id} via seedai_storage.append_message")
+    except Exception:
+        pass
+    return sanitized, parsed
+
+
+async def _stream_chat(url: str, payload: dict, conv_id: str):
+    """Relay upstream SSE chunks, hiding core blocks; persist when done.
+
+    If the upstream fails, nothing is stored when no text was generated, and
+    partial text is stored with _INCOMPLETE_NOTE so it is not read back as a
+    finished turn; a client disconnect stores it with _DISCONNECTED_NOTE.
+    """
+    filt = _CoreBlockFilter()
+    last = None
+    persisted = False
+    failed = False
+
+    def _chunk(text, src=None):
+        out = dict(src or {"object": "chat.completion.chunk"})
+        out["choices"] = [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+        return out
+
+    try:
         try:
-            return json.loads(text)
-        except Exception:
-            print("[Aurelia][_post_json] non-json response")
-            return {"text": text}
+            async for line in stream_lines(url, payload, headers=auth_headers(OLLAMA_API_KEY), timeout=300):
+                if not line.startswith("data:"):
+                    continue
+                body = line[5:].strip()
+                if body == "[DONE]":
+                    break
+                try:
+                    obj = json.loads(body)
+                except Exception:
+                    continue
+                last = obj
+                choices = obj.get("choices") or []
+                delta = (choices[0].get("delta") or {}) if choices else {}
+                content = delta.get("content")
+                if not content:
+                    # role / finish_reason chunks pass through untouched
+                    yield _sse(obj)
+                    continue
+                visible = filt.feed(content)
+                if visible:
+                    delta["content"] = visible
+                    yield _sse(obj)
+        except Exception as e:
+            failed = True
+            yield _sse({"error": {"message": f"Ollama forward error: {e}"}})
+
+        tail = filt.finish()
+        if tail:
+            yield _sse(_chunk(tail, last))
+
+        persisted = True
+        server = {"conversation_id": conv_id}
+        parsed = None
+        if not failed:
+            _, parsed = await _persist_assistant(conv_id, filt.text)
+        elif filt.text.strip():
+            await _persist_assistant(conv_id, filt.text + _INCOMPLETE_NOTE)
+            server["incomplete"] = True
+        else:
+            print(f"[Aurelia][chat] upstream failed before any text; nothing stored for conv {conv_id}")
+        if parsed:
+            server["_memory_saved"] = {"keys": list(parsed.keys())}
+            yield _sse(_chunk("\n\n[system: memory saved]", last))
+        yield _sse({"object": "chat.completion.chunk", "choices": [], "_server": server})
+        yield b"data: [DONE]\n\n"
+    finally:
+        if not persisted and filt.text.strip():
+            # client went away mid-stream: keep what was generated, marked
+            # as unfinished
+            asyncio.ensure_future(_persist_assistant(conv_id, filt.text + _DISCONNECTED_NOTE))
+
 
 @router.post("/api/chat")
 async def chat_with_persona(req: Request):
@@ -93,57 +287,61 @@ async def chat_with_persona(req: Request):
 
     model = data.get("model") or DEFAULT_MODEL
     messages = data.get("messages") or []
+    stream = bool(data.get("stream"))
 
-    # Build bootstrap messages: persona system message, then core memory, then digest
-    bootstrap = []
-    try:
-        bootstrap = load_bootstrap_messages() or []
-    except Exception:
-        bootstrap = []
+    # extract conversation id if provided (optional client-supplied id)
+    conv_id = data.get("conversation_id") or data.get("conversationId") or None
+    known_conv = bool(conv_id)
+    # If no conv_id provided, generate one (timestamp-based)
+    if not conv_id:
+        conv_id = str(int(time.time() * 1000))
 
-    # Ensure persona is first: replace or insert persona text as first system message
-    # Load persona file on each request so edits take effect immediately.
-    persona_msg = {"role": "system", "content": _load_persona()}
+    merged = _build_messages(messages)
 
-    # Merge: persona first, then any bootstrap messages that aren't identical
-    merged = [persona_msg]
-    persona_text = _load_persona()
-    for bm in bootstrap:
-        # avoid duplicates with the current persona text
-        if bm.get("content") and bm.get("content") != persona_text:
-            merged.append(bm)
+    # Persist the incoming thread (append to conversation storage). Only the
+    # client's messages, not our bootstrap; assistant replies are stored when
+    # they are generated. Messages already stored are skipped.
+    try:
+        if messages:
+            await run_write(persist_conversation, conv_id, {"messages": messages}, roles=("user", "system", "tool"))
+    except Exception:
+        pass
 
-    messages = merged + messages
+    # For a known conversation, send the last turns of this request's thread
+    # verbatim and older turns as a rolling summary instead of the full thread.
+    # Structured (vision) content is only kept in the request, so skip then.
+    if SERVER_HISTORY and known_conv and conversation_window and all(isinstance(m.get("content"), str) for m in messages):
+        try:
+            window = await run_write(conversation_window, conv_id, messages)
+            if window:
+                system = [m for m in messages if m.get("role") == "system"]
+                merged = _build_messages(system + window)
+        except Exception as e:
+            print(f"[Aurelia][chat] history window unavailable: {e}")
+    messages = merged
     print(f"[Aurelia][chat] merged messages count={len(messages)}; first_system={(messages[0]['content'][:60] + '...') if messages else ''}")
 
     payload = {
         "model": model,
         "messages": messages,
-        "stream": False,
+        "stream": stream,
         "max_tokens": int(data.get("max_tokens", 512)),
         "temperature": float(data.get("temperature", 0.7)),
         "top_p": float(data.get("top_p", 1.0)),
     }
 
-    # extract conversation id if provided (optional client-supplied id)
-    conv_id = data.get("conversation_id") or data.get("conversationId") or None
-    # If no conv_id provided, generate one (timestamp-based)
-    if not conv_id:
-        conv_id = str(int(time.time() * 1000))
-
-    # Persist incoming user messages (append to conversation storage)
-    try:
-        # store incoming user messages (all non-assistant messages)
-        user_msgs = [m for m in messages if m.get("role") != "assistant"]
-        if user_msgs:
-            persist_conversation(conv_id, {"messages": user_msgs})
-    except Exception:
-        pass
+    url = OLLAMA_BASE.rstrip("/") + "/v1/chat/completions"
+    if stream:
+        print(f"[Aurelia][chat] streaming from Ollama {url} with model={payload.get('model')}")
+        return StreamingResponse(
+            _stream_chat(url, payload, conv_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     try:
-        url = OLLAMA_BASE.rstrip("/") + "/v1/chat/completions"
         print(f"[Aurelia][chat] forwarding to Ollama {url} with model={payload.get('model')}")
-        out = _post_json(url, payload)
+        out = await post_json(url, payload, headers=auth_headers(OLLAMA_API_KEY))
         print(f"[Aurelia][chat] received response type={type(out)}")
 
         # Extract assistant content
@@ -161,33 +359,9 @@ async def chat_with_persona(req: Request):
         except Exception:
             assistant_text = str(out)
 
-        # Detect CORE_MEMORY_UPDATE JSON block and persist to core memory (server-only log)
-        try:
-            if process_model_output:
-                print(f"[Aurelia][chat] calling process_model_output for conv={conv_id}")
-                sanitized, parsed = process_model_output(conv_id, assistant_text, source="aurelia")
-                print(f"[Aurelia][chat] process_model_output parsed={bool(parsed)}")
-                # process_model_output already appended assistant message and saved memory
-                if parsed and isinstance(out, dict):
-                    out.setdefault("_server", {})["_memory_saved"] = {"keys": list(parsed.keys())}
-            else:
-                # fallback: try to parse core JSON and save
-                from gateway.core_memory_handler import extract_core_json as _ext, append_memory_file as _app
-                parsed = _ext(assistant_text)
-                if parsed:
-                    _app(parsed, source="aurelia")
-                    if isinstance(out, dict):
-                        out.setdefault("_server", {})["_memory_saved"] = {"keys": list(parsed.keys())}
-                sanitized = assistant_text
-                print("[Aurelia][chat] fallback parsed and saved")
-        except Exception:
-            sanitized = assistant_text
-
-        # Strip the CORE_MEMORY_UPDATE block from the assistant-visible text
-        try:
-            sanitized = _strip_core_blocks(assistant_text)
-        except Exception:
-            sanitized = assistant_text
+        sanitized, parsed = await _persist_assistant(conv_id, assistant_text)
+        if parsed and isinstance(out, dict):
+            out.setdefault("_server", {})["_memory_saved"] = {"keys": list(parsed.keys())}
         # avoid embedding backslash-escaped sequences directly inside f-strings
         preview = sanitized[:120].replace('\n', ' ')
         print(f"[Aurelia][chat] sanitized assistant text preview: {preview}")
@@ -210,25 +384,9 @@ async def chat_with_persona(req: Request):
         except Exception:
             pass
 
-        # If process_model_output handled appending assistant message, we're done.
-        # Otherwise, persist assistant message to conversation store.
-        try:
-            if not process_model_output and conv_id:
-                assistant_msg = {'role': 'assistant', 'content': sanitized, 'timestamp': int(time.time())}
-                try:
-                    from gateway.core_memory_handler import persist_conversation as _persist
-
-                    _persist(conv_id, {'messages': [assistant_msg]})
-                    print(f"[Aurelia][chat] persisted assistant message to conv {conv_id} via core_memory_handler")
-                except Exception:
-                    append_message(conv_id, 'assistant', sanitized)
-                    print(f"[Aurelia][chat] appended assistant message to conv {conv_id} via seedai_storage.append_message")
-
-            # ensure client knows the conversation id and memory save meta
-            if isinstance(out, dict):
-                out.setdefault('_server', {})['conversation_id'] = conv_id
-        except Exception:
-            pass
+        # ensure client knows the conversation id and memory save meta
+        if isinstance(out, dict):
+            out.setdefault('_server', {})['conversation_id'] = conv_id
 
         return out
     except Exception as e:
@@ -4,25 +4,26 @@ Functions:
 - extract_core_json(text: str) -> dict | None
 - strip_core_blocks(text: str) -> str
 - append_memory_file(entry: dict, source="aurelia") -> dict (saved core)
-- persist_conversation(conversation_id: str, conversation_obj: dict) -> dict
-- load_all_conversations() -> dict
+- persist_conversation(conversation_id: str, conversation_obj: dict, roles=None) -> dict
+- iter_conversations() -> iterator of conversation dicts
+- load_all_conversations() -> dict (materialises everything; prefer iter_conversations)
 
 Persistence files (under seedai/memory):
 - core.json (merged core memory) -- via gateway.memory_store.save_core
 - conversations.json (all conversations)
 """
 
-from typing import Optional, Dict, Any
-import json
+from typing import Optional, Dict, Any, Iterator
 from gateway.seedai_storage import (
     extract_core_json as _extract_core_json,
     strip_core_blocks as _strip_core_blocks,
     save_core,
     save_memory_entry,
     load_core,
-    list_conversations,
+    list_conversations_page,
     load_conversation,
     append_message,
+    ingest_messages,
 )
 
 
@@ -52,19 +53,30 @@ def strip_core_blocks(text: str) -> str:
     return _strip_core_blocks(text)
 
 
+def iter_conversations(page_size: int = 200) -> Iterator[Dict[str, Any]]:
+    """Yield stored conversations one at a time, most recently updated first."""
+    cursor = None
+    while True:
+        page = list_conversations_page(limit=page_size, cursor=cursor)
+        for c in page["items"]:
+            yield load_conversation(c["id"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return
+
+
 def load_all_conversations():
-    return {c["id"]: load_conversation(c["id"]) for c in list_conversations()}
+    """Every stored conversation in one dict; kept for old callers, use iter_conversations."""
+    return {c["id"]: c for c in iter_conversations()}
 
 
-def persist_conversation(conversation_id: str, conversation_obj: Dict[str, Any]):
-    # conversation_obj expected to contain {'messages': [...]}
+def persist_conversation(conversation_id: str, conversation_obj: Dict[str, Any], roles=None):
+    # conversation_obj expected to contain {'messages': [...]}; already stored
+    # messages are skipped (see seedai_storage.ingest_messages)
     if not conversation_id:
         import time
 
         conversation_id = str(int(time.time() * 1000))
     msgs = conversation_obj.get("messages", [])
-    for m in msgs:
-        role = m.get("role")
-        text = m.get("content") or m.get("text") or json.dumps(m)
-        append_message(conversation_id, role, text)
-    return load_conversation(conversation_id)
+    inserted = ingest_messages(conversation_id, msgs, roles=roles)
+    return {"id": conversation_id, "inserted": inserted}
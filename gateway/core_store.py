@@ -1,14 +1,52 @@
 # gateway/core_store.py
+"""core.json store: snapshot + append-only merge log.
+
+`merge_into_core` appends one NDJSON line {"ns": ..., "payload": ..., "seq": n}
+to `<core.json>.log` instead of rewriting the whole file, so a write costs
+O(payload). `append_to_core` does the same but extends lists instead of
+replacing them (op "append"), so a growing list such as an event history
+is written one item at a time; `set_core_keys` replaces whole keys (op "set"). Reads replay snapshot + log and are cached in memory per path;
+only log lines appended since the last read are replayed. Once the log
+passes SEEDAI_CORE_LOG_MAX_ENTRIES lines or SEEDAI_CORE_LOG_MAX_BYTES bytes
+it is compacted: the merged state is written to core.json atomically
+(tmp file + os.replace) and the log is truncated.
+
+Crash safety: a torn last log line is ignored on replay. The snapshot stores
+the seq of the last log line folded into it (as "_log_seq"), so after a crash
+between replacing the snapshot and truncating the log those lines are
+skipped instead of being applied twice.
+
+Every reader and writer of a core.json (memory_bootstrap, diagnostics, the
+legacy migration, the memory_store fallback) goes through `load_core` /
+`merge_into_core`; reading the snapshot alone would miss the log.
+
+Env: SEEDAI_CORE_LOG_MAX_ENTRIES (500), SEEDAI_CORE_LOG_MAX_BYTES (1 MiB),
+SEEDAI_CORE_FSYNC (1 = fsync every log append and snapshot).
+"""
 from __future__ import annotations
-import json, re
+import copy, json, os, re, threading
 from pathlib import Path
 from typing import Any, Dict
 
+from gateway import json_stream
+
 CORE_BLOCK_RE = re.compile(
     r"CORE\s+MEMORY\s+UPDATE\s*(\{.*?\})\s*END_CORE_MEMORY_UPDATE",
     re.IGNORECASE | re.DOTALL,
 )
 
+LOG_MAX_ENTRIES = int(os.environ.get("SEEDAI_CORE_LOG_MAX_ENTRIES", "500"))
+LOG_MAX_BYTES = int(os.environ.get("SEEDAI_CORE_LOG_MAX_BYTES", str(1 << 20)))
+FSYNC = os.environ.get("SEEDAI_CORE_FSYNC", "1") not in ("0", "false", "False")
+
+# snapshot key holding the seq of the last log line it contains
+_SEQ_KEY = "_log_seq"
+
+_lock = threading.Lock()
+# resolved core path -> {"data", "snap_sig", "log_offset", "log_entries",
+# "base_seq" (from the snapshot), "seq" (last line applied)}
+_cache: Dict[str, Dict[str, Any]] = {}
+
 def _ensure_parent(p: Path) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
     if not p.exists():
@@ -16,14 +54,33 @@ def _ensure_parent(p: Path) -> None:
 
 def _load_json(p: Path) -> Dict[str, Any]:
     _ensure_parent(p)
-    try:
-        return json.loads(p.read_text(encoding="utf-8") or "{}")
-    except Exception:
-        return {}
+    data = json_stream.load(p, {})
+    return data if isinstance(data, dict) else {}
 
 def _dump_json(p: Path, data: Dict[str, Any]) -> None:
-    _ensure_parent(p)
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        if FSYNC:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, p)
+
+def log_path(p: Path) -> Path:
+    """The merge log next to core.json."""
+    return p.with_name(p.name + ".log")
+
+def exists(core_path: Path) -> bool:
+    """True if there is a snapshot or a merge log for `core_path`."""
+    return core_path.exists() or log_path(core_path).exists()
+
+def _sig(p: Path):
+    try:
+        st = p.stat()
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+    except FileNotFoundError:
+        return None
 
 def deep_merge(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
     for k, v in src.items():
@@ -33,13 +90,135 @@ def deep_merge(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
             dst[k] = v
     return dst
 
-def merge_into_core(core_path: Path, payload: Dict[str, Any], namespace: str = "aurelia") -> Dict[str, Any]:
-    data = _load_json(core_path)
+def deep_append(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
+    """Like deep_merge, but lists in `src` extend the lists already in `dst`."""
+    for k, v in src.items():
+        if isinstance(v, dict) and isinstance(dst.get(k), dict):
+            deep_append(dst[k], v)
+        elif isinstance(v, list) and isinstance(dst.get(k), list):
+            dst[k].extend(v)
+        else:
+            dst[k] = v
+    return dst
+
+def _set_keys(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
+    dst.update(src)
+    return dst
+
+def _apply(data: Dict[str, Any], namespace: str | None, payload: Dict[str, Any], op: str = "merge") -> None:
+    # the cached state must not share objects with the caller's payload
+    payload = copy.deepcopy(payload)
+    merge = {"append": deep_append, "set": _set_keys}.get(op, deep_merge)
+    if namespace is None:
+        merge(data, payload)
+        return
     if namespace not in data or not isinstance(data.get(namespace), dict):
         data[namespace] = {}
-    deep_merge(data[namespace], payload)
-    _dump_json(core_path, data)
-    return data
+    merge(data[namespace], payload)
+
+def _replay(entry: Dict[str, Any], log: Path) -> None:
+    """Apply log lines written after entry["log_offset"] to entry["data"]."""
+    try:
+        size = log.stat().st_size
+    except FileNotFoundError:
+        size = 0
+    if size <= entry["log_offset"]:
+        return
+    with log.open("rb") as f:
+        f.seek(entry["log_offset"])
+        for line in f:
+            if not line.endswith(b"\n"):
+                # torn write (or an append in progress): pick it up next time
+                break
+            entry["log_offset"] += len(line)
+            try:
+                rec = json.loads(line)
+                seq = rec.get("seq")
+                if isinstance(seq, int) and seq <= entry["base_seq"]:
+                    # already folded into the snapshot
+                    continue
+                _apply(entry["data"], rec["ns"], rec["payload"], rec.get("op", "merge"))
+                entry["log_entries"] += 1
+                if isinstance(seq, int):
+                    entry["seq"] = max(entry["seq"], seq)
+            except Exception:
+                continue
+
+def _state(core_path: Path) -> Dict[str, Any]:
+    # caller holds _lock
+    _ensure_parent(core_path)
+    key = str(core_path.resolve())
+    log = log_path(core_path)
+    entry = _cache.get(key)
+    log_size = _sig(log)[0] if log.exists() else 0
+    if entry is None or entry["snap_sig"] != _sig(core_path) or log_size < entry["log_offset"]:
+        # first read, or another writer compacted / replaced the files
+        data = _load_json(core_path)
+        base = data.pop(_SEQ_KEY, 0)
+        base = base if isinstance(base, int) else 0
+        entry = {"data": data, "snap_sig": _sig(core_path), "log_offset": 0, "log_entries": 0, "base_seq": base, "seq": base}
+        _cache[key] = entry
+    _replay(entry, log)
+    return entry
+
+def _append_log(log: Path, record: Dict[str, Any], offset: int) -> None:
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    with log.open("ab") as f:
+        if f.tell() > offset:
+            # an earlier append was torn; start on a fresh line
+            line = b"\n" + line
+        f.write(line)
+        f.flush()
+        if FSYNC:
+            os.fsync(f.fileno())
+
+def _compact(core_path: Path, entry: Dict[str, Any]) -> None:
+    _dump_json(core_path, dict(entry["data"], **{_SEQ_KEY: entry["seq"]}))
+    log = log_path(core_path)
+    with log.open("wb") as f:
+        if FSYNC:
+            os.fsync(f.fileno())
+    entry.update(snap_sig=_sig(core_path), log_offset=0, log_entries=0, base_seq=entry["seq"])
+
+def compact_core(core_path: Path) -> Dict[str, Any]:
+    """Fold the merge log into the core.json snapshot."""
+    with _lock:
+        entry = _state(core_path)
+        _compact(core_path, entry)
+        return copy.deepcopy(entry["data"])
+
+def load_core(core_path: Path) -> Dict[str, Any]:
+    """Current core state (snapshot + log), served from memory when unchanged.
+
+    The result is a deep copy: changing it does not touch the cache.
+    """
+    with _lock:
+        return copy.deepcopy(_state(core_path)["data"])
+
+def _write(core_path: Path, payload: Dict[str, Any], namespace: str | None, op: str) -> Dict[str, Any]:
+    with _lock:
+        entry = _state(core_path)
+        log = log_path(core_path)
+        record = {"ns": namespace, "payload": payload, "seq": entry["seq"] + 1}
+        if op != "merge":
+            record["op"] = op
+        _append_log(log, record, entry["log_offset"])
+        _replay(entry, log)
+        if entry["log_entries"] >= LOG_MAX_ENTRIES or entry["log_offset"] >= LOG_MAX_BYTES:
+            _compact(core_path, entry)
+        return copy.deepcopy(entry["data"])
+
+def merge_into_core(core_path: Path, payload: Dict[str, Any], namespace: str | None = "aurelia") -> Dict[str, Any]:
+    """Deep-merge `payload` into core[namespace] (the top level if None); returns the new state."""
+    return _write(core_path, payload, namespace, "merge")
+
+def append_to_core(core_path: Path, payload: Dict[str, Any], namespace: str | None = "aurelia") -> Dict[str, Any]:
+    """Like merge_into_core, but lists in `payload` are appended to existing lists."""
+    return _write(core_path, payload, namespace, "append")
+
+def set_core_keys(core_path: Path, payload: Dict[str, Any], namespace: str | None = "aurelia") -> Dict[str, Any]:
+    """Replace the keys of `payload` in core[namespace] as a whole (no deep merge)."""
+    return _write(core_path, payload, namespace, "set")
 
 def parse_core_block(text: str) -> Dict[str, Any] | None:
     m = CORE_BLOCK_RE.search(text or "")
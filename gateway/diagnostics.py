@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 from pathlib import Path
 from datetime import datetime
-import json, os
+
+from gateway import core_store
 
 router = APIRouter(prefix="/diag", tags=["diagnostics"])
 
@@ -13,11 +14,9 @@ def _core_path() -> Path:
 
 def _load_core() -> dict:
     p = _core_path()
-    if p.exists():
-        try:
-            return json.loads(p.read_text(encoding="utf-8"))
-        except Exception:
-            pass
+    data = core_store.load_core(p) if core_store.exists(p) else None
+    if data:
+        return data
     return {
         "meta": {
             "version": "1.0",
@@ -40,12 +39,6 @@ def _load_core() -> dict:
         "memory": {"facts": [], "feelings": [], "vocab": [], "imprint": [], "events": []},
     }
 
-def _atomic_write(path: Path, data: dict):
-    tmp = path.with_suffix(".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, path)
-
 @router.get("/health")
 def health():
     return {"status": "ok", "time": datetime.utcnow().isoformat() + "Z"}
@@ -53,14 +46,13 @@ def health():
 @router.post("/memory/test-write")
 def test_write(note: str | None = None):
     core_path = _core_path()
-    data = _load_core()
-    data.setdefault("memory", {}).setdefault("events", [])
     evt = {
         "type": "test-write",
         "ts": datetime.utcnow().isoformat() + "Z",
         "note": note or "hello from /diag/memory/test-write",
     }
-    data["memory"]["events"].append(evt)
-    data.setdefault("meta", {})["last_boot"] = datetime.utcnow().isoformat() + "Z"
-    _atomic_write(core_path, data)
-    return {"ok": True, "wrote": evt, "core_json": str(core_path), "events_count": len(data["memory"]["events"])}
+    if not (core_store.exists(core_path) and core_store.load_core(core_path)):
+        # first write stores the seed document; later ones only log the new event
+        core_store.merge_into_core(core_path, _load_core(), namespace=None)
+    stored = core_store.append_to_core(core_path, {"memory": {"events": [evt]}, "meta": {"last_boot": evt["ts"]}}, namespace=None)
+    return {"ok": True, "wrote": evt, "core_json": str(core_path), "events_count": len(stored["memory"]["events"])}
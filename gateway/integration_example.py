@@ -3,9 +3,10 @@ integration_example.py
 
 Example FastAPI integration showing:
 - init_db() at startup
-- endpoints: /api/conversations, /api/conversations/{id}, /api/memory/summary
+- endpoints: /api/conversations, /api/conversations/{id} (paged with ?limit=&cursor=), /api/memory/summary
 - example message handler wiring (simulate model output handling)
 """
+from typing import Optional
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 import uvicorn
@@ -23,12 +24,23 @@ def startup():
     print("[integration] Memory summary on startup:", summary)
 
 @app.get("/api/conversations")
-def api_list_conversations():
-    return JSONResponse(content=storage.list_conversations())
+def api_list_conversations(limit: Optional[int] = None, cursor: Optional[str] = None):
+    # pass limit/cursor for {"items", "next_cursor"} pages; without them the full list
+    if limit is None and cursor is None:
+        return JSONResponse(content=storage.list_conversations())
+    try:
+        return JSONResponse(content=storage.list_conversations_page(limit=limit or 50, cursor=cursor))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
 
 @app.get("/api/conversations/{conv_id}")
-def api_get_conversation(conv_id: str):
-    return JSONResponse(content=storage.load_conversation(conv_id))
+def api_get_conversation(conv_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    if limit is None and cursor is None:
+        return JSONResponse(content=storage.load_conversation(conv_id))
+    try:
+        return JSONResponse(content=storage.load_conversation_page(conv_id, limit=limit or 100, cursor=cursor))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
 
 @app.get("/api/memory/summary")
 def api_memory_summary():
@@ -0,0 +1,144 @@
+"""json_stream.py
+Incremental reading of large JSON files, shared by the gateway's JSON loaders.
+
+`iter_items(path)` walks the top-level container of a JSON file and yields
+one entry at a time: (key, value) pairs for an object, (index, value) pairs
+for an array. Only the entry being decoded is held in memory, so a
+multi-hundred-MB `conversations.json` can be processed conversation by
+conversation. `load(path, default)` builds the whole value the same way,
+without also holding the raw file text. A UTF-8 BOM is accepted.
+
+Uses the ijson event parser when it is installed (its C backend is much
+faster) and a pure-Python reader built on JSONDecoder.raw_decode otherwise.
+"""
+
+import json
+import os
+from typing import Any, Iterator, Tuple
+
+try:
+    import ijson
+except Exception:
+    ijson = None
+
+CHUNK_SIZE = 1 << 20
+_BOM = b"\xef\xbb\xbf"
+
+_decoder = json.JSONDecoder()
+_WS = " \t\n\r"
+
+
+class _Reader:
+    """Sliding text buffer over a file, refilled on demand."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        # drop the consumed prefix so the buffer stays one entry wide
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos} of buffer")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # most likely cut off at the end of the buffer
+                if self.fill():
+                    continue
+                raise
+            if end == len(self.buf) and self.fill():
+                # a number (or literal) may continue in the next chunk
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_items_ijson(path) -> Iterator[Tuple[Any, Any]]:
+    with open(path, "rb") as f:
+        if f.read(3) != _BOM:
+            f.seek(0)
+        start = f.tell()
+        head = f.read(64).lstrip()
+        f.seek(start)
+        if head.startswith(b"{"):
+            yield from ijson.kvitems(f, "", use_float=True)
+        elif head.startswith(b"["):
+            yield from enumerate(ijson.items(f, "item", use_float=True))
+        else:
+            raise ValueError("top-level JSON value is not an object or array")
+
+
+def iter_items(path, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[Any, Any]]:
+    """Yield the entries of the top-level object or array of a JSON file."""
+    if ijson is not None:
+        yield from _iter_items_ijson(path)
+        return
+    with open(path, "r", encoding="utf-8-sig") as f:
+        r = _Reader(f, chunk_size)
+        start = r.peek()
+        if start not in ("{", "["):
+            raise ValueError("top-level JSON value is not an object or array")
+        r.pos += 1
+        close = "}" if start == "{" else "]"
+        index = 0
+        if r.peek() == close:
+            return
+        while True:
+            if start == "{":
+                key = r.value()
+                r.expect(":")
+            else:
+                key = index
+            yield key, r.value()
+            index += 1
+            ch = r.peek()
+            if ch == close:
+                return
+            r.expect(",")
+
+
+def load(path, default: Any = None) -> Any:
+    """Load a JSON file (object or array) entry by entry.
+
+    Returns `default` if the file is missing, empty or not valid JSON.
+    """
+    try:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return default
+        with open(path, "rb") as f:
+            head = f.read(64)
+        head = head[3:] if head.startswith(_BOM) else head
+        if head.lstrip().startswith(b"["):
+            return [v for _, v in iter_items(path)]
+        return dict(iter_items(path))
+    except Exception:
+        return default
@@ -0,0 +1,229 @@
+"""legacy_migration.py
+Migration engine for the legacy JSON memory folder (used by
+`seedai_storage.migrate_from_json`).
+
+- Files below `STREAM_THRESHOLD` bytes are parsed in parallel in a process
+  pool; larger ones (typically `conversations.json`) are streamed entry by
+  entry with `json_stream.iter_items`, so memory stays flat.
+- Rows are written with `executemany` in transactions of `batch_size` rows.
+- Progress is checkpointed per file in the `migration_checkpoints` table in
+  the same transaction as the rows, so an interrupted migration resumes at
+  the first entry that was not committed. A file whose size or mtime changed
+  since its checkpoint is read again from the start.
+- Inserts are idempotent, so re-reading a file only adds what is new:
+  messages carry the same chained `content_hash` as `ingest_messages`, and
+  other rows are recorded by (file, entry index) in `migration_rows`, so an
+  entry that legitimately repeats another is still imported.
+
+Env: SEEDAI_MIGRATION_WORKERS (process pool size, default CPU count, 0 = parse
+in-process), SEEDAI_MIGRATION_BATCH (rows per transaction, default 5000).
+"""
+
+import json
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from gateway import core_store
+from gateway.json_stream import iter_items
+
+STREAM_THRESHOLD = 32 * 1024 * 1024
+BATCH_SIZE = int(os.environ.get("SEEDAI_MIGRATION_BATCH", "5000"))
+
+# file name -> table kind, in migration order
+LEGACY_FILES = [
+    ("core.json", "core"),
+    ("conversations.json", "conversations"),
+    ("vocab.json", "vocab"),
+    ("emotions.json", "emotions"),
+    ("reflections.json", "reflections"),
+]
+
+
+def _now_ts() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def _file_sig(path: pathlib.Path) -> str:
+    st = path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _entry_rows(kind: str, key: Any, value: Any) -> Any:
+    """Convert one top-level JSON entry into what the writer for `kind` takes."""
+    if kind == "conversations":
+        msgs = value.get("messages", []) if isinstance(value, dict) else []
+        rows = [(m.get("role"), m.get("content") or m.get("text") or "") for m in msgs if isinstance(m, dict)]
+        meta = (value.get("meta") if isinstance(value, dict) else None) or {}
+        title = value.get("title") if isinstance(value, dict) else None
+        return (str(key), title, meta, rows)
+    if kind == "vocab":
+        return (key, json.dumps(value, ensure_ascii=False))
+    if kind == "emotions":
+        return (key, json.dumps(value, ensure_ascii=False))
+    if kind == "reflections":
+        value = value if isinstance(value, dict) else {}
+        return (value.get("title"), value.get("body"))
+    raise ValueError(f"unknown kind {kind}")
+
+
+def parse_file(path: str, kind: str) -> List[Any]:
+    """Process-pool worker: parse a whole (small) legacy file into entries."""
+    return [_entry_rows(kind, k, v) for k, v in iter_items(path)]
+
+
+def _iter_entries(path: pathlib.Path, kind: str, parsed: Optional[List[Any]]) -> Iterator[Any]:
+    if parsed is not None:
+        return iter(parsed)
+    return (_entry_rows(kind, k, v) for k, v in iter_items(path))
+
+
+class _Checkpoints:
+    def __init__(self, conn):
+        self.conn = conn
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_checkpoints (
+            source TEXT PRIMARY KEY,
+            file_sig TEXT,
+            position INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )""")
+        # "<file>:<entry index>" of migrated vocab/emotion/reflection rows
+        conn.execute("CREATE TABLE IF NOT EXISTS migration_rows (key TEXT PRIMARY KEY)")
+        conn.commit()
+
+    def get(self, source: str, sig: str) -> Tuple[int, bool]:
+        row = self.conn.execute("SELECT file_sig, position, done FROM migration_checkpoints WHERE source=?", (source,)).fetchone()
+        if not row or row[0] != sig:
+            return 0, False
+        return row[1], bool(row[2])
+
+    def set(self, source: str, sig: str, position: int, done: bool = False):
+        # part of the caller's transaction
+        self.conn.execute(
+            "INSERT INTO migration_checkpoints (source, file_sig, position, done, updated_at) VALUES (?,?,?,?,?) "
+            "ON CONFLICT(source) DO UPDATE SET file_sig=excluded.file_sig, position=excluded.position, done=excluded.done, updated_at=excluded.updated_at",
+            (source, sig, position, int(done), _now_ts()),
+        )
+
+
+def _new_rows(c, source: str, start: int, batch: List[Any]) -> List[Any]:
+    """Rows of `batch` (entries `start`, `start` + 1, ... of `source`) not
+    migrated before; records their keys."""
+    keyed = {f"{source}:{start + i}": row for i, row in enumerate(batch)}
+    keys = list(keyed)
+    seen = set()
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        c.execute(f"SELECT key FROM migration_rows WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+        seen.update(r[0] for r in c.fetchall())
+    fresh = [k for k in keys if k not in seen]
+    c.executemany("INSERT INTO migration_rows (key) VALUES (?)", [(k,) for k in fresh])
+    return [keyed[k] for k in fresh]
+
+
+def _write_batch(storage, c, kind: str, batch: List[Any], ts: str, source: str, start: int) -> int:
+    if kind == "conversations":
+        inserted = 0
+        for cid, title, meta, rows in batch:
+            hashed, prev = [], ""
+            for role, text in rows:
+                prev = storage._message_hash(prev, role, text)
+                hashed.append((role, text, prev))
+            inserted += storage._insert_messages(c, cid, hashed, ts, title=title, meta=meta)
+        return inserted
+    batch = _new_rows(c, source, start, batch)
+    if kind == "vocab":
+        c.executemany("INSERT INTO vocab (word, meaning_json, ts) VALUES (?,?,?)", [r + (ts,) for r in batch])
+    elif kind == "emotions":
+        c.executemany("INSERT INTO emotions (tag, data_json, ts) VALUES (?,?,?)", [r + (ts,) for r in batch])
+    elif kind == "reflections":
+        c.executemany("INSERT INTO reflections (title, body, ts) VALUES (?,?,?)", [r + (ts,) for r in batch])
+    return len(batch)
+
+
+def migrate(mem_dir: pathlib.Path, batch_size: int = BATCH_SIZE, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Migrate the legacy files found in `mem_dir`; resumable, see module doc."""
+    from gateway import seedai_storage as storage
+
+    conn = storage.get_conn()
+    checkpoints = _Checkpoints(conn)
+    if workers is None:
+        workers = int(os.environ.get("SEEDAI_MIGRATION_WORKERS", str(os.cpu_count() or 1)))
+
+    todo = []
+    report: Dict[str, Any] = {}
+    for fname, kind in LEGACY_FILES:
+        path = mem_dir / fname
+        if not path.exists():
+            continue
+        sig = _file_sig(path)
+        position, done = checkpoints.get(fname, sig)
+        if done:
+            report[fname] = {"status": "already migrated"}
+            continue
+        todo.append((fname, kind, path, sig, position))
+
+    # parse the small files up front, in parallel with each other and with
+    # streaming the large ones (a single JSON document is parsed serially)
+    futures = {}
+    pool = None
+    small = [t for t in todo if t[1] != "core" and t[2].stat().st_size < STREAM_THRESHOLD]
+    if workers > 0 and small and len([t for t in todo if t[1] != "core"]) > 1:
+        try:
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(small)))
+            futures = {t[0]: pool.submit(parse_file, str(t[2]), t[1]) for t in small}
+        except Exception as e:
+            print("[seedai_storage] migration process pool unavailable, parsing in-process:", e)
+
+    try:
+        for fname, kind, path, sig, position in todo:
+            try:
+                if kind == "core":
+                    # snapshot plus any merges still in core.json.log
+                    core = core_store.load_core(path)
+                    storage.save_core(core)
+                    checkpoints.set(fname, sig, 1, done=True)
+                    conn.commit()
+                    report[fname] = {"status": "migrated", "rows": len(core)}
+                    print(f"[seedai_storage] Migrated core.json from {path}")
+                    continue
+                parsed = futures[fname].result() if fname in futures else None
+                entries = _iter_entries(path, kind, parsed)
+                c = conn.cursor()
+                ts = _now_ts()
+                rows = 0
+                index = 0
+                batch: List[Any] = []
+                batch_rows = 0
+                for entry in entries:
+                    index += 1
+                    if index <= position:
+                        # committed by an earlier, interrupted run
+                        continue
+                    batch.append(entry)
+                    batch_rows += len(entry[3]) + 1 if kind == "conversations" else 1
+                    if batch_rows >= batch_size:
+                        rows += _write_batch(storage, c, kind, batch, ts, fname, index - len(batch) + 1)
+                        checkpoints.set(fname, sig, index)
+                        conn.commit()
+                        batch, batch_rows = [], 0
+                if batch:
+                    rows += _write_batch(storage, c, kind, batch, ts, fname, index - len(batch) + 1)
+                checkpoints.set(fname, sig, index, done=True)
+                conn.commit()
+                report[fname] = {"status": "migrated", "rows": rows, "resumed_at": position}
+                print(f"[seedai_storage] Migrated {fname} ({rows} rows)")
+            except Exception as e:
+                conn.rollback()
+                report[fname] = {"status": "failed", "error": str(e)}
+                print(f"[seedai_storage] Failed to migrate {fname}:", e)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    migrated = sum(1 for r in report.values() if r["status"] == "migrated")
+    return {"migrated": migrated, "files": report}
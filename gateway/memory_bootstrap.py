@@ -1,24 +1,55 @@
 """Memory bootstrapper for Aurelia.
 
 Provides `load_bootstrap_messages()` which returns a list of OpenAI-style
-system messages to prepend to chat requests.
+system messages to prepend to chat requests, and `pack_context()` which adds
+the conversation history on top within a token budget.
 
 Behavior:
 - Reads `seedai/persona_aurelia.md` and includes as a system message (if present).
-- Reads `seedai/memory/core.json` and includes a compact JSON summary as a system message.
+- Reads `seedai/memory/core.json` (snapshot plus merge log, via `core_store`)
+  and includes a compact JSON summary as a system message.
 - Reads the last ~2000 characters of `ElysiaDigest/latest/digest.md` (if present)
   and includes it as a 'Recent digest entries' system message.
-- Truncates combined bootstrap content to `AURELIA_BOOTSTRAP_MAX` characters
-  (default 4000), preferring to truncate the digest.
+- Packs persona, core, digest and history into per-section token budgets in
+  one pass; budget a section does not use carries over to the next one, so
+  the history gets whatever the memory sections leave. Token counts come
+  from a pluggable tokenizer (`set_tokenizer`), ~4 chars/token by default.
+- History is capped at 3000 tokens by default (plus what the memory sections
+  leave unused). Leading system messages of the history (client system
+  prompts, the rolling conversation summary) are always kept; only the
+  user/assistant turns after them are trimmed, oldest first.
 - Robust: missing or malformed files are skipped silently.
+- Cached: the assembled messages and their token counts are rebuilt only
+  when the mtime or size of one of the source files changes, so edits still
+  take effect immediately.
+
+Env (token budgets): AURELIA_BUDGET_PERSONA, AURELIA_BUDGET_CORE,
+AURELIA_BUDGET_DIGEST, AURELIA_BUDGET_HISTORY (default 3000). The memory
+sections default to a split of `AURELIA_BOOTSTRAP_MAX` characters (default 4000).
 """
 
 import json
 import os
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Optional, Tuple
+
+from gateway import core_store
 
 DEFAULT_MAX = int(os.environ.get("AURELIA_BOOTSTRAP_MAX", "4000"))
+SECTIONS = ("persona", "core", "digest", "history")
+# share of the bootstrap budget per memory section
+_SECTION_SHARE = {"persona": 0.6, "core": 0.25, "digest": 0.15}
+DEFAULT_HISTORY_TOKENS = 3000
+DIGEST_PREFIX = "Recent digest entries:\n"
+
+_lock = threading.Lock()
+# path -> ((mtime_ns, size), text)
+_file_cache: Dict[str, Tuple[Tuple[int, int], str]] = {}
+# key -> [(section, content, tokens)]
+_bootstrap_cache: Dict[str, Any] = {"key": None, "sections": []}
+# persona text passed in by callers -> token count
+_persona_counts: Dict[str, int] = {}
 
 
 def _read_text(path: Path) -> str:
@@ -28,6 +59,95 @@ def _read_text(path: Path) -> str:
         return ""
 
 
+def _stat_sig(path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def read_text_cached(path) -> str:
+    """Read a text file, re-reading it only when its mtime or size changed."""
+    sig = _stat_sig(path)
+    if sig is None:
+        return ""
+    key = str(path)
+    hit = _file_cache.get(key)
+    if hit and hit[0] == sig:
+        return hit[1]
+    text = _read_text(Path(path))
+    _file_cache[key] = (sig, text)
+    return text
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text on llama/gpt style vocabularies
+    return (len(text) + 3) // 4
+
+
+_count_tokens: Callable[[str], int] = _estimate_tokens
+
+
+def _load_env_tokenizer():
+    # AURELIA_TOKENIZER=tiktoken[:encoding] uses tiktoken when installed
+    spec = os.environ.get("AURELIA_TOKENIZER", "")
+    if not spec.startswith("tiktoken"):
+        return
+    try:
+        import tiktoken
+
+        enc = tiktoken.get_encoding(spec.partition(":")[2] or "cl100k_base")
+        set_tokenizer(lambda text: len(enc.encode(text, disallowed_special=())))
+    except Exception as e:
+        print("[memory_bootstrap] tiktoken unavailable, using estimate:", e)
+
+
+def set_tokenizer(count_fn: Optional[Callable[[str], int]] = None):
+    """Install a token counter `count_fn(text) -> int` (None restores the estimate)."""
+    global _count_tokens
+    with _lock:
+        _count_tokens = count_fn or _estimate_tokens
+        _bootstrap_cache["key"] = None
+        _persona_counts.clear()
+
+
+def count_tokens(content: Any) -> int:
+    """Token count of a message content (plain string or vision-style part list)."""
+    if isinstance(content, str):
+        return _count_tokens(content)
+    if isinstance(content, list):
+        return sum(_count_tokens(p.get("text") or "") for p in content if isinstance(p, dict))
+    return _count_tokens(str(content or ""))
+
+
+def section_budgets() -> Dict[str, int]:
+    """Per-section token budgets from the environment."""
+    bootstrap_tokens = int(os.environ.get("AURELIA_BOOTSTRAP_MAX", DEFAULT_MAX)) // 4
+    budgets = {}
+    for name in SECTIONS:
+        default = DEFAULT_HISTORY_TOKENS if name == "history" else int(bootstrap_tokens * _SECTION_SHARE[name])
+        budgets[name] = int(os.environ.get(f"AURELIA_BUDGET_{name.upper()}", default))
+    return budgets
+
+
+def _truncate(text: str, tokens: int, budget: int, keep_tail: bool = False) -> str:
+    """Cut `text` (worth `tokens`) down to about `budget` tokens."""
+    if budget <= 0:
+        return ""
+    if tokens <= budget:
+        return text
+    # scale by characters, then shave off the rest for non-linear tokenizers
+    n = max(0, len(text) * budget // tokens)
+    while n > 0:
+        cut = text[-n:] if keep_tail else text[:n]
+        t = _count_tokens(cut)
+        if t <= budget:
+            return cut
+        n = n * budget // t
+    return ""
+
+
 def _compact_json_summary(data: dict) -> str:
     """Produce a compact textual summary from core.json suitable for a system message."""
     try:
@@ -52,84 +172,137 @@ def _compact_json_summary(data: dict) -> str:
         return json.dumps(data)
 
 
-def load_bootstrap_messages() -> List[Dict[str, str]]:
-    """Load bootstrap system messages for Aurelia.
+def _source_paths() -> Tuple[Path, Path, Path]:
+    root = Path(__file__).resolve().parents[1]
+    persona_path = Path(os.environ.get("AURELIA_PERSONA_PATH", root / "seedai/persona_aurelia.md"))
+    core_path = root / "seedai" / "memory" / "core.json"
+    digest_path = root / "ElysiaDigest" / "latest" / "digest.md"
+    return persona_path, core_path, digest_path
 
-    Returns a list of dicts like {"role":"system","content":"..."}.
-    This function is idempotent and will silently skip missing/invalid files.
-    Total returned content length will be trimmed to DEFAULT_MAX (env override).
+
+def _bootstrap_sections() -> List[Tuple[str, str, int]]:
+    """Static sections as (section, content, tokens), cached on file stats.
+
+    Per call this costs a few stat() calls unless a source file changed.
     """
-    msgs: List[Dict[str, str]] = []
+    paths = _source_paths()
+    # core merges land in core.json.log until the next compaction
+    key = tuple((str(p), _stat_sig(p)) for p in paths) + (_stat_sig(core_store.log_path(paths[1])),)
+    with _lock:
+        if _bootstrap_cache["key"] != key:
+            _bootstrap_cache["sections"] = [
+                (name, content, _count_tokens(content))
+                for name, content in _read_sections(*paths)
+            ]
+            _bootstrap_cache["key"] = key
+        return _bootstrap_cache["sections"]
 
-    root = Path(__file__).resolve().parents[1]
+
+def _read_sections(persona_path: Path, core_path: Path, digest_path: Path) -> List[Tuple[str, str]]:
+    sections: List[Tuple[str, str]] = []
 
     # 1) persona file
     try:
-        persona_path = Path(os.environ.get("AURELIA_PERSONA_PATH", root / "seedai/persona_aurelia.md"))
-        persona_text = _read_text(persona_path)
+        persona_text = read_text_cached(persona_path)
         if persona_text:
-            msgs.append({"role": "system", "content": persona_text.strip()})
+            sections.append(("persona", persona_text.strip()))
     except Exception:
         pass
 
     # 2) core.json
     try:
-        core_path = root / "seedai" / "memory" / "core.json"
-        if core_path.exists():
-            raw = core_path.read_text(encoding="utf-8")
-            data = json.loads(raw)
+        data = core_store.load_core(core_path) if core_store.exists(core_path) else None
+        if data:
             summary = _compact_json_summary(data)
             if summary:
-                msgs.append({"role": "system", "content": "Core memory summary:\n" + summary})
+                sections.append(("core", "Core memory summary:\n" + summary))
     except Exception:
         pass
 
     # 3) recent digest
     try:
-        digest_path = root / "ElysiaDigest" / "latest" / "digest.md"
-        digest_text = _read_text(digest_path)
+        digest_text = read_text_cached(digest_path)
         if digest_text:
-            # include up to ~2000 chars from the end, but overall cap enforced later
-            tail = digest_text[-2000:]
-            msgs.append({"role": "system", "content": "Recent digest entries:\n" + tail})
+            # include up to ~2000 chars from the end; the token budget is enforced later
+            sections.append(("digest", DIGEST_PREFIX + digest_text[-2000:]))
     except Exception:
         pass
 
-    # Truncate combined messages if necessary, preferring to trim the digest message
-    max_chars = int(os.environ.get("AURELIA_BOOTSTRAP_MAX", DEFAULT_MAX))
-    combined = "\n\n".join(m["content"] for m in msgs)
-    if len(combined) <= max_chars:
-        return msgs
-
-    # Need to trim. Find digest message (last one if present) and truncate it first.
-    for i in range(len(msgs)-1, -1, -1):
-        if msgs[i]["content"].startswith("Recent digest entries:"):
-            prefix = "Recent digest entries:\n"
-            content = msgs[i]["content"][len(prefix):]
-            # available space after removing other messages
-            others = "\n\n".join(m["content"] for j, m in enumerate(msgs) if j != i)
-            remaining = max_chars - len(others) - len(prefix) - 6
-            if remaining <= 0:
-                # remove digest entirely
-                del msgs[i]
-            else:
-                msgs[i]["content"] = prefix + (content[-remaining:])
-            break
+    return sections
 
-    # If still too long, iteratively truncate other messages from the end
-    while True:
-        combined = "\n\n".join(m["content"] for m in msgs)
-        if len(combined) <= max_chars:
-            break
-        # truncate the longest message (except persona) or drop last
-        lengths = [(len(m["content"]), idx) for idx, m in enumerate(msgs)]
-        lengths.sort(reverse=True)
-        _, idx = lengths[0]
-        if len(msgs[idx]["content"]) > 100:
-            msgs[idx]["content"] = msgs[idx]["content"][-1000:]
-        else:
-            del msgs[idx]
-        if not msgs:
+
+def pack_context(
+    history: Optional[List[Dict[str, Any]]] = None,
+    persona: Optional[str] = None,
+    budgets: Optional[Dict[str, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Build the message list sent to the model within per-section token budgets.
+
+    `persona` overrides the persona file; a bootstrap message with the same
+    text is not repeated. Persona and core keep their beginning, the digest
+    keeps its newest lines, and history keeps its leading system messages
+    and then the newest turns that fit (the last one is always kept whole).
+    """
+    limits = section_budgets()
+    limits.update(budgets or {})
+    sections = list(_bootstrap_sections())
+    if persona is not None:
+        sections = [("persona", persona, _persona_tokens(persona))] + [sec for sec in sections if sec[1] != persona]
+
+    out: List[Dict[str, Any]] = []
+    carry = 0
+    for name in SECTIONS[:-1]:
+        left = limits.get(name, 0) + carry
+        for sec, content, tokens in sections:
+            if sec != name or left <= 0:
+                continue
+            if tokens > left:
+                if name == "digest":
+                    body = _truncate(content[len(DIGEST_PREFIX):], tokens, left - _count_tokens(DIGEST_PREFIX), keep_tail=True)
+                    content = DIGEST_PREFIX + body if body else ""
+                else:
+                    content = _truncate(content, tokens, left)
+                tokens = _count_tokens(content) if content else 0
+            if content:
+                out.append({"role": "system", "content": content})
+                left -= tokens
+        carry = max(0, left)
+
+    history = history or []
+    left = limits.get("history", 0) + carry
+    # leading system messages (client prompt, rolling summary) are not trimmed
+    lead = 0
+    while lead < len(history) - 1 and history[lead].get("role") == "system":
+        left -= count_tokens(history[lead].get("content"))
+        lead += 1
+    keep = len(history)
+    # walk newest to oldest, stop at the first message that does not fit
+    for i in range(len(history) - 1, lead - 1, -1):
+        tokens = count_tokens(history[i].get("content"))
+        if tokens > left and i < len(history) - 1:
             break
+        left -= tokens
+        keep = i
+    return out + list(history[:lead]) + list(history[keep:])
+
+
+def _persona_tokens(text: str) -> int:
+    n = _persona_counts.get(text)
+    if n is None:
+        if len(_persona_counts) > 8:
+            _persona_counts.clear()
+        n = _persona_counts[text] = _count_tokens(text)
+    return n
+
+
+def load_bootstrap_messages() -> List[Dict[str, str]]:
+    """Load bootstrap system messages for Aurelia.
+
+    Returns a list of dicts like {"role":"system","content":"..."}.
+    This function is idempotent and will silently skip missing/invalid files.
+    Persona, core and digest are trimmed to their token budgets.
+    """
+    return pack_context([])
+
 
-    return msgs
+_load_env_tokenizer()
@@ -1,12 +1,13 @@
+from typing import Optional
 from fastapi import APIRouter, Request, HTTPException
-from gateway.seedai_storage import load_core, save_core, list_conversations, load_conversation, get_memory_summary
+from gateway.seedai_storage import load_core, save_core, list_conversations, list_conversations_page, load_conversation, load_conversation_page, get_memory_summary, run_read, run_write
 
 router = APIRouter()
 
 
 @router.get("/api/memory")
 async def get_memory():
-    return load_core()
+    return await run_read(load_core)
 
 
 @router.post("/api/memory")
@@ -17,22 +18,32 @@ async def post_memory(req: Request):
         raise HTTPException(status_code=400, detail="Invalid JSON body")
     if not isinstance(data, dict):
         raise HTTPException(status_code=400, detail="Expected JSON object")
-    saved = save_core(data)
+    saved = await run_write(save_core, data)
     return {"ok": True, "saved_keys": list(data.keys()), "core": saved}
 
 
 @router.get("/api/conversations")
-async def get_conversations():
+async def get_conversations(limit: Optional[int] = None, cursor: Optional[str] = None):
+    # without limit/cursor keep the original unpaginated list for old clients
+    paged = limit is not None or cursor is not None
     try:
-        return list_conversations()
+        if not paged:
+            return await run_read(list_conversations)
+        return await run_read(list_conversations_page, limit=limit or 50, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
-        return []
+        return {"items": [], "next_cursor": None} if paged else []
 
 
 @router.get("/api/conversations/{conversation_id}")
-async def get_conversation(conversation_id: str):
+async def get_conversation(conversation_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        return load_conversation(conversation_id)
+        if limit is None and cursor is None:
+            return await run_read(load_conversation, conversation_id)
+        return await run_read(load_conversation_page, conversation_id, limit=limit or 100, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         return {}
 
@@ -40,6 +51,6 @@ async def get_conversation(conversation_id: str):
 @router.get("/api/memory/summary")
 async def memory_summary(limit: int = 5):
     try:
-        return get_memory_summary(limit=limit)
+        return await run_read(get_memory_summary, limit=limit)
     except Exception:
         return {"total": 0, "recent": [], "topic_counts": {}}
@@ -6,7 +6,8 @@ try:
 except Exception:
     # fallback implementations if seedai_storage isn't available
     from pathlib import Path
-    import json
+
+    from gateway import core_store
 
     ROOT = Path(__file__).resolve().parents[1]
     MEMORY_DIR = ROOT / "seedai" / "memory"
@@ -14,16 +15,14 @@ except Exception:
     CORE_JSON = MEMORY_DIR / "core.json"
 
     def load_core() -> dict:
-        if not CORE_JSON.exists():
+        if not core_store.exists(CORE_JSON):
             return {}
         try:
-            return json.loads(CORE_JSON.read_text(encoding="utf-8"))
+            return core_store.load_core(CORE_JSON)
         except Exception:
             return {}
 
     def save_core(new_dict: dict):
-        core = load_core()
-        for k, v in new_dict.items():
-            core[k] = v
-        CORE_JSON.write_text(json.dumps(core, indent=2, ensure_ascii=False), encoding="utf-8")
-        return core
+        # top-level keys are replaced, as in seedai_storage.save_core, through
+        # the core.json merge log
+        return core_store.set_core_keys(CORE_JSON, new_dict, namespace=None)
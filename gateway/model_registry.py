@@ -0,0 +1,206 @@
+"""model_registry.py
+Cached model catalogue for the provider(s) behind the gateway.
+
+Open WebUI polls the model list constantly; probing the provider each time
+means up to five sequential HTTP requests per poll. The registry keeps the
+normalized list per provider base URL and serves it from memory:
+
+- entries are refreshed in the background once older than the TTL
+  (stale-while-revalidate) and by an optional periodic refresher task;
+- the probe path that worked for a base URL is remembered and tried first;
+- when a refresh fails the last good list keeps being served.
+
+Env:
+- AURELIA_MODELS_TTL: seconds before a list is refreshed (30)
+- AURELIA_MODELS_PROBE_TIMEOUT: per-probe timeout in seconds (10)
+"""
+
+import ast
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from gateway import provider_client
+
+MODELS_TTL = float(os.environ.get("AURELIA_MODELS_TTL", "30"))
+PROBE_TIMEOUT = float(os.environ.get("AURELIA_MODELS_PROBE_TIMEOUT", "10"))
+# how long a failed first probe is remembered before trying again
+ERROR_TTL = 5.0
+PROBE_PATHS = ("/v1/models", "/models", "/api/tags", "/v1/tags", "/v1/engines")
+_TEXT_HINTS = ("llama", "gemma", "mistral", "qwen")
+
+
+def normalize_models(resp_json) -> List[Dict[str, Any]]:
+    # Normalize different provider shapes into a list of {id, owned_by}
+    models = []
+    def push_from_obj(o):
+        if isinstance(o, dict):
+            mid = o.get('id') or o.get('name') or o.get('model')
+            owned = o.get('owned_by') or o.get('owner') or 'library'
+            if mid:
+                models.append({'id': str(mid), 'owned_by': owned})
+                return True
+        return False
+
+    def push(m):
+        if not push_from_obj(m):
+            # try to parse python-style dict strings
+            if isinstance(m, str):
+                try:
+                    parsed = ast.literal_eval(m)
+                    if push_from_obj(parsed):
+                        return
+                except Exception:
+                    pass
+            # fallback: treat as id string
+            models.append({'id': str(m), 'owned_by': 'library'})
+
+    if isinstance(resp_json, dict):
+        if set(resp_json) == {'text'}:
+            # non-JSON body: pick out words that look like model names
+            text = resp_json['text'] or ''
+            for w in text.split():
+                if any(t in w.lower() for t in _TEXT_HINTS):
+                    models.append({'id': w, 'owned_by': 'library'})
+            return models
+        candidates = []
+        if 'models' in resp_json and isinstance(resp_json['models'], list):
+            candidates = resp_json['models']
+        elif 'data' in resp_json and isinstance(resp_json['data'], list):
+            candidates = resp_json['data']
+        else:
+            # try to find any list value
+            for v in resp_json.values():
+                if isinstance(v, list):
+                    candidates = v
+                    break
+        for m in candidates:
+            push(m)
+    elif isinstance(resp_json, list):
+        for m in resp_json:
+            push(m)
+    return models
+
+
+class ModelRegistry:
+    """Per-base-URL model list cache with background refresh."""
+
+    def __init__(self, ttl: float = MODELS_TTL, probe_paths=PROBE_PATHS, probe_timeout: float = PROBE_TIMEOUT):
+        self.ttl = ttl
+        self.probe_paths = tuple(probe_paths)
+        self.probe_timeout = probe_timeout
+        # base -> {"models", "fetched_at", "path", "error", "error_at"}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, base: str) -> List[Dict[str, Any]]:
+        """Return the model list for `base`, probing only on a cold cache.
+
+        Raises ProviderError if nothing was ever fetched for `base` and the
+        probe fails.
+        """
+        base = base.rstrip("/")
+        entry = self._entries.get(base)
+        now = time.monotonic()
+        if entry and entry["models"] is not None:
+            self.hits += 1
+            if now - entry["fetched_at"] >= self.ttl:
+                self._refresh(base)
+            return entry["models"]
+        if entry and entry["error"] and now - entry["error_at"] < ERROR_TTL:
+            raise entry["error"]
+        self.misses += 1
+        return await self._refresh(base)
+
+    def invalidate(self, base: Optional[str] = None):
+        if base is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(base.rstrip("/"), None)
+
+    def _refresh(self, base: str) -> "asyncio.Task":
+        # single flight: concurrent callers share one probe per base URL
+        task = self._inflight.get(base)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._fetch(base))
+            self._inflight[base] = task
+            # background refreshes may never be awaited
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _fetch(self, base: str) -> List[Dict[str, Any]]:
+        entry = self._entries.setdefault(base, {"models": None, "fetched_at": 0.0, "path": None, "error": None, "error_at": 0.0})
+        paths = list(self.probe_paths)
+        if entry["path"] in paths:
+            paths.remove(entry["path"])
+            paths.insert(0, entry["path"])
+        errors = []
+        for p in paths:
+            try:
+                js = await provider_client.get_json(base + p, timeout=self.probe_timeout, retries=0)
+            except provider_client.ProviderError as e:
+                errors.append(str(e))
+                continue
+            models = normalize_models(js)
+            if models:
+                entry.update(models=models, fetched_at=time.monotonic(), path=p, error=None)
+                return models
+            errors.append(f"{base + p} -> no models")
+        err = provider_client.ProviderError(f"Model probe failed for {base}: {'; '.join(errors)}")
+        entry.update(error=err, error_at=time.monotonic())
+        if entry["models"] is not None:
+            # keep serving the last good list
+            print(f"[model_registry] refresh failed, serving stale list: {err}")
+            return entry["models"]
+        raise err
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl)
+            for base in list(self._entries):
+                try:
+                    await self._refresh(base)
+                except Exception:
+                    pass
+
+    def start(self):
+        """Start the periodic refresher on the running loop."""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except BaseException:
+                pass
+            self._refresher = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "providers": {
+                base: {
+                    "models": len(e["models"] or []),
+                    "path": e["path"],
+                    "age_s": round(now - e["fetched_at"], 1) if e["models"] is not None else None,
+                    "error": str(e["error"]) if e["error"] else None,
+                }
+                for base, e in self._entries.items()
+            },
+        }
+
+
+registry = ModelRegistry()
+
+
+async def get_models(base: str) -> List[Dict[str, Any]]:
+    return await registry.get(base)
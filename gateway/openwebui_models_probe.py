@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException
-import os, json, time
+import os, time
+
+from gateway import provider_client
+from gateway.model_registry import registry
 
 router = APIRouter(prefix="/api", tags=["openwebui-compat"])
 
@@ -9,41 +12,21 @@ def _ollama_base():
         base = base[:-3]
     return base
 
-def _get(url: str, timeout: float = 5.0):
-    try:
-        import httpx
-        r = httpx.get(url, timeout=timeout)
-        r.raise_for_status()
-        return r.json()
-    except Exception:
-        pass
-    try:
-        import requests
-        r = requests.get(url, timeout=timeout)
-        r.raise_for_status()
-        return r.json()
-    except Exception:
-        pass
-    from urllib.request import urlopen
-    with urlopen(url, timeout=timeout) as f:
-        return json.loads(f.read().decode("utf-8"))
-
 @router.get("/models")
-def list_models():
+async def list_models():
     base = _ollama_base()
-    url = f"{base}/api/tags"
     try:
-        data = _get(url, timeout=5.0)
-    except Exception as e:
+        listed = await registry.get(base)
+    except provider_client.ProviderError as e:
         raise HTTPException(status_code=502, detail=f"Model probe failed: {e}")
 
+    created = int(time.time())
     models = []
-    for m in data.get("models", []):
-        mid = m.get("name") or m.get("model") or "unknown"
+    for m in listed:
         models.append({
-            "id": mid,
+            "id": m["id"],
             "object": "model",
-            "created": int(time.time()),
+            "created": created,
             "owned_by": "ollama",
         })
     return {"object": "list", "data": models}
@@ -0,0 +1,261 @@
+"""provider_client.py
+Shared async HTTP client for talking to the model provider (Ollama or any
+OpenAI-compatible server).
+
+All gateway call sites go through this module so they share one long-lived
+connection pool (keep-alive, HTTP/2 when the `h2` package is installed)
+instead of opening a fresh TCP connection per request. Each call takes its
+own timeout and failures are retried with exponential backoff:
+
+- GET (idempotent) calls retry connection failures, timeouts and 429/5xx;
+- other methods (chat completions are not idempotent) only retry failures
+  that happen before the request was sent (connect errors) and 429, so a
+  slow generation is never submitted twice. Pass `idempotent=True` to opt
+  in to full retries.
+
+Uses httpx when available and falls back to urllib on a worker thread.
+
+Env:
+- AURELIA_PROVIDER_TIMEOUT: default per-call timeout in seconds (60)
+- AURELIA_PROVIDER_RETRIES: retries after the first attempt (2)
+- AURELIA_PROVIDER_BACKOFF: base backoff delay in seconds (0.25)
+- AURELIA_PROVIDER_MAX_CONNECTIONS: pool size (20)
+"""
+
+import asyncio
+import json
+import os
+import random
+import urllib.error
+import urllib.request
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except Exception:
+    _HTTP2 = False
+
+DEFAULT_TIMEOUT = float(os.environ.get("AURELIA_PROVIDER_TIMEOUT", "60"))
+RETRIES = int(os.environ.get("AURELIA_PROVIDER_RETRIES", "2"))
+BACKOFF = float(os.environ.get("AURELIA_PROVIDER_BACKOFF", "0.25"))
+MAX_CONNECTIONS = int(os.environ.get("AURELIA_PROVIDER_MAX_CONNECTIONS", "20"))
+CONNECT_TIMEOUT = 5.0
+
+# statuses worth retrying: the provider is busy or restarting
+_RETRY_STATUS = {429, 502, 503, 504}
+# 429 means the request was rejected before any work was done
+_RETRY_STATUS_UNSAFE = {429}
+_IDEMPOTENT = {"GET", "HEAD", "OPTIONS"}
+
+# one client per event loop (test clients and reloaders run several loops)
+_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class ProviderError(Exception):
+    """Provider answered with a non-2xx status or could not be reached."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class ProviderTimeout(ProviderError):
+    pass
+
+
+def auth_headers(api_key: Optional[str] = None) -> Dict[str, str]:
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+def _get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=_HTTP2,
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS, keepalive_expiry=60),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose():
+    """Close the pooled client of the running loop (call on shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _decode(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except Exception:
+        return {"text": text}
+
+
+def _backoff(attempt: int) -> float:
+    return BACKOFF * (2 ** attempt) * (0.5 + random.random())
+
+
+def _is_connect_error(e: Exception) -> bool:
+    """True if `e` happened before the request reached the provider."""
+    if httpx is not None and isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    return isinstance(e, urllib.error.URLError) and isinstance(e.reason, ConnectionRefusedError)
+
+
+def _urllib_call(method: str, url: str, payload: Any, headers: Dict[str, str], timeout: float):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return r.status, r.read().decode("utf-8", errors="ignore")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8", errors="ignore")
+
+
+async def request_json(
+    method: str,
+    url: str,
+    payload: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    idempotent: Optional[bool] = None,
+) -> Any:
+    """Send a request and return the decoded JSON body.
+
+    Non-JSON bodies come back as {"text": ...}. Raises ProviderTimeout or
+    ProviderError (with status_code/body) once retries are exhausted.
+    `idempotent` defaults to True for GET; see the module doc for what is
+    retried either way.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    retries = RETRIES if retries is None else retries
+    if idempotent is None:
+        idempotent = method.upper() in _IDEMPOTENT
+    retry_status = _RETRY_STATUS if idempotent else _RETRY_STATUS_UNSAFE
+    headers = headers or auth_headers()
+    last: Optional[ProviderError] = None
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(_backoff(attempt - 1))
+        try:
+            if httpx is not None:
+                r = await _get_client().request(
+                    method, url, json=payload, headers=headers,
+                    timeout=httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout)),
+                )
+                status, text = r.status_code, r.text
+            else:
+                loop = asyncio.get_running_loop()
+                status, text = await loop.run_in_executor(None, _urllib_call, method, url, payload, headers, timeout)
+        except Exception as e:
+            timed_out = (httpx is not None and isinstance(e, httpx.TimeoutException)) or isinstance(e, TimeoutError)
+            last = (ProviderTimeout if timed_out else ProviderError)(f"{method} {url} failed: {e}")
+            if idempotent or _is_connect_error(e):
+                continue
+            break
+        if 200 <= status < 300:
+            return _decode(text)
+        last = ProviderError(f"{method} {url} -> {status}", status_code=status, body=_decode(text[:2000]))
+        if status not in retry_status:
+            break
+    raise last
+
+
+async def get_json(url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None, retries: Optional[int] = None) -> Any:
+    return await request_json("GET", url, headers=headers, timeout=timeout, retries=retries)
+
+
+async def post_json(
+    url: str,
+    payload: Any,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    idempotent: bool = False,
+) -> Any:
+    """POST `payload`; only connect failures and 429 are retried unless `idempotent`."""
+    return await request_json("POST", url, payload, headers=headers, timeout=timeout, retries=retries, idempotent=idempotent)
+
+
+async def stream_lines(
+    url: str,
+    payload: Any,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    idempotent: bool = False,
+) -> AsyncIterator[str]:
+    """POST `payload` and yield response lines as they arrive (e.g. SSE).
+
+    Only opening the stream is retried, under the same rules as post_json
+    (connect failures and 429 unless `idempotent`); once bytes flow, errors
+    propagate.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    retries = RETRIES if retries is None else retries
+    retry_status = _RETRY_STATUS if idempotent else _RETRY_STATUS_UNSAFE
+    headers = headers or auth_headers()
+    if httpx is not None:
+        client = _get_client()
+        for attempt in range(retries + 1):
+            try:
+                async with client.stream(
+                    "POST", url, json=payload, headers=headers,
+                    timeout=httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout)),
+                ) as r:
+                    if r.status_code >= 300:
+                        body = _decode((await r.aread()).decode("utf-8", errors="ignore")[:2000])
+                        if r.status_code in retry_status and attempt < retries:
+                            await asyncio.sleep(_backoff(attempt))
+                            continue
+                        raise ProviderError(f"POST {url} -> {r.status_code}", status_code=r.status_code, body=body)
+                    async for line in r.aiter_lines():
+                        yield line
+                    return
+            except httpx.TransportError as e:
+                # ConnectError/ConnectTimeout: nothing was sent yet
+                if (idempotent or _is_connect_error(e)) and attempt < retries:
+                    await asyncio.sleep(_backoff(attempt))
+                    continue
+                raise (ProviderTimeout if isinstance(e, httpx.TimeoutException) else ProviderError)(f"POST {url} failed: {e}")
+        return
+
+    # urllib fallback: read lines on a worker thread and hand them over
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def _pump():
+        try:
+            req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), headers=headers, method="POST")
+            with urllib.request.urlopen(req, timeout=timeout) as r:
+                for raw in r:
+                    loop.call_soon_threadsafe(q.put_nowait, raw.decode("utf-8", errors="ignore").rstrip("\r\n"))
+        except Exception as e:
+            loop.call_soon_threadsafe(q.put_nowait, ProviderError(f"POST {url} failed: {e}"))
+        finally:
+            loop.call_soon_threadsafe(q.put_nowait, done)
+
+    loop.run_in_executor(None, _pump)
+    while True:
+        item = await q.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
@@ -65,35 +65,25 @@ async def api_chat(req: ChatRequest):
         else:
             payload['messages'].append({"role": m.role, "content": str(content)})
 
-    # Forward to Ollama
+    # Forward to Ollama over the shared provider connection pool
+    from gateway import providers, provider_client
+    base = providers.get_base_url()
+    api_key = providers.get_api_key() or ""
+    url = base.rstrip('/') + "/v1/chat/completions"
     try:
-        from gateway import providers
-        base = providers.get_base_url()
-        api_key = providers.get_api_key() or ""
-        url = base.rstrip('/') + "/v1/chat/completions"
-        import requests
-        headers = {"Content-Type": "application/json"}
-        if api_key:
-            headers["Authorization"] = f"Bearer {api_key}"
-        r = requests.post(url, json=payload, headers=headers, timeout=10)
-    except requests.exceptions.Timeout:
+        return await provider_client.post_json(url, payload, headers=provider_client.auth_headers(api_key), timeout=10)
+    except provider_client.ProviderTimeout:
         raise HTTPException(status_code=504, detail="Timeout when contacting model provider")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Provider error: {e}")
-
-    # Return provider's JSON or a normalized error
-    try:
-        if r.status_code >= 200 and r.status_code < 300:
-            return r.json()
-        else:
-            # Attempt to return provider message
-            try:
-                err = r.json()
-            except Exception:
-                err = {"status_code": r.status_code, "text": r.text[:1000]}
-            raise HTTPException(status_code=400, detail={"error": "provider_error", "provider": err})
-    except HTTPException:
-        raise
+    except provider_client.ProviderError as e:
+        if e.status_code is None:
+            raise HTTPException(status_code=502, detail=f"Provider error: {e}")
+        # Return provider message as a normalized error
+        err = e.body
+        if not isinstance(err, dict) or "text" in err:
+            # non-JSON error body
+            text = err.get("text", "") if isinstance(err, dict) else str(err or "")
+            err = {"status_code": e.status_code, "text": text[:1000]}
+        raise HTTPException(status_code=400, detail={"error": "provider_error", "provider": err})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
@@ -1,19 +1,31 @@
-from fastapi import APIRouter
-from gateway.seedai_storage import list_conversations, load_conversation, get_memory_summary
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from gateway.seedai_storage import list_conversations, list_conversations_page, load_conversation, load_conversation_page, get_memory_summary, run_read
 
 router = APIRouter()
 
 
 @router.get("/api/conversations")
-async def api_conversations():
-    return list_conversations()
+async def api_conversations(limit: Optional[int] = None, cursor: Optional[str] = None):
+    # without limit/cursor keep the original unpaginated list for old clients
+    if limit is None and cursor is None:
+        return await run_read(list_conversations)
+    try:
+        return await run_read(list_conversations_page, limit=limit or 50, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/api/conversations/{conversation_id}")
-async def api_conversation(conversation_id: str):
-    return load_conversation(conversation_id)
+async def api_conversation(conversation_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    if limit is None and cursor is None:
+        return await run_read(load_conversation, conversation_id)
+    try:
+        return await run_read(load_conversation_page, conversation_id, limit=limit or 100, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/api/memory/summary")
 async def api_memory_summary(limit: int = 5):
-    return get_memory_summary(limit=limit)
+    return await run_read(get_memory_summary, limit=limit)
\ No newline at end of file
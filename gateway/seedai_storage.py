@@ -7,21 +7,40 @@ while providing a richer schema, indexes, migration and export utilities.
 
 Key features:
 - Separate tables for different memory types (memories, vocab, emotions,
-  reflections) while keeping a 'core' memory entry compatible with previous
-  API.
+  reflections) plus a versioned key-value `core_kv` table behind the legacy
+  load_core/save_core API (one row per top-level key, optional history).
 - Fast read/write with indexes for topic/word/timestamp lookups.
 - Migration function from a legacy JSON memory folder.
-- `export_memory_json` for human-readable backups.
+- `export_memory_json` for human-readable backups, streamed as JSON or NDJSON
+  (optionally gzipped, optionally only what changed since the last export).
 - `init_db` / `close_db` for startup/shutdown lifecycle management.
+- `run_read` / `run_write` to call any of these functions from async handlers
+  without blocking the event loop (one writer thread, pooled readers).
+- `ingest_messages` for idempotent, content-hashed persistence of resent
+  conversation threads.
+- `list_conversations_page` / `load_conversation_page` for keyset-paginated
+  conversation listing and message reading.
+- `conversation_window` for server-side history: the last N turns of the
+  request's thread verbatim plus a rolling summary of older turns cached in
+  `conversation_summaries`.
 """
 
+import asyncio
+import base64
+import functools
+import gzip
+import hashlib
+import os
 import sqlite3
 import json
 import time
 import pathlib
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Optional, Dict, Any, List
-from memory_manager import MemoryManager
+from memory_manager import _ReadPool
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 DEFAULT_DB_DIR = ROOT / "seedai" / "memory"
@@ -32,8 +51,33 @@ CORE_RE = re.compile(r"CORE_MEMORY_UPDATE\s*(\{.*?\})\s*END_CORE_MEMORY_UPDATE",
 
 # module-level connection (opened by init_db)
 _conn: Optional[sqlite3.Connection] = None
-# MemoryManager instance (optional)
-_mm: Optional[MemoryManager] = None
+# read-only connections for _read_conn, and the threads behind run_read /
+# run_write (all opened by init_db). The storage tables share names with
+# MemoryManager's (memories, vocab, ...), so this DB is not opened through it.
+_read_pool: Optional[_ReadPool] = None
+_readers: Optional[ThreadPoolExecutor] = None
+_writer: Optional[ThreadPoolExecutor] = None
+# read-only connection the load_core cache is validated on (data_version
+# is per connection, so it has to be the same one every time)
+_core_conn: Optional[sqlite3.Connection] = None
+
+READ_POOL_SIZE = int(os.environ.get("SEEDAI_READ_POOL_SIZE", "4"))
+# keep core writes in core_history, at most CORE_HISTORY_KEEP versions per key
+# (0 keeps everything; compact_core_history trims further)
+CORE_HISTORY = os.environ.get("SEEDAI_CORE_HISTORY", "true").lower() in ("1", "true", "yes")
+CORE_HISTORY_KEEP = int(os.environ.get("SEEDAI_CORE_HISTORY_KEEP", "50"))
+# conversation_window: user turns kept verbatim, summary size cap (chars)
+HISTORY_TURNS = int(os.environ.get("SEEDAI_HISTORY_TURNS", "8"))
+HISTORY_SUMMARY_CHARS = int(os.environ.get("SEEDAI_HISTORY_SUMMARY_CHARS", "2000"))
+
+# write-through cache for load_core: kept current by save_core, revalidated
+# when PRAGMA data_version shows another connection committed
+_core_lock = threading.Lock()
+_core_cache: Optional[Dict[str, Any]] = None
+_core_cache_version = 0
+_core_data_version: Optional[int] = None
+_core_hits = 0
+_core_misses = 0
 
 
 def _now_ts() -> str:
@@ -50,33 +94,71 @@ def get_conn() -> sqlite3.Connection:
     return _conn
 
 
+@contextmanager
+def _read_conn():
+    """Connection for read-only queries: a pooled reader when available."""
+    if _read_pool is not None:
+        with _read_pool.connection() as conn:
+            yield conn
+    else:
+        yield get_conn()
+
+
+async def run_read(fn, *args, **kwargs):
+    """Run a blocking read (e.g. `load_core`) on the reader threads."""
+    return await asyncio.get_running_loop().run_in_executor(_readers, functools.partial(fn, *args, **kwargs))
+
+
+async def run_write(fn, *args, **kwargs):
+    """Run a blocking write (e.g. `save_core`) on the single writer thread."""
+    return await asyncio.get_running_loop().run_in_executor(_writer, functools.partial(fn, *args, **kwargs))
+
+
 def init_db(db_path: Optional[str] = None):
     """Initialize the DB and keep a persistent connection for the process.
 
     Call from FastAPI startup to ensure DB is ready.
     """
     global DB_PATH, _conn
+    _invalidate_core_cache()
     if db_path:
         DB_PATH = pathlib.Path(db_path)
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     else:
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-    global _mm, _conn
-    # prefer MemoryManager-backed connection so we share the same DB and
-    # benefit from its performance pragmas and schema management
-    try:
-        _mm = MemoryManager(db_path=str(DB_PATH))
-        _conn = _mm._conn
-    except Exception:
-        # fallback to direct sqlite connection
-        _conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, timeout=30)
-        _conn.execute("PRAGMA journal_mode=WAL")
-        _conn.execute("PRAGMA foreign_keys=ON")
+    global _read_pool, _readers, _writer
+    close_db()
+    _conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, timeout=30)
+    _conn.execute("PRAGMA journal_mode=WAL")
+    _conn.execute("PRAGMA synchronous=NORMAL")
+    _conn.execute("PRAGMA foreign_keys=ON")
     c = _conn.cursor()
 
-    # memories: store different memory types; keep a canonical core memory with
-    # type='core' and key='core' to preserve legacy load_core/save_core API.
+    # core memory: one row per top-level key. `version` is the global core
+    # version at the time the key was last written.
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS core_kv (
+        key TEXT PRIMARY KEY,
+        value_json TEXT,
+        version INTEGER NOT NULL,
+        ts TEXT
+    )""")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_core_kv_version ON core_kv(version)")
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS core_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key TEXT,
+        value_json TEXT,
+        version INTEGER,
+        ts TEXT
+    )""")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_core_history_key_version ON core_history(key, version)")
+    _conn.commit()
+    _import_legacy_core_snapshot(c)
+
+    # memories: store different memory types. Older databases also hold
+    # type='core' snapshots here; they are imported into core_kv on startup.
     c.execute("""
     CREATE TABLE IF NOT EXISTS memories (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -90,6 +172,7 @@ def init_db(db_path: Optional[str] = None):
     c.execute("CREATE INDEX IF NOT EXISTS idx_memories_type_key ON memories(type, key)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_memories_topic ON memories(topic)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_memories_owner ON memories(owner)")
+    _create_memory_stats(c)
 
     # vocab
     c.execute("""
@@ -127,9 +210,15 @@ def init_db(db_path: Optional[str] = None):
         id TEXT PRIMARY KEY,
         title TEXT,
         meta_json TEXT,
-        updated_at TEXT
+        updated_at TEXT,
+        message_count INTEGER NOT NULL DEFAULT 0
     )""")
+    c.execute("PRAGMA table_info(conversations)")
+    if "message_count" not in [r[1] for r in c.fetchall()]:
+        c.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+        c.execute("UPDATE conversations SET message_count=(SELECT COUNT(*) FROM messages WHERE conversation_id=conversations.id)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated_id ON conversations(updated_at, id)")
     c.execute("""
     CREATE TABLE IF NOT EXISTS messages (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -139,21 +228,61 @@ def init_db(db_path: Optional[str] = None):
         ts TEXT
     )""")
     c.execute("CREATE INDEX IF NOT EXISTS idx_messages_conv_ts ON messages(conversation_id, ts)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_messages_conv_id ON messages(conversation_id, id)")
+    # content_hash identifies a message by its position in the thread (see
+    # ingest_messages); rows written by append_message leave it NULL
+    c.execute("PRAGMA table_info(messages)")
+    if "content_hash" not in [r[1] for r in c.fetchall()]:
+        c.execute("ALTER TABLE messages ADD COLUMN content_hash TEXT")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_conv_hash ON messages(conversation_id, content_hash) WHERE content_hash IS NOT NULL")
+    # per-name high-water marks of incremental exports
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS export_watermarks (
+        name TEXT PRIMARY KEY,
+        memory_id INTEGER NOT NULL DEFAULT 0,
+        message_id INTEGER NOT NULL DEFAULT 0,
+        core_version INTEGER NOT NULL DEFAULT 0,
+        conversation_ts TEXT,
+        exported_at TEXT
+    )""")
+    # rolling summary of the turns that aged out of the history window;
+    # upto_hash is the chained content_hash of the last message folded into it
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS conversation_summaries (
+        conversation_id TEXT PRIMARY KEY,
+        summary TEXT,
+        upto_hash TEXT,
+        updated_at TEXT
+    )""")
+    c.execute("PRAGMA table_info(conversation_summaries)")
+    if "upto_hash" not in [r[1] for r in c.fetchall()]:
+        # summaries keyed by message id do not say which branch they cover
+        c.execute("ALTER TABLE conversation_summaries ADD COLUMN upto_hash TEXT")
+        c.execute("DELETE FROM conversation_summaries")
 
     _conn.commit()
 
+    if READ_POOL_SIZE > 0:
+        _read_pool = _ReadPool(str(DB_PATH), READ_POOL_SIZE, row_factory=None)
+    _readers = ThreadPoolExecutor(max_workers=max(1, READ_POOL_SIZE), thread_name_prefix="seedai-db-reader")
+    _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="seedai-db-writer")
+
 
 def close_db():
-    global _conn
-    global _conn, _mm
-    if _mm:
-        try:
-            _mm.close()
-        except Exception:
-            pass
-        _mm = None
-        _conn = None
-        return
+    global _conn, _read_pool, _readers, _writer, _core_conn
+    _invalidate_core_cache()
+    for pool in (_readers, _writer):
+        if pool is not None:
+            pool.shutdown(wait=True)
+    _readers = _writer = None
+    with _core_lock:
+        for conn in (_read_pool, _core_conn):
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        _read_pool = _core_conn = None
     if _conn:
         try:
             _conn.commit()
@@ -178,11 +307,12 @@ def strip_core_blocks(text: str) -> str:
     return CORE_RE.sub("", text).strip()
 
 
-def save_memory_entry(entry: Dict[str, Any], source: str = "aurelia", verbatim: bool = False):
+def save_memory_entry(entry: Dict[str, Any], source: str = "aurelia", verbatim: bool = False, commit: bool = True):
     """Save a memory entry into the appropriate table (default to memories table).
 
     Entry should be a JSON-serializable dict. We attempt to infer type from
     keys but always save to `memories` table to preserve flexibility.
+    With commit=False the insert joins the caller's transaction.
     """
     conn = get_conn()
     c = conn.cursor()
@@ -192,45 +322,219 @@ def save_memory_entry(entry: Dict[str, Any], source: str = "aurelia", verbatim:
         "INSERT INTO memories (type, key, topic, owner, data_json, ts) VALUES (?,?,?,?,?,?)",
         (entry.get("type") or "generic", entry.get("key") or None, topic, owner, json.dumps(entry, ensure_ascii=False), _now_ts()),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
-def save_core(new_dict: Dict[str, Any]) -> Dict[str, Any]:
-    """Legacy-compatible save_core: maintain a canonical 'core' memory entry.
+def _import_legacy_core_snapshot(c: sqlite3.Cursor):
+    """Seed core_kv from the newest legacy 'core' snapshot in `memories`."""
+    c.execute("SELECT 1 FROM core_kv LIMIT 1")
+    if c.fetchone():
+        return
+    try:
+        c.execute("SELECT data_json FROM memories WHERE type='core' AND key='core' ORDER BY id DESC LIMIT 1")
+        row = c.fetchone()
+        core = json.loads(row[0]) if row and row[0] else None
+    except Exception:
+        # no legacy table/columns or unreadable snapshot
+        return
+    if isinstance(core, dict) and core:
+        _write_core_keys(c, core)
+        c.connection.commit()
+
 
-    Performs shallow merge of top-level keys and returns the saved core dict.
+def _write_core_keys(c: sqlite3.Cursor, new_dict: Dict[str, Any]) -> int:
+    """Write `new_dict` as the next core version; the caller commits.
+
+    The version is read under BEGIN IMMEDIATE (the write lock), so two
+    processes saving at once cannot both take the same number.
     """
-    conn = get_conn()
+    began = not c.connection.in_transaction
+    if began:
+        c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute("SELECT COALESCE(MAX(version), 0) FROM core_kv")
+        version = c.fetchone()[0] + 1
+        ts = _now_ts()
+        rows = [(k, json.dumps(v, ensure_ascii=False), version, ts) for k, v in new_dict.items()]
+        c.executemany(
+            "INSERT INTO core_kv (key, value_json, version, ts) VALUES (?,?,?,?) "
+            "ON CONFLICT(key) DO UPDATE SET value_json=excluded.value_json, version=excluded.version, ts=excluded.ts",
+            rows,
+        )
+        if CORE_HISTORY:
+            c.executemany("INSERT INTO core_history (key, value_json, version, ts) VALUES (?,?,?,?)", rows)
+            if CORE_HISTORY_KEEP > 0:
+                c.executemany(
+                    "DELETE FROM core_history WHERE key=? AND id NOT IN ("
+                    " SELECT id FROM core_history WHERE key=? ORDER BY version DESC, id DESC LIMIT ?)",
+                    [(k, k, CORE_HISTORY_KEEP) for k in new_dict],
+                )
+    except Exception:
+        if began:
+            c.connection.rollback()
+        raise
+    return version
+
+
+def _invalidate_core_cache():
+    global _core_cache, _core_data_version
+    with _core_lock:
+        _core_cache = None
+        _core_data_version = None
+
+
+def _data_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _core_reader() -> sqlite3.Connection:
+    """Read-only connection for the core cache. Caller holds _core_lock."""
+    global _core_conn
+    if _read_pool is None:
+        return get_conn()
+    if _core_conn is None:
+        _core_conn = _read_pool._open()
+    return _core_conn
+
+
+def _core_cache_valid(conn: sqlite3.Connection) -> bool:
+    """True if the cached core is current. Caller holds _core_lock.
+
+    data_version on the core reader moves whenever another connection
+    commits, our own writer included; save_core records it after its own
+    writes.
+    """
+    global _core_cache, _core_data_version
+    if _core_cache is None:
+        return False
+    dv = _data_version(conn)
+    if dv == _core_data_version:
+        return True
+    # something else was committed; only reload if core_kv actually changed
+    _core_data_version = dv
+    c = conn.cursor()
+    c.execute("SELECT COALESCE(MAX(version), 0) FROM core_kv")
+    if c.fetchone()[0] == _core_cache_version:
+        return True
+    _core_cache = None
+    return False
+
+
+def _read_core_rows(conn: sqlite3.Connection) -> Dict[str, Any]:
     c = conn.cursor()
-    c.execute("SELECT data_json FROM memories WHERE type='core' AND key='core' ORDER BY id DESC LIMIT 1")
-    row = c.fetchone()
+    c.execute("SELECT key, value_json FROM core_kv ORDER BY rowid")
+    rows = c.fetchall()
     core = {}
-    if row and row[0]:
+    for k, v in rows:
         try:
-            core = json.loads(row[0])
+            core[k] = json.loads(v)
         except Exception:
-            core = {}
-    # shallow merge
-    for k, v in new_dict.items():
-        core[k] = v
-
-    # upsert: insert new row for core snapshot
-    c.execute("INSERT INTO memories (type,key,data_json,ts) VALUES (?,?,?,?)", ("core", "core", json.dumps(core, ensure_ascii=False), _now_ts()))
-    conn.commit()
+            continue
     return core
 
 
+def save_core(new_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Legacy-compatible save_core: shallow-merge top-level keys into core memory.
+
+    Only the keys in `new_dict` are written (one core_kv row each); returns the
+    merged core dict.
+    """
+    global _core_cache, _core_cache_version, _core_data_version
+    if not new_dict:
+        return load_core()
+    conn = get_conn()
+    with _core_lock:
+        reader = _core_reader()
+        cached = _core_cache is not None and _core_cache_valid(reader)
+        c = conn.cursor()
+        version = _write_core_keys(c, new_dict)
+        conn.commit()
+        if cached and version == _core_cache_version + 1:
+            # write-through: nobody else wrote core in between
+            _core_cache.update(json.loads(json.dumps(new_dict, ensure_ascii=False)))
+            _core_cache_version = version
+            _core_data_version = _data_version(reader)
+        else:
+            _core_cache = None
+    return load_core()
+
+
 def load_core() -> Dict[str, Any]:
+    """Return the core memory dict, served from cache when it is current.
+
+    The result is a shallow copy: top-level changes are private to the caller,
+    nested values are shared with the cache and must not be mutated.
+    """
+    global _core_cache, _core_cache_version, _core_data_version, _core_hits, _core_misses
+    with _core_lock:
+        conn = _core_reader()
+        if _core_cache_valid(conn):
+            _core_hits += 1
+            return dict(_core_cache)
+        _core_misses += 1
+        dv = _data_version(conn)
+        c = conn.cursor()
+        # one read snapshot for the version and the rows
+        began = not conn.in_transaction
+        if began:
+            c.execute("BEGIN")
+        try:
+            c.execute("SELECT COALESCE(MAX(version), 0) FROM core_kv")
+            version = c.fetchone()[0]
+            core = _read_core_rows(conn)
+        finally:
+            if began:
+                conn.rollback()
+        _core_cache, _core_cache_version, _core_data_version = core, version, dv
+        return dict(core)
+
+
+def core_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the load_core cache."""
+    with _core_lock:
+        total = _core_hits + _core_misses
+        return {
+            "cached": _core_cache is not None,
+            "version": _core_cache_version,
+            "hits": _core_hits,
+            "misses": _core_misses,
+            "hit_ratio": round(_core_hits / total, 3) if total else 0.0,
+        }
+
+
+def core_version() -> int:
+    """Global core version; bumped by every save_core call."""
+    with _read_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COALESCE(MAX(version), 0) FROM core_kv")
+        return c.fetchone()[0]
+
+
+def compact_core_history(keep: int = 1, drop_legacy_snapshots: bool = True) -> Dict[str, int]:
+    """Trim core_history to the newest `keep` versions per key.
+
+    With `drop_legacy_snapshots` the old full-document 'core' rows in
+    `memories` (already imported into core_kv) are deleted too.
+    """
     conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT data_json FROM memories WHERE type='core' AND key='core' ORDER BY id DESC LIMIT 1")
-    row = c.fetchone()
-    if not row:
-        return {}
-    try:
-        return json.loads(row[0])
-    except Exception:
-        return {}
+    c.execute(
+        "DELETE FROM core_history WHERE id IN ("
+        " SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY key ORDER BY version DESC, id DESC) AS rn FROM core_history)"
+        " WHERE rn > ?)",
+        (max(0, keep),),
+    )
+    history_removed = c.rowcount
+    snapshots_removed = 0
+    if drop_legacy_snapshots:
+        try:
+            c.execute("DELETE FROM memories WHERE type='core' AND key='core'")
+            snapshots_removed = c.rowcount
+        except Exception:
+            pass
+    conn.commit()
+    return {"history_removed": history_removed, "snapshots_removed": snapshots_removed}
 
 
 def forget_memory(topic: str = None, owner: str = None):
@@ -248,10 +552,10 @@ def forget_memory(topic: str = None, owner: str = None):
 
 
 def query_memory_by_topic(topic: str) -> List[Dict[str, Any]]:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, type, key, topic, owner, data_json, ts FROM memories WHERE topic=? ORDER BY id DESC", (topic,))
-    rows = c.fetchall()
+    with _read_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, type, key, topic, owner, data_json, ts FROM memories WHERE topic=? ORDER BY id DESC", (topic,))
+        rows = c.fetchall()
     results = []
     for r in rows:
         results.append({
@@ -266,64 +570,365 @@ def query_memory_by_topic(topic: str) -> List[Dict[str, Any]]:
     return results
 
 
+def _create_memory_stats(c: sqlite3.Cursor):
+    """Counters for get_memory_summary, kept current by triggers on memories.
+
+    kind is 'total' (name ''), 'topic' or 'type'; NULL topics/types are only
+    counted in the total. Rows whose count drops to zero are removed.
+    """
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS memory_stats (
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (kind, name)
+    )""")
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='memories_stats_ai'")
+    if c.fetchone():
+        return
+    # first run on this database: count existing rows, then keep it incremental
+    c.execute("DELETE FROM memory_stats")
+    c.execute("INSERT INTO memory_stats (kind, name, count) SELECT 'total', '', COUNT(*) FROM memories")
+    c.execute("INSERT INTO memory_stats (kind, name, count) SELECT 'topic', topic, COUNT(*) FROM memories WHERE topic IS NOT NULL GROUP BY topic")
+    c.execute("INSERT INTO memory_stats (kind, name, count) SELECT 'type', type, COUNT(*) FROM memories WHERE type IS NOT NULL GROUP BY type")
+    inc = (
+        "INSERT INTO memory_stats (kind, name, count) SELECT '{kind}', {name}, 1 WHERE {name} IS NOT NULL "
+        "ON CONFLICT(kind, name) DO UPDATE SET count=count+1"
+    )
+    dec = "UPDATE memory_stats SET count=count-1 WHERE kind='{kind}' AND name={name}"
+    c.execute(f"""
+    CREATE TRIGGER memories_stats_ai AFTER INSERT ON memories BEGIN
+        {inc.format(kind='total', name="''")};
+        {inc.format(kind='topic', name="NEW.topic")};
+        {inc.format(kind='type', name="NEW.type")};
+    END""")
+    c.execute(f"""
+    CREATE TRIGGER memories_stats_ad AFTER DELETE ON memories BEGIN
+        {dec.format(kind='total', name="''")};
+        {dec.format(kind='topic', name="OLD.topic")};
+        {dec.format(kind='type', name="OLD.type")};
+        DELETE FROM memory_stats WHERE count<=0 AND kind!='total';
+    END""")
+    c.execute(f"""
+    CREATE TRIGGER memories_stats_au AFTER UPDATE OF topic, type ON memories BEGIN
+        {dec.format(kind='topic', name="OLD.topic")};
+        {dec.format(kind='type', name="OLD.type")};
+        {inc.format(kind='topic', name="NEW.topic")};
+        {inc.format(kind='type', name="NEW.type")};
+        DELETE FROM memory_stats WHERE count<=0 AND kind!='total';
+    END""")
+
+
 def get_memory_summary(limit: int = 5) -> Dict[str, Any]:
+    """Totals come from the memory_stats counters: O(topics + types), not O(rows)."""
+    with _read_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT kind, name, count FROM memory_stats")
+        stats = c.fetchall()
+        c.execute("SELECT topic, owner, data_json, ts FROM memories ORDER BY id DESC LIMIT ?", (limit,))
+        recent = [{"topic": r[0], "owner": r[1], "entry": json.loads(r[2]) if r[2] else None, "ts": r[3]} for r in c.fetchall()]
+    total = next((r[2] for r in stats if r[0] == "total"), 0)
+    topic_counts = {r[1]: r[2] for r in stats if r[0] == "topic"}
+    type_counts = {r[1]: r[2] for r in stats if r[0] == "type"}
+    return {"total": total, "recent": recent, "topic_counts": topic_counts, "type_counts": type_counts}
+
+
+_UPSERT_CONVERSATION = (
+    "INSERT INTO conversations (id, title, meta_json, updated_at, message_count) VALUES (?,?,?,?,?) "
+    "ON CONFLICT(id) DO UPDATE SET updated_at=excluded.updated_at, "
+    "message_count=conversations.message_count+excluded.message_count, "
+    "title=COALESCE(excluded.title, conversations.title)"
+)
+
+
+def _insert_messages(c: sqlite3.Cursor, conversation_id: str, rows, ts: str, title: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> int:
+    """Insert (role, text, content_hash) rows and bump the conversation row.
+
+    Rows whose content_hash is already stored are skipped. The caller commits.
+    """
+    inserted = 0
+    if rows:
+        c.executemany(
+            "INSERT OR IGNORE INTO messages (conversation_id, role, text, ts, content_hash) VALUES (?,?,?,?,?)",
+            [(conversation_id, role, text, ts, h) for role, text, h in rows],
+        )
+        inserted = max(c.rowcount, 0)
+    if inserted or title is not None or meta is not None:
+        meta_json = json.dumps(meta if meta is not None else {"id": conversation_id}, ensure_ascii=False)
+        c.execute(_UPSERT_CONVERSATION, (conversation_id, title, meta_json, ts, inserted))
+    return inserted
+
+
+def append_messages(conversation_id: str, messages) -> int:
+    """Append messages to a conversation in one transaction (one commit).
+
+    `messages` holds dicts with role and content/text, or (role, text) pairs.
+    Returns the number of messages written.
+    """
+    rows = []
+    for m in messages:
+        if isinstance(m, dict):
+            rows.append((m.get("role"), _message_text(m), None))
+        else:
+            rows.append((m[0], m[1], None))
+    if not rows:
+        return 0
     conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM memories")
-    total = c.fetchone()[0]
-    c.execute("SELECT topic, owner, data_json, ts FROM memories ORDER BY id DESC LIMIT ?", (limit,))
-    recent = [{"topic": r[0], "owner": r[1], "entry": json.loads(r[2]) if r[2] else None, "ts": r[3]} for r in c.fetchall()]
-    c.execute("SELECT topic, COUNT(*) FROM memories GROUP BY topic")
-    topic_counts = {r[0]: r[1] for r in c.fetchall() if r[0] is not None}
-    return {"total": total, "recent": recent, "topic_counts": topic_counts}
+    n = _insert_messages(conn.cursor(), conversation_id, rows, _now_ts())
+    conn.commit()
+    return n
 
 
 def append_message(conversation_id: str, role: str, text: str):
+    append_messages(conversation_id, [(role, text)])
+
+
+def _message_text(m: Dict[str, Any]) -> str:
+    content = m.get("content")
+    if content is None:
+        content = m.get("text")
+    if isinstance(content, str):
+        return content
+    return json.dumps(content if content is not None else m, ensure_ascii=False)
+
+
+def _message_hash(prev: str, role: Optional[str], text: str) -> str:
+    """content_hash of a message following the message hashed `prev` ("" first)."""
+    return hashlib.sha1(f"{prev}\x1f{role}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+def ingest_messages(conversation_id: str, messages: List[Dict[str, Any]], roles=None) -> int:
+    """Persist the messages of a (possibly resent) thread that are not stored yet.
+
+    Each message is keyed by a hash chained over the thread so far (role and
+    text of every earlier message), so resending the same thread is a no-op
+    while a repeated "yes" later in the thread is still a new message. Only
+    messages whose role is in `roles` (default: all) are written; all of them
+    take part in the hash chain. One transaction; returns the number inserted.
+    """
+    rows = []
+    prev = ""
+    for m in messages:
+        role = m.get("role")
+        text = _message_text(m)
+        prev = _message_hash(prev, role, text)
+        if roles is None or role in roles:
+            rows.append((role, text, prev))
+    if not rows:
+        return 0
     conn = get_conn()
-    c = conn.cursor()
-    c.execute("INSERT INTO messages (conversation_id, role, text, ts) VALUES (?,?,?,?)", (conversation_id, role, text, _now_ts()))
-    c.execute("REPLACE INTO conversations (id, title, meta_json, updated_at) VALUES (?,?,?,?)", (conversation_id, None, json.dumps({"id": conversation_id}), _now_ts()))
+    inserted = _insert_messages(conn.cursor(), conversation_id, rows, _now_ts())
     conn.commit()
+    return inserted
 
 
 def load_conversation(conversation_id: str) -> Dict[str, Any]:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, title, meta_json, updated_at FROM conversations WHERE id=?", (conversation_id,))
-    conv = c.fetchone()
-    if not conv:
-        return {"id": conversation_id, "messages": []}
-    c.execute("SELECT role, text, ts FROM messages WHERE conversation_id=? ORDER BY id ASC", (conversation_id,))
-    rows = c.fetchall()
+    with _read_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, title, meta_json, updated_at FROM conversations WHERE id=?", (conversation_id,))
+        conv = c.fetchone()
+        if not conv:
+            return {"id": conversation_id, "messages": []}
+        c.execute("SELECT role, text, ts FROM messages WHERE conversation_id=? ORDER BY id ASC", (conversation_id,))
+        rows = c.fetchall()
     messages = [{"role": r[0], "text": r[1], "ts": r[2]} for r in rows]
     return {"id": conv[0], "title": conv[1], "meta": json.loads(conv[2]) if conv[2] else None, "updated_at": conv[3], "messages": messages}
 
 
 def list_conversations() -> List[Dict[str, Any]]:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, title, updated_at FROM conversations ORDER BY updated_at DESC")
-    rows = c.fetchall()
+    with _read_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, title, updated_at FROM conversations ORDER BY updated_at DESC")
+        rows = c.fetchall()
     return [{"id": r[0], "title": r[1], "updated_at": r[2]} for r in rows]
 
 
+def _extractive_summary(previous: str, messages: List[Dict[str, str]]) -> str:
+    """Default summarizer: append one short line per aged-out message."""
+    lines = [previous] if previous else []
+    for m in messages:
+        text = " ".join((m.get("content") or "").split())
+        if len(text) > 200:
+            text = text[:197] + "..."
+        lines.append(f"{m.get('role')}: {text}")
+    summary = "\n".join(lines)
+    if len(summary) > HISTORY_SUMMARY_CHARS:
+        # keep the most recent part, starting on a line boundary
+        summary = summary[-HISTORY_SUMMARY_CHARS:]
+        summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+    return summary
+
+
+_summarizer = _extractive_summary
+
+
+def set_summarizer(fn=None):
+    """Install `fn(previous_summary, aged_messages) -> str` (None restores the default)."""
+    global _summarizer
+    _summarizer = fn or _extractive_summary
+
+
+def conversation_window(conversation_id: str, messages: List[Dict[str, Any]], keep_turns: Optional[int] = None) -> List[Dict[str, str]]:
+    """Server-side history for the thread in the current request.
+
+    Returns the last `keep_turns` user turns of `messages` verbatim (at least
+    the last one, so the window ends on the incoming turn), preceded by a
+    system message with a rolling summary of everything older. The summary is
+    cached in conversation_summaries under the chained content_hash (see
+    ingest_messages) of the last message it covers, so it is only extended
+    while the thread keeps that prefix: a regenerated reply reuses it and an
+    edited message starts a new one. Rows stored for other branches of the
+    conversation are never read. System messages are not part of the window.
+    """
+    keep_turns = max(1, HISTORY_TURNS if keep_turns is None else keep_turns)
+    thread = []
+    prev = ""
+    for m in messages:
+        role = m.get("role")
+        text = _message_text(m)
+        prev = _message_hash(prev, role, text)
+        if role != "system":
+            thread.append((prev, role, text))
+
+    user_idx = [i for i, r in enumerate(thread) if r[1] == "user"]
+    cut = user_idx[-keep_turns] if len(user_idx) > keep_turns else 0
+    summary = ""
+    if cut:
+        with _read_conn() as conn:
+            row = conn.execute("SELECT summary, upto_hash FROM conversation_summaries WHERE conversation_id=?", (conversation_id,)).fetchone()
+        done = 0
+        if row and row[1]:
+            covered = next((i + 1 for i, r in enumerate(thread[:cut]) if r[0] == row[1]), None)
+            if covered is not None:
+                summary, done = row[0] or "", covered
+        if done < cut:
+            summary = _summarizer(summary, [{"role": r[1], "content": r[2]} for r in thread[done:cut]])
+            conn = get_conn()
+            conn.execute(
+                "INSERT INTO conversation_summaries (conversation_id, summary, upto_hash, updated_at) VALUES (?,?,?,?) "
+                "ON CONFLICT(conversation_id) DO UPDATE SET summary=excluded.summary, upto_hash=excluded.upto_hash, updated_at=excluded.updated_at",
+                (conversation_id, summary, thread[cut - 1][0], _now_ts()),
+            )
+            conn.commit()
+
+    window = []
+    if summary:
+        window.append({"role": "system", "content": "Summary of the earlier conversation:\n" + summary})
+    window.extend({"role": r[1], "content": r[2]} for r in thread[cut:])
+    return window
+
+
+PAGE_MAX = 500
+PREVIEW_CHARS = 120
+
+
+def _encode_cursor(*key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, size: int) -> list:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("invalid cursor")
+    return key
+
+
+def list_conversations_page(limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """One page of conversations, most recently updated first.
+
+    Items carry the message count and a preview of the last message. Pass
+    the returned `next_cursor` to get the following page (None at the end).
+    Raises ValueError for a malformed cursor.
+    """
+    limit = max(1, min(int(limit), PAGE_MAX))
+    sql = (
+        "SELECT c.id, c.title, c.updated_at, c.message_count, m.role, substr(m.text, 1, ?), m.ts "
+        "FROM conversations c "
+        "LEFT JOIN messages m ON m.id = (SELECT id FROM messages WHERE conversation_id=c.id ORDER BY id DESC LIMIT 1) "
+    )
+    params: List[Any] = [PREVIEW_CHARS]
+    if cursor:
+        updated_at, cid = _decode_cursor(cursor, 2)
+        sql += "WHERE (c.updated_at, c.id) < (?, ?) "
+        params += [updated_at, cid]
+    sql += "ORDER BY c.updated_at DESC, c.id DESC LIMIT ?"
+    params.append(limit + 1)
+    with _read_conn() as conn:
+        c = conn.cursor()
+        c.execute(sql, params)
+        rows = c.fetchall()
+    items = [
+        {
+            "id": r[0],
+            "title": r[1],
+            "updated_at": r[2],
+            "message_count": r[3],
+            "last_message": {"role": r[4], "preview": r[5], "ts": r[6]} if r[4] is not None else None,
+        }
+        for r in rows[:limit]
+    ]
+    next_cursor = _encode_cursor(rows[limit - 1][2], rows[limit - 1][0]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def load_conversation_page(conversation_id: str, limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """A conversation with one page of its messages, oldest first.
+
+    Messages are paged on the (conversation_id, id) keyset; pass the
+    returned `next_cursor` for the following page (None at the end).
+    Raises ValueError for a malformed cursor.
+    """
+    limit = max(1, min(int(limit), PAGE_MAX))
+    after = _decode_cursor(cursor, 1)[0] if cursor else 0
+    with _read_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, title, meta_json, updated_at, message_count FROM conversations WHERE id=?", (conversation_id,))
+        conv = c.fetchone()
+        if not conv:
+            return {"id": conversation_id, "messages": [], "next_cursor": None}
+        c.execute(
+            "SELECT id, role, text, ts FROM messages WHERE conversation_id=? AND id>? ORDER BY id ASC LIMIT ?",
+            (conversation_id, after, limit + 1),
+        )
+        rows = c.fetchall()
+    messages = [{"id": r[0], "role": r[1], "text": r[2], "ts": r[3]} for r in rows[:limit]]
+    next_cursor = _encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    return {
+        "id": conv[0],
+        "title": conv[1],
+        "meta": json.loads(conv[2]) if conv[2] else None,
+        "updated_at": conv[3],
+        "message_count": conv[4],
+        "messages": messages,
+        "next_cursor": next_cursor,
+    }
+
+
 def process_model_output(conversation_id: str, model_text: str, source: str = "aurelia"):
     """Process raw model output: extract and persist CORE blocks, strip them,
     and append the assistant message to the conversation. Returns sanitized_text, parsed_core
     """
     parsed = extract_core_json(model_text)
     if parsed:
-        # save memory entry
-        save_memory_entry(parsed, source=source, verbatim=bool(parsed.get("value")))
+        # save memory entry; committed together with the assistant message
+        save_memory_entry(parsed, source=source, verbatim=bool(parsed.get("value")), commit=False)
         print(f"[seedai_storage] CORE_MEMORY_UPDATE received and saved: {parsed}")
     sanitized = strip_core_blocks(model_text)
-    append_message(conversation_id, "assistant", sanitized)
+    append_messages(conversation_id, [("assistant", sanitized)])
     return sanitized, parsed
 
 
 def migrate_from_json(memory_dir: Optional[str] = None):
     """Migrate legacy JSON memory files into SQLite. Accepts path to the
     memory folder (defaults to project `memory` or `seedai/memory`).
+
+    Runs the resumable migration engine in `gateway.legacy_migration`:
+    parallel parsing, streamed large files, batched writes and a checkpoint
+    per file. Calling it again after an interruption continues where it
+    stopped; already migrated files are skipped.
     """
     paths_to_try = []
     if memory_dir:
@@ -340,99 +945,136 @@ def migrate_from_json(memory_dir: Optional[str] = None):
         print("[seedai_storage] No legacy memory directory found for migration")
         return {"migrated": 0}
 
-    migrated = 0
-    # migrate core.json
-    core_path = mem_dir / "core.json"
-    if core_path.exists():
-        try:
-            # Try reading with utf-8 first; if json decoding fails (common with BOM),
-            # retry with utf-8-sig. This covers files that are readable but include
-            # a BOM which can cause json.loads to raise a JSONDecodeError.
-            core_txt = core_path.read_text(encoding="utf-8")
-            try:
-                core = json.loads(core_txt)
-            except Exception as e_json:
-                try:
-                    core_txt2 = core_path.read_text(encoding="utf-8-sig")
-                    core = json.loads(core_txt2)
-                except Exception as e_json2:
-                    print(f"[seedai_storage] JSON decode failed for core.json (utf-8 then utf-8-sig): {e_json}; {e_json2}")
-                    raise
-            save_core(core)
-            migrated += 1
-            print(f"[seedai_storage] Migrated core.json from {core_path}")
-        except Exception as e:
-            print("[seedai_storage] Failed to migrate core.json:", e)
-
-    # migrate conversations.json
-    conv_path = mem_dir / "conversations.json"
-    if conv_path.exists():
-        try:
-            try:
-                convs_txt = conv_path.read_text(encoding="utf-8")
-            except Exception:
-                convs_txt = conv_path.read_text(encoding="utf-8-sig")
-            convs = json.loads(convs_txt)
-            for cid, cobj in convs.items():
-                # upsert conversation and messages
-                c = get_conn().cursor()
-                c.execute("REPLACE INTO conversations (id, title, meta_json, updated_at) VALUES (?,?,?,?)", (cid, cobj.get("title"), json.dumps(cobj.get("meta") or {}), _now_ts()))
-                msgs = cobj.get("messages", [])
-                for m in msgs:
-                    c.execute("INSERT INTO messages (conversation_id, role, text, ts) VALUES (?,?,?,?)", (cid, m.get("role"), m.get("content") or m.get("text") or "", _now_ts()))
-                get_conn().commit()
-            migrated += 1
-            print(f"[seedai_storage] Migrated conversations from {conv_path}")
-        except Exception as e:
-            print("[seedai_storage] Failed to migrate conversations.json:", e)
-
-    # additional files: vocab.json, emotions.json, reflections.json
-    for fname, table in [("vocab.json", "vocab"), ("emotions.json", "emotions"), ("reflections.json", "reflections")]:
-        fp = mem_dir / fname
-        if fp.exists():
-            try:
-                data = json.loads(fp.read_text(encoding="utf-8"))
-                c = get_conn().cursor()
-                if table == "vocab":
-                    for w, meaning in data.items():
-                        c.execute("INSERT INTO vocab (word, meaning_json, ts) VALUES (?,?,?)", (w, json.dumps(meaning, ensure_ascii=False), _now_ts()))
-                elif table == "emotions":
-                    for tag, info in data.items():
-                        c.execute("INSERT INTO emotions (tag, data_json, ts) VALUES (?,?,?)", (tag, json.dumps(info, ensure_ascii=False), _now_ts()))
-                elif table == "reflections":
-                    for r in data:
-                        c.execute("INSERT INTO reflections (title, body, ts) VALUES (?,?,?)", (r.get("title"), r.get("body"), _now_ts()))
-                get_conn().commit()
-                migrated += 1
-                print(f"[seedai_storage] Migrated {fname}")
-            except Exception as e:
-                print(f"[seedai_storage] Failed to migrate {fname}:", e)
-
-    return {"migrated": migrated}
-
-
-def export_memory_json(out_path: Optional[str] = None):
-    """Export a human-readable JSON backup of core memory and conversations.
-
-    Returns the exported object and writes to `memory_export.json` by default.
+    from gateway.legacy_migration import migrate
+
+    return migrate(mem_dir)
+
+
+EXPORT_BATCH = 500
+
+
+def _iter_rows(c: sqlite3.Cursor, sql: str, params=()):
+    c.execute(sql, params)
+    while True:
+        rows = c.fetchmany(EXPORT_BATCH)
+        if not rows:
+            return
+        yield from rows
+
+
+def export_memory_json(
+    out_path: Optional[str] = None,
+    fmt: str = "json",
+    compress: bool = False,
+    incremental: bool = False,
+    watermark: str = "default",
+) -> Dict[str, Any]:
+    """Export core memory, all memories and all conversations as a backup.
+
+    Rows are streamed from cursors in batches, so memory use stays flat
+    however large the store is. `fmt` is "json" (one document: core,
+    memories, conversations with their messages) or "ndjson" (one record
+    per line, tagged with "kind"). `compress` gzips the output. With
+    `incremental` only rows added since the previous incremental export
+    under the same `watermark` name are written: new memories, new messages
+    (under their conversation), conversations updated since, and core keys
+    with a newer version. The watermark is advanced only after the file has
+    been written completely. The file is replaced atomically.
+
+    Returns a summary with the path, row counts and the new watermark.
     """
-    conn = get_conn()
-    c = conn.cursor()
-    export = {}
-    # core
-    core = load_core()
-    export["core"] = core
-    # recent memories
-    c.execute("SELECT id, type, key, topic, owner, data_json, ts FROM memories ORDER BY id DESC LIMIT 200")
-    export["memories"] = [{"id": r[0], "type": r[1], "key": r[2], "topic": r[3], "owner": r[4], "entry": json.loads(r[5]) if r[5] else None, "ts": r[6]} for r in c.fetchall()]
-    # conversations (limited)
-    c.execute("SELECT id FROM conversations ORDER BY updated_at DESC LIMIT 200")
-    convs = []
-    for r in c.fetchall():
-        convs.append(load_conversation(r[0]))
-    export["conversations"] = convs
-
-    out_file = pathlib.Path(out_path) if out_path else DEFAULT_DB_DIR / "memory_export.json"
-    out_file.write_text(json.dumps(export, indent=2, ensure_ascii=False), encoding="utf-8")
-    return export
+    if fmt not in ("json", "ndjson"):
+        raise ValueError("fmt must be 'json' or 'ndjson'")
+    default_name = "memory_export." + fmt + (".gz" if compress else "")
+    out_file = pathlib.Path(out_path) if out_path else DEFAULT_DB_DIR / default_name
+    tmp = out_file.with_name(out_file.name + ".tmp")
+
+    counts = {"core_keys": 0, "memories": 0, "conversations": 0, "messages": 0}
+    with _read_conn() as conn:
+        c = conn.cursor()
+        wm = {"memory_id": 0, "message_id": 0, "core_version": 0, "conversation_ts": ""}
+        if incremental:
+            c.execute("SELECT memory_id, message_id, core_version, conversation_ts FROM export_watermarks WHERE name=?", (watermark,))
+            row = c.fetchone()
+            if row:
+                wm = {"memory_id": row[0], "message_id": row[1], "core_version": row[2], "conversation_ts": row[3] or ""}
+        # upper bounds fix the snapshot; rows written meanwhile go to the next export
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM memories")
+        max_memory = c.fetchone()[0]
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM messages")
+        max_message = c.fetchone()[0]
+        c.execute("SELECT COALESCE(MAX(version), 0) FROM core_kv")
+        core_version = c.fetchone()[0]
+        started = _now_ts()
+        msg_cur = conn.cursor()
+
+        def core_items():
+            for key, value in _iter_rows(c, "SELECT key, value_json FROM core_kv WHERE version>? ORDER BY rowid", (wm["core_version"],)):
+                counts["core_keys"] += 1
+                yield key, json.loads(value) if value else None
+
+        def memory_items():
+            for r in _iter_rows(c, "SELECT id, type, key, topic, owner, data_json, ts FROM memories WHERE id>? AND id<=? ORDER BY id", (wm["memory_id"], max_memory)):
+                counts["memories"] += 1
+                yield {"id": r[0], "type": r[1], "key": r[2], "topic": r[3], "owner": r[4], "entry": json.loads(r[5]) if r[5] else None, "ts": r[6]}
+
+        def conversation_items():
+            sql = "SELECT id, title, meta_json, updated_at, message_count FROM conversations"
+            params: tuple = ()
+            if incremental:
+                sql += " WHERE updated_at>? OR id IN (SELECT conversation_id FROM messages WHERE id>? AND id<=?)"
+                params = (wm["conversation_ts"], wm["message_id"], max_message)
+            # messages are streamed per conversation on a second cursor
+            for r in _iter_rows(c, sql + " ORDER BY id", params):
+                counts["conversations"] += 1
+                conv = {"id": r[0], "title": r[1], "meta": json.loads(r[2]) if r[2] else None, "updated_at": r[3], "message_count": r[4]}
+                yield conv, _conversation_messages(r[0])
+
+        def _conversation_messages(cid):
+            for r in _iter_rows(msg_cur, "SELECT id, role, text, ts FROM messages WHERE conversation_id=? AND id>? AND id<=? ORDER BY id", (cid, wm["message_id"], max_message)):
+                counts["messages"] += 1
+                yield {"id": r[0], "role": r[1], "text": r[2], "ts": r[3]}
+
+        def dumps(obj):
+            return json.dumps(obj, ensure_ascii=False)
+
+        opener = (lambda p: gzip.open(p, "wt", encoding="utf-8")) if compress else (lambda p: open(p, "w", encoding="utf-8"))
+        with opener(tmp) as f:
+            if fmt == "ndjson":
+                f.write(dumps({"kind": "export", "incremental": incremental, "ts": started}) + "\n")
+                for key, value in core_items():
+                    f.write(dumps({"kind": "core", "key": key, "value": value}) + "\n")
+                for m in memory_items():
+                    f.write(dumps(dict(m, kind="memory")) + "\n")
+                for conv, messages in conversation_items():
+                    f.write(dumps(dict(conv, kind="conversation")) + "\n")
+                    for m in messages:
+                        f.write(dumps(dict(m, kind="message", conversation_id=conv["id"])) + "\n")
+            else:
+                f.write('{\n"incremental": %s,\n"ts": %s,\n"core": {' % (dumps(incremental), dumps(started)))
+                for i, (key, value) in enumerate(core_items()):
+                    f.write(("," if i else "") + "\n  " + dumps(key) + ": " + dumps(value))
+                f.write('\n},\n"memories": [')
+                for i, m in enumerate(memory_items()):
+                    f.write(("," if i else "") + "\n  " + dumps(m))
+                f.write('\n],\n"conversations": [')
+                for i, (conv, messages) in enumerate(conversation_items()):
+                    head = dumps(conv)
+                    f.write(("," if i else "") + "\n  " + head[:-1] + ', "messages": [')
+                    for j, m in enumerate(messages):
+                        f.write(("," if j else "") + "\n    " + dumps(m))
+                    f.write("\n  ]}")
+                f.write("\n]\n}\n")
+    os.replace(tmp, out_file)
 
+    new_wm = {"memory_id": max_memory, "message_id": max_message, "core_version": core_version, "conversation_ts": started}
+    if incremental:
+        conn = get_conn()
+        conn.execute(
+            "INSERT INTO export_watermarks (name, memory_id, message_id, core_version, conversation_ts, exported_at) VALUES (?,?,?,?,?,?) "
+            "ON CONFLICT(name) DO UPDATE SET memory_id=excluded.memory_id, message_id=excluded.message_id, "
+            "core_version=excluded.core_version, conversation_ts=excluded.conversation_ts, exported_at=excluded.exported_at",
+            (watermark, max_memory, max_message, core_version, started, _now_ts()),
+        )
+        conn.commit()
+    return {"path": str(out_file), "format": fmt, "compressed": compress, "incremental": incremental, "counts": counts, "watermark": new_wm}
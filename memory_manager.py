@@ -1,20 +1,55 @@
+import asyncio
+import functools
 import sqlite3
 import threading
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
 import time
 import os
 import json
 import re
 import requests
 from urllib.parse import urljoin, urlparse
+from urllib.request import pathname2url
 from html.parser import HTMLParser
 
+import memory_vectors
+
 
 DEFAULT_DB_PATH = 'aurelia_memory.db'
 MAX_CONTENT_BYTES = 2 * 1024 * 1024  # 2MB
 
+# Ranked full-text search: source -> (fts table, base table, join column)
+_FTS_SOURCES = {
+    'memories': ('fts_memories', 'memories', 'id'),
+    'crawls': ('fts_crawls', 'crawls', 'id'),
+    'vocab': ('fts_vocab', 'vocab', 'rowid'),
+    'facts': ('fts_facts', 'facts', 'id'),
+}
+_FTS_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# reciprocal-rank fusion constant (Cormack et al. use 60)
+RRF_K = 60
+# Upserts keep the rowid of an existing word / url, so the FTS and vector
+# entries keyed on it stay valid (REPLACE deletes the row and inserts a new
+# rowid without firing delete triggers).
+_VOCAB_UPSERT = ('INSERT INTO vocab(word, definition, examples) VALUES(?, ?, ?) '
+                 'ON CONFLICT(word) DO UPDATE SET definition = excluded.definition, '
+                 'examples = excluded.examples, learned_on = CURRENT_TIMESTAMP')
+_CRAWL_UPSERT = ('INSERT INTO crawls(url, title, content, links, approved_by) VALUES(?, ?, ?, ?, ?) '
+                 'ON CONFLICT(url) DO UPDATE SET title = excluded.title, content = excluded.content, '
+                 'links = excluded.links, approved_by = excluded.approved_by, crawled_on = CURRENT_TIMESTAMP')
+# columns embedded per source (see memory_vectors.row_text)
+_VECTOR_COLUMNS = {
+    'memories': 'content',
+    'crawls': 'title, content',
+    'vocab': 'word, definition, examples',
+    'facts': 'subject, predicate, object',
+}
+# seconds a "not in vocab" answer is trusted before new words are pulled in
+VOCAB_NEGATIVE_TTL = float(os.environ.get('AURELIA_VOCAB_NEGATIVE_TTL', '30'))
+
 
 class AureliaError(Exception):
     pass
@@ -97,16 +132,321 @@ class _SimpleHTMLParser(HTMLParser):
         return self._links
 
 
+class _ReadPool:
+    """Bounded pool of read-only SQLite connections.
+
+    In WAL mode readers do not block the writer (or each other), so giving each
+    reading thread its own connection lets lookups run in parallel instead of
+    serializing on the single writer connection. A thread that already holds a
+    connection reuses it for nested reads. Checkout counts and wait times are
+    tracked so the pool can be sized under load (see `stats()`).
+    """
+
+    def __init__(self, db_path: str, size: int, timeout: float = 30.0, wait_timeout: Optional[float] = None,
+                 row_factory=sqlite3.Row):
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.wait_timeout = timeout if wait_timeout is None else wait_timeout
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._idle: List[sqlite3.Connection] = []
+        self._opened = 0
+        self._in_use = 0
+        self._closed = False
+        # metrics
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _open(self) -> sqlite3.Connection:
+        uri = 'file:' + pathname2url(os.path.abspath(self.db_path)) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = self.row_factory
+        cur = conn.cursor()
+        cur.execute('PRAGMA query_only = ON')
+        cur.execute('PRAGMA temp_store = MEMORY')
+        cur.execute('PRAGMA mmap_size = 268435456')
+        cur.execute('PRAGMA cache_size = -20000')
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        start = time.monotonic()
+        waited = False
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise AureliaError('read pool is closed')
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    # reserve a slot; the connection is opened outside the lock
+                    self._opened += 1
+                    break
+                remaining = self.wait_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise AureliaError(f'timed out after {self.wait_timeout}s waiting for a read connection')
+                waited = True
+                self._cond.wait(remaining)
+            self._checkouts += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            if waited:
+                elapsed = time.monotonic() - start
+                self._waits += 1
+                self._wait_total += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection):
+        with self._cond:
+            self._in_use -= 1
+            if self._closed:
+                self._opened -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._checkin(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'peak_in_use': self._peak_in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_total_ms': round(self._wait_total * 1000, 3),
+                'wait_avg_ms': round(self._wait_total * 1000 / self._waits, 3) if self._waits else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class _WriteQueue:
+    """Background group-commit writer.
+
+    Queued write units (lists of statements) are applied on the writer
+    connection in a single transaction once `interval_ms` has passed since the
+    first pending unit or `max_batch` units are waiting, whichever comes first.
+    Each unit resolves its Future with the lastrowid of its last statement. If
+    a batch fails it is rolled back and replayed unit by unit so one bad row
+    only fails its own caller.
+    """
+
+    def __init__(self, mm: 'MemoryManager', interval_ms: int = 50, max_batch: int = 500):
+        self._mm = mm
+        self.interval = max(0, interval_ms) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[List[Tuple[str, tuple]], Future]] = []
+        self._closed = False
+        self._flush_requested = False
+        self._submitted = 0
+        self._done = 0
+        # metrics
+        self._batches = 0
+        self._batch_max = 0
+        self._failed = 0
+        self._thread = threading.Thread(target=self._run, name='aurelia-write-queue', daemon=True)
+        self._thread.start()
+
+    def submit(self, statements: List[Tuple[str, tuple]]) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise AureliaError('write queue is closed')
+            self._pending.append((statements, fut))
+            self._submitted += 1
+            self._cond.notify_all()
+        return fut
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Commit everything queued so far; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._done < target:
+                if not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # group window: let more writes pile up unless asked to hurry
+                deadline = time.monotonic() + self.interval
+                while len(self._pending) < self.max_batch and not (self._flush_requested or self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                if not self._pending:
+                    self._flush_requested = False
+            self._commit(batch)
+            with self._cond:
+                self._done += len(batch)
+                self._batches += 1
+                self._batch_max = max(self._batch_max, len(batch))
+                self._cond.notify_all()
+
+    def _commit(self, batch):
+        mm = self._mm
+        try:
+            results = []
+            with mm._write_lock:
+                with mm._transaction() as cur:
+                    for statements, _ in batch:
+                        for sql, params in statements:
+                            cur.execute(sql, params)
+                        results.append(cur.lastrowid)
+        except Exception:
+            for statements, fut in batch:
+                try:
+                    fut.set_result(self._commit_one(statements))
+                except Exception as e:
+                    with self._cond:
+                        self._failed += 1
+                    fut.set_exception(e)
+            return
+        for (_, fut), rowid in zip(batch, results):
+            fut.set_result(rowid)
+
+    @with_retry
+    def _commit_one(self, statements):
+        mm = self._mm
+        with mm._write_lock:
+            with mm._transaction() as cur:
+                for sql, params in statements:
+                    cur.execute(sql, params)
+                return cur.lastrowid
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'interval_ms': int(self.interval * 1000),
+                'max_batch': self.max_batch,
+                'pending': len(self._pending),
+                'submitted': self._submitted,
+                'committed': self._done,
+                'batches': self._batches,
+                'batch_avg': round(self._done / self._batches, 2) if self._batches else 0.0,
+                'batch_max': self._batch_max,
+                'failed': self._failed,
+            }
+
+
 class MemoryManager:
     """Production-ready SQLite-backed memory manager with crawling, codegen, FTS, and performance tuning."""
 
-    def __init__(self, db_path: str = DEFAULT_DB_PATH, timeout: float = 30.0):
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, timeout: float = 30.0, read_pool_size: Optional[int] = None,
+                 write_queue_ms: Optional[int] = None, write_queue_batch: int = 500):
+        """Open (and migrate) the database at `db_path`.
+
+        `read_pool_size` > 0 enables pooled mode: writes keep going through the
+        single writer connection while reads are served by up to that many
+        read-only connections. Defaults to `AURELIA_READ_POOL_SIZE` (0 = off).
+
+        `write_queue_ms` > 0 enables group commit (see `start_write_queue`).
+        Defaults to `AURELIA_WRITE_QUEUE_MS` (0 = off).
+
+        Semantic search uses the embedder chosen by `AURELIA_EMBED_BACKEND`;
+        `AURELIA_VECTOR_SYNC_S` > 0 embeds new rows in the background every
+        that many seconds (see `sync_vectors`).
+        """
         self.db_path = db_path
         self.timeout = timeout
+        if read_pool_size is None:
+            read_pool_size = int(os.environ.get('AURELIA_READ_POOL_SIZE', '0') or 0)
+        self.read_pool_size = read_pool_size
         self._lock = threading.RLock()
         self._write_lock = threading.Lock()
         self._conn: Optional[sqlite3.Connection] = None
+        self._read_pool: Optional[_ReadPool] = None
+        self._write_queue: Optional[_WriteQueue] = None
+        self._vocab_words: Optional[set] = None
+        self._vocab_rowid = 0
+        self._vocab_checked = 0.0
+        self._vocab_lock = threading.Lock()
+        self._vectors: Optional[memory_vectors.VectorIndex] = None
+        self._vectors_off = False
+        self._vector_sync_lock = threading.Lock()
+        self._vector_stop = threading.Event()
+        self._vector_wake = threading.Event()
+        self._vector_thread: Optional[threading.Thread] = None
         self._connect()
+        if write_queue_ms is None:
+            write_queue_ms = int(os.environ.get('AURELIA_WRITE_QUEUE_MS', '0') or 0)
+        if write_queue_ms and write_queue_ms > 0:
+            self.start_write_queue(write_queue_ms, write_queue_batch)
+        vector_sync_s = float(os.environ.get('AURELIA_VECTOR_SYNC_S', '0') or 0)
+        if vector_sync_s > 0 and self.vector_index() is not None:
+            self.start_vector_sync(vector_sync_s)
 
     def _connect(self):
         with self._lock:
@@ -123,9 +463,17 @@ class MemoryManager:
             cur.execute('PRAGMA mmap_size = 268435456')
             cur.execute('PRAGMA cache_size = -20000')
             self._ensure_tables_and_migrations()
+            # read-only connections need a file-backed database in WAL mode
+            if self.read_pool_size and self.read_pool_size > 0 and self.db_path != ':memory:':
+                self._read_pool = _ReadPool(self.db_path, self.read_pool_size, timeout=self.timeout)
 
     def close(self):
+        self.stop_vector_sync()
+        self.stop_write_queue()
         with self._lock:
+            if self._read_pool:
+                self._read_pool.close()
+                self._read_pool = None
             if self._conn:
                 try:
                     self._conn.commit()
@@ -166,6 +514,83 @@ class MemoryManager:
                 pass
             raise
 
+    @contextmanager
+    def _reader(self):
+        """Yield a connection for read-only queries (pooled when enabled)."""
+        if not self._conn:
+            self._connect()
+        if self._read_pool is None:
+            yield self._conn
+            return
+        with self._read_pool.connection() as conn:
+            yield conn
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return read-pool metrics (size, in-use, checkouts, wait times)."""
+        if self._read_pool is None:
+            return {'pooled': False, 'size': 0}
+        stats = self._read_pool.stats()
+        stats['pooled'] = True
+        return stats
+
+    # Writes
+    def _write(self, sql: str, params: tuple = (), deferred: bool = False):
+        return self._write_unit([(sql, params)], deferred=deferred)
+
+    def _write_unit(self, statements: List[Tuple[str, tuple]], deferred: bool = False):
+        """Apply `statements` atomically and return the last rowid.
+
+        With the write queue running the unit is handed to the background
+        writer; `deferred=True` returns its Future instead of waiting for the
+        group commit.
+        """
+        queue = self._write_queue
+        if queue is not None:
+            fut = queue.submit(statements)
+            return fut if deferred else fut.result()
+        with self._write_lock:
+            with self._transaction() as cur:
+                for sql, params in statements:
+                    cur.execute(sql, params)
+                rowid = cur.lastrowid
+        if deferred:
+            fut = Future()
+            fut.set_result(rowid)
+            return fut
+        return rowid
+
+    def start_write_queue(self, interval_ms: int = 50, max_batch: int = 500):
+        """Batch writes into one transaction every `interval_ms` or `max_batch` writes.
+
+        Until a write is committed it is not visible to readers; call `flush()`
+        when read-your-writes matters.
+        """
+        with self._lock:
+            if self._write_queue is None:
+                self._write_queue = _WriteQueue(self, interval_ms=interval_ms, max_batch=max_batch)
+
+    def stop_write_queue(self, timeout: Optional[float] = None):
+        """Drain pending writes and stop the background writer."""
+        with self._lock:
+            queue, self._write_queue = getattr(self, '_write_queue', None), None
+        if queue is not None:
+            queue.close(timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every write queued so far is committed."""
+        queue = self._write_queue
+        if queue is None:
+            return True
+        return queue.flush(timeout)
+
+    def write_queue_stats(self) -> Dict[str, Any]:
+        """Return group-commit metrics (pending, batches, average batch size)."""
+        if self._write_queue is None:
+            return {'enabled': False}
+        stats = self._write_queue.stats()
+        stats['enabled'] = True
+        return stats
+
     def _ensure_tables_and_migrations(self):
         cur = self._conn.cursor()
         # Base tables
@@ -416,6 +841,12 @@ class MemoryManager:
             cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts_memories USING fts5(content, emotion, type, content='memories', content_rowid='id')")
             cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts_crawls USING fts5(content, title, url, content='crawls', content_rowid='id')")
             cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts_vocab USING fts5(definition, examples, word, content='vocab', content_rowid='rowid')")
+            cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'fts_facts'")
+            index_facts = cur.fetchone() is None
+            cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts_facts USING fts5(subject, predicate, object, content='facts', content_rowid='id')")
+            if index_facts:
+                # facts written before the index existed
+                cur.execute("INSERT INTO fts_facts(fts_facts) VALUES('rebuild')")
 
             # triggers for memories
             cur.executescript(r"""
@@ -453,13 +884,66 @@ class MemoryManager:
                 INSERT INTO fts_vocab(fts_vocab, rowid, definition, examples, word) VALUES('delete', old.rowid, old.definition, old.examples, old.word);
                 INSERT INTO fts_vocab(rowid, definition, examples, word) VALUES (new.rowid, new.definition, new.examples, new.word);
             END;
+
+            -- facts
+            CREATE TRIGGER IF NOT EXISTS facts_ai AFTER INSERT ON facts BEGIN
+                INSERT INTO fts_facts(rowid, subject, predicate, object) VALUES (new.id, new.subject, new.predicate, new.object);
+            END;
+            CREATE TRIGGER IF NOT EXISTS facts_ad AFTER DELETE ON facts BEGIN
+                INSERT INTO fts_facts(fts_facts, rowid, subject, predicate, object) VALUES('delete', old.id, old.subject, old.predicate, old.object);
+            END;
+            CREATE TRIGGER IF NOT EXISTS facts_au AFTER UPDATE ON facts BEGIN
+                INSERT INTO fts_facts(fts_facts, rowid, subject, predicate, object) VALUES('delete', old.id, old.subject, old.predicate, old.object);
+                INSERT INTO fts_facts(rowid, subject, predicate, object) VALUES (new.id, new.subject, new.predicate, new.object);
+            END;
             """)
         except Exception:
             # FTS5 not available or triggers failed; ignore but continue
             pass
 
+        # rows changed or deleted after they were embedded; sync_vectors
+        # re-embeds or drops their vectors
+        cur.execute('CREATE TABLE IF NOT EXISTS vector_dirty (id INTEGER PRIMARY KEY, source TEXT, rid INTEGER)')
+        self._set_vector_tracking(cur, memory_vectors.embeddings_enabled())
+
         self._conn.commit()
 
+    def _set_vector_tracking(self, cur, on: bool):
+        """Create or drop the `vector_dirty` triggers; the caller commits.
+
+        With embeddings off nothing syncs the table, so the triggers go and
+        the table is emptied. A '*' row remembers that tracking was switched
+        off, so turning it back on marks every row for re-embedding once.
+        """
+        cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%\\_vec\\_a_' ESCAPE '\\'")
+        tracking = cur.fetchone()[0] > 0
+        if on:
+            cur.execute("SELECT 1 FROM vector_dirty WHERE source = '*' LIMIT 1")
+            if cur.fetchone():
+                cur.execute("DELETE FROM vector_dirty WHERE source = '*'")
+                for source, (_, table, key) in _FTS_SOURCES.items():
+                    cur.execute(f"INSERT INTO vector_dirty(source, rid) SELECT '{source}', {key} FROM {table}")
+            for source, (_, table, key) in _FTS_SOURCES.items():
+                cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_vec_au AFTER UPDATE OF {_VECTOR_COLUMNS[source]} ON {table} BEGIN
+                    INSERT INTO vector_dirty(source, rid) VALUES ('{source}', old.{key});
+                END""")
+                cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_vec_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO vector_dirty(source, rid) VALUES ('{source}', old.{key});
+                END""")
+        elif tracking:
+            for _, table, _ in _FTS_SOURCES.values():
+                cur.execute(f'DROP TRIGGER IF EXISTS {table}_vec_au')
+                cur.execute(f'DROP TRIGGER IF EXISTS {table}_vec_ad')
+            cur.execute('DELETE FROM vector_dirty')
+            cur.execute("INSERT INTO vector_dirty(source, rid) VALUES ('*', 0)")
+
+    def _apply_vector_tracking(self, on: bool):
+        with self._write_lock:
+            with self._transaction() as cur:
+                self._set_vector_tracking(cur, on)
+
     # Identity
     @with_retry
     def store_identity(self, key: str, value: str):
@@ -467,358 +951,447 @@ class MemoryManager:
             raise AureliaError('identity key required')
         if value is None:
             value = ''
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('REPLACE INTO identity(key, value) VALUES(?, ?)', (key, str(value)))
+        self._write('REPLACE INTO identity(key, value) VALUES(?, ?)', (key, str(value)))
 
     def get_identity(self, key: str) -> Optional[str]:
-        if not self._conn:
-            self._connect()
-        cur = self._conn.cursor()
-        cur.execute('SELECT value FROM identity WHERE key = ?', (key,))
-        row = cur.fetchone()
-        return row['value'] if row else None
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT value FROM identity WHERE key = ?', (key,))
+            row = cur.fetchone()
+            return row['value'] if row else None
 
     # Relationships
     @with_retry
-    def add_relationship(self, type: str, target: str, details: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO relationships(type, target, details) VALUES(?, ?, ?)', (type, target, details))
-                return cur.lastrowid
+    def add_relationship(self, type: str, target: str, details: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO relationships(type, target, details) VALUES(?, ?, ?)', (type, target, details), deferred=deferred)
 
     def get_relationships(self, type: Optional[str] = None) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        if type:
-            cur.execute('SELECT * FROM relationships WHERE type = ? ORDER BY timestamp DESC', (type,))
-        else:
-            cur.execute('SELECT * FROM relationships ORDER BY timestamp DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            if type:
+                cur.execute('SELECT * FROM relationships WHERE type = ? ORDER BY timestamp DESC', (type,))
+            else:
+                cur.execute('SELECT * FROM relationships ORDER BY timestamp DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Capabilities
     @with_retry
-    def add_capability(self, name: str, description: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO capabilities(name, description) VALUES(?, ?)', (name, description))
-                return cur.lastrowid
+    def add_capability(self, name: str, description: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO capabilities(name, description) VALUES(?, ?)', (name, description), deferred=deferred)
 
     def list_capabilities(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM capabilities ORDER BY learned_on DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM capabilities ORDER BY learned_on DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Principles
     @with_retry
-    def add_principle(self, text: str, source: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO principles(text, source) VALUES(?, ?)', (text, source))
-                return cur.lastrowid
+    def add_principle(self, text: str, source: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO principles(text, source) VALUES(?, ?)', (text, source), deferred=deferred)
 
     def list_principles(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM principles ORDER BY timestamp DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM principles ORDER BY timestamp DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Vocab
     @with_retry
-    def add_vocab(self, word: str, definition: str, examples: Optional[str] = None):
+    def add_vocab(self, word: str, definition: str, examples: Optional[str] = None, deferred: bool = False):
         if not word:
             raise AureliaError('word required')
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('REPLACE INTO vocab(word, definition, examples) VALUES(?, ?, ?)', (word, definition, examples))
+        result = self._write(_VOCAB_UPSERT, (word, definition, examples), deferred=deferred)
+        if deferred:
+            # only once the group commit has actually stored the word
+            result.add_done_callback(lambda f: f.exception() is None and self._remember_words([word]))
+        else:
+            self._remember_words([word])
+        return result
 
     def get_vocab(self, word: str) -> Optional[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM vocab WHERE word = ?', (word,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM vocab WHERE word = ?', (word,))
+            row = cur.fetchone()
+            return dict(row) if row else None
 
     def get_all_vocab(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM vocab ORDER BY learned_on DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM vocab ORDER BY learned_on DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Unknown words
     @with_retry
-    def add_unknown_word(self, word: str, context: Optional[str] = None):
+    def add_unknown_word(self, word: str, context: Optional[str] = None, deferred: bool = False):
         if not word:
             return
         now = datetime.utcnow().isoformat()
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT OR IGNORE INTO unknown_words(word, context, first_seen, resolved) VALUES(?, ?, ?, 0)', (word, context, now))
+        return self._write('INSERT OR IGNORE INTO unknown_words(word, context, first_seen, resolved) VALUES(?, ?, ?, 0)', (word, context, now), deferred=deferred)
 
     @with_retry
     def resolve_unknown_word(self, word: str, definition: str, examples: Optional[str] = None):
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('REPLACE INTO vocab(word, definition, examples) VALUES(?, ?, ?)', (word, definition, examples))
-                cur.execute('UPDATE unknown_words SET resolved = 1 WHERE word = ?', (word,))
+        self._write_unit([
+            (_VOCAB_UPSERT, (word, definition, examples)),
+            ('UPDATE unknown_words SET resolved = 1 WHERE word = ?', (word,)),
+        ])
+        self._remember_words([word])
+
+    # Vocabulary membership index
+    def _refresh_vocab_words(self, full: bool = False):
+        """Pull words inserted since the last refresh (an upsert of a known word keeps its rowid)."""
+        with self._vocab_lock:
+            if full or self._vocab_words is None:
+                words, after = set(), 0
+            else:
+                words, after = self._vocab_words, self._vocab_rowid
+            with self._reader() as conn:
+                cur = conn.cursor()
+                cur.execute('SELECT rowid, word FROM vocab WHERE rowid > ? ORDER BY rowid', (after,))
+                rows = cur.fetchall()
+            words.update(r[1] for r in rows)
+            if rows:
+                self._vocab_rowid = rows[-1][0]
+            self._vocab_words = words
+            self._vocab_checked = time.monotonic()
+
+    def _remember_words(self, words):
+        """Add committed words to the in-memory set (call only after the commit)."""
+        with self._vocab_lock:
+            if self._vocab_words is not None:
+                self._vocab_words.update(w for w in words if w)
+
+    def knows_word(self, word: str) -> bool:
+        """Whether `word` is in the vocab table, answered from memory.
+
+        The word set is loaded on first use and kept current by this manager's
+        vocab writes. Misses are trusted for `AURELIA_VOCAB_NEGATIVE_TTL`
+        seconds; after that the next miss pulls in words other connections
+        added (one query for all words, not one per lookup).
+        """
+        if not word:
+            return False
+        if self._vocab_words is None:
+            self._refresh_vocab_words()
+        if word in self._vocab_words:
+            return True
+        if time.monotonic() - self._vocab_checked >= VOCAB_NEGATIVE_TTL:
+            self._refresh_vocab_words()
+            return word in self._vocab_words
+        return False
+
+    def vocab_words(self) -> set:
+        """A copy of the vocabulary word set."""
+        if self._vocab_words is None:
+            self._refresh_vocab_words()
+        with self._vocab_lock:
+            return set(self._vocab_words)
 
     # Grammar rules
     @with_retry
-    def add_grammar_rule(self, rule: str, example: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO grammar_rules(rule, example) VALUES(?, ?)', (rule, example))
-                return cur.lastrowid
+    def add_grammar_rule(self, rule: str, example: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO grammar_rules(rule, example) VALUES(?, ?)', (rule, example), deferred=deferred)
 
     def list_grammar_rules(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM grammar_rules ORDER BY learned_on DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM grammar_rules ORDER BY learned_on DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Memories
     @with_retry
-    def add_memory(self, type: str, content: str, emotion: Optional[str] = None, importance: int = 1) -> int:
+    def add_memory(self, type: str, content: str, emotion: Optional[str] = None, importance: int = 1, deferred: bool = False) -> int:
         if content is None:
             content = ''
         if len(content.encode('utf-8')) > MAX_CONTENT_BYTES:
             content = content.encode('utf-8')[:MAX_CONTENT_BYTES].decode('utf-8', errors='ignore')
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO memories(type, content, emotion, importance) VALUES(?, ?, ?, ?)', (type, content, emotion, importance))
-                return cur.lastrowid
+        return self._write('INSERT INTO memories(type, content, emotion, importance) VALUES(?, ?, ?, ?)', (type, content, emotion, importance), deferred=deferred)
 
     def get_memories(self, type: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        if type:
-            cur.execute('SELECT * FROM memories WHERE type = ? ORDER BY timestamp DESC LIMIT ?', (type, limit))
-        else:
-            cur.execute('SELECT * FROM memories ORDER BY timestamp DESC LIMIT ?', (limit,))
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            if type:
+                cur.execute('SELECT * FROM memories WHERE type = ? ORDER BY timestamp DESC LIMIT ?', (type, limit))
+            else:
+                cur.execute('SELECT * FROM memories ORDER BY timestamp DESC LIMIT ?', (limit,))
+            return [dict(r) for r in cur.fetchall()]
 
     # Reflections
     @with_retry
-    def add_reflection(self, thought: str, tone: Optional[str] = None, cause: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO reflections(thought, tone, cause) VALUES(?, ?, ?)', (thought, tone, cause))
-                return cur.lastrowid
+    def add_reflection(self, thought: str, tone: Optional[str] = None, cause: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO reflections(thought, tone, cause) VALUES(?, ?, ?)', (thought, tone, cause), deferred=deferred)
 
     def get_reflections(self, limit: int = 50) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM reflections ORDER BY timestamp DESC LIMIT ?', (limit,))
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM reflections ORDER BY timestamp DESC LIMIT ?', (limit,))
+            return [dict(r) for r in cur.fetchall()]
 
     # Sessions
     @with_retry
     def start_session(self, session_id: str, notes: Optional[str] = None):
         now = datetime.utcnow().isoformat()
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT OR REPLACE INTO sessions(session_id, started_at, ended_at, notes) VALUES(?, ?, NULL, ?)', (session_id, now, notes))
+        self._write('INSERT OR REPLACE INTO sessions(session_id, started_at, ended_at, notes) VALUES(?, ?, NULL, ?)', (session_id, now, notes))
 
     @with_retry
     def end_session(self, session_id: str, notes: Optional[str] = None):
         now = datetime.utcnow().isoformat()
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('UPDATE sessions SET ended_at = ?, notes = COALESCE(notes, "") || ? WHERE session_id = ?', (now, '\n' + (notes or ''), session_id))
+        self._write('UPDATE sessions SET ended_at = ?, notes = COALESCE(notes, "") || ? WHERE session_id = ?', (now, '\n' + (notes or ''), session_id))
 
     # Emotions
     @with_retry
-    def add_emotion(self, emotion: str, intensity: int = 1, trigger: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO emotions(emotion, intensity, trigger) VALUES(?, ?, ?)', (emotion, intensity, trigger))
-                return cur.lastrowid
+    def add_emotion(self, emotion: str, intensity: int = 1, trigger: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO emotions(emotion, intensity, trigger) VALUES(?, ?, ?)', (emotion, intensity, trigger), deferred=deferred)
 
     def get_emotions(self, limit: int = 50) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM emotions ORDER BY timestamp DESC LIMIT ?', (limit,))
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM emotions ORDER BY timestamp DESC LIMIT ?', (limit,))
+            return [dict(r) for r in cur.fetchall()]
 
     # Mood history
     @with_retry
-    def add_mood(self, mood: str, reason: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO mood_history(mood, reason) VALUES(?, ?)', (mood, reason))
-                return cur.lastrowid
+    def add_mood(self, mood: str, reason: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO mood_history(mood, reason) VALUES(?, ?)', (mood, reason), deferred=deferred)
 
     def get_mood_history(self, limit: int = 50) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM mood_history ORDER BY timestamp DESC LIMIT ?', (limit,))
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM mood_history ORDER BY timestamp DESC LIMIT ?', (limit,))
+            return [dict(r) for r in cur.fetchall()]
 
     # Questions
     @with_retry
-    def add_question(self, question: str, source: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO questions(question, status, source) VALUES(?, ?, ?)', (question, 'open', source))
-                return cur.lastrowid
+    def add_question(self, question: str, source: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO questions(question, status, source) VALUES(?, ?, ?)', (question, 'open', source), deferred=deferred)
 
     @with_retry
     def update_question(self, id: int, answer: Optional[str] = None, status: Optional[str] = None):
-        with self._write_lock:
-            with self._transaction() as cur:
-                if answer is not None and status is not None:
-                    cur.execute('UPDATE questions SET answer = ?, status = ? WHERE id = ?', (answer, status, id))
-                elif answer is not None:
-                    cur.execute('UPDATE questions SET answer = ? WHERE id = ?', (answer, id))
-                elif status is not None:
-                    cur.execute('UPDATE questions SET status = ? WHERE id = ?', (status, id))
+        if answer is not None and status is not None:
+            self._write('UPDATE questions SET answer = ?, status = ? WHERE id = ?', (answer, status, id))
+        elif answer is not None:
+            self._write('UPDATE questions SET answer = ? WHERE id = ?', (answer, id))
+        elif status is not None:
+            self._write('UPDATE questions SET status = ? WHERE id = ?', (status, id))
 
     # Goals
     @with_retry
-    def add_goal(self, goal: str, priority: int = 1) -> int:
+    def add_goal(self, goal: str, priority: int = 1, deferred: bool = False) -> int:
         now = datetime.utcnow().isoformat()
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO goals(goal, priority, status, created_on, updated_on) VALUES(?, ?, ?, ?, ?)', (goal, priority, 'open', now, now))
-                return cur.lastrowid
+        return self._write('INSERT INTO goals(goal, priority, status, created_on, updated_on) VALUES(?, ?, ?, ?, ?)', (goal, priority, 'open', now, now), deferred=deferred)
 
     @with_retry
     def update_goal(self, id: int, status: str):
         now = datetime.utcnow().isoformat()
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('UPDATE goals SET status = ?, updated_on = ? WHERE id = ?', (status, now, id))
+        self._write('UPDATE goals SET status = ?, updated_on = ? WHERE id = ?', (status, now, id))
 
     def list_goals(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM goals ORDER BY created_on DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM goals ORDER BY created_on DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Tasks
     @with_retry
-    def add_task(self, task: str, context: Optional[str] = None, due_date: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO tasks(task, context, status, due_date) VALUES(?, ?, ?, ?)', (task, context, 'open', due_date))
-                return cur.lastrowid
+    def add_task(self, task: str, context: Optional[str] = None, due_date: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO tasks(task, context, status, due_date) VALUES(?, ?, ?, ?)', (task, context, 'open', due_date), deferred=deferred)
 
     @with_retry
     def update_task(self, id: int, status: Optional[str] = None):
-        with self._write_lock:
-            with self._transaction() as cur:
-                if status is not None:
-                    if status.lower() in ('completed', 'done'):
-                        now = datetime.utcnow().isoformat()
-                        cur.execute('UPDATE tasks SET status = ?, completed_on = ? WHERE id = ?', (status, now, id))
-                    else:
-                        cur.execute('UPDATE tasks SET status = ? WHERE id = ?', (status, id))
+        if status is not None:
+            if status.lower() in ('completed', 'done'):
+                now = datetime.utcnow().isoformat()
+                self._write('UPDATE tasks SET status = ?, completed_on = ? WHERE id = ?', (status, now, id))
+            else:
+                self._write('UPDATE tasks SET status = ? WHERE id = ?', (status, id))
 
     def list_tasks(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM tasks ORDER BY due_date IS NULL, due_date ASC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM tasks ORDER BY due_date IS NULL, due_date ASC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Skills
     @with_retry
-    def add_skill(self, skill: str, proficiency: int = 1, practice_notes: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO skills(skill, proficiency, practice_notes, last_practiced) VALUES(?, ?, ?, ?)', (skill, proficiency, practice_notes, datetime.utcnow().isoformat()))
-                return cur.lastrowid
+    def add_skill(self, skill: str, proficiency: int = 1, practice_notes: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO skills(skill, proficiency, practice_notes, last_practiced) VALUES(?, ?, ?, ?)', (skill, proficiency, practice_notes, datetime.utcnow().isoformat()), deferred=deferred)
 
     @with_retry
     def update_skill(self, id: int, proficiency: int):
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('UPDATE skills SET proficiency = ?, last_practiced = ? WHERE id = ?', (proficiency, datetime.utcnow().isoformat(), id))
+        self._write('UPDATE skills SET proficiency = ?, last_practiced = ? WHERE id = ?', (proficiency, datetime.utcnow().isoformat(), id))
 
     def list_skills(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM skills ORDER BY last_practiced DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM skills ORDER BY last_practiced DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Facts
     @with_retry
-    def add_fact(self, subject: str, predicate: str, object: str, source: Optional[str] = None) -> int:
+    def add_fact(self, subject: str, predicate: str, object: str, source: Optional[str] = None, deferred: bool = False) -> int:
         if subject is None:
             raise AureliaError('subject required')
         if object is None:
             object = ''
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO facts(subject, predicate, object, source) VALUES(?, ?, ?, ?)', (subject, predicate, object, source))
-                return cur.lastrowid
+        return self._write('INSERT INTO facts(subject, predicate, object, source) VALUES(?, ?, ?, ?)', (subject, predicate, object, source), deferred=deferred)
 
     def get_facts(self, subject: Optional[str] = None) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        if subject:
-            cur.execute('SELECT * FROM facts WHERE subject = ? ORDER BY timestamp DESC', (subject,))
-        else:
-            cur.execute('SELECT * FROM facts ORDER BY timestamp DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            if subject:
+                cur.execute('SELECT * FROM facts WHERE subject = ? ORDER BY timestamp DESC', (subject,))
+            else:
+                cur.execute('SELECT * FROM facts ORDER BY timestamp DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Concepts
     @with_retry
-    def add_concept(self, concept: str, description: Optional[str] = None, related_terms: Optional[str] = None) -> int:
+    def add_concept(self, concept: str, description: Optional[str] = None, related_terms: Optional[str] = None, deferred: bool = False) -> int:
         if not concept:
             raise AureliaError('concept required')
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO concepts(concept, description, related_terms) VALUES(?, ?, ?)', (concept, description, related_terms))
-                return cur.lastrowid
+        return self._write('INSERT INTO concepts(concept, description, related_terms) VALUES(?, ?, ?)', (concept, description, related_terms), deferred=deferred)
 
     def get_concepts(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM concepts ORDER BY learned_on DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM concepts ORDER BY learned_on DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     @with_retry
-    def link_concepts(self, concept_a: str, concept_b: str, relation_type: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO knowledge_links(concept_a, concept_b, relation_type) VALUES(?, ?, ?)', (concept_a, concept_b, relation_type))
-                return cur.lastrowid
+    def link_concepts(self, concept_a: str, concept_b: str, relation_type: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO knowledge_links(concept_a, concept_b, relation_type) VALUES(?, ?, ?)', (concept_a, concept_b, relation_type), deferred=deferred)
 
     def get_links(self, concept: str) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM knowledge_links WHERE concept_a = ? OR concept_b = ?', (concept, concept))
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM knowledge_links WHERE concept_a = ? OR concept_b = ?', (concept, concept))
+            return [dict(r) for r in cur.fetchall()]
 
     # System logs
     @with_retry
-    def log_event(self, event: str, details: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO system_logs(event, details) VALUES(?, ?)', (event, details))
-                return cur.lastrowid
+    def log_event(self, event: str, details: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO system_logs(event, details) VALUES(?, ?)', (event, details), deferred=deferred)
 
     def get_logs(self, limit: int = 100) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM system_logs ORDER BY timestamp DESC LIMIT ?', (limit,))
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM system_logs ORDER BY timestamp DESC LIMIT ?', (limit,))
+            return [dict(r) for r in cur.fetchall()]
 
     # Errors
     @with_retry
-    def log_error(self, error_text: str, context: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO errors(error_text, context) VALUES(?, ?)', (error_text, context))
-                return cur.lastrowid
+    def log_error(self, error_text: str, context: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO errors(error_text, context) VALUES(?, ?)', (error_text, context), deferred=deferred)
 
     @with_retry
     def resolve_error(self, id: int):
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('UPDATE errors SET resolved = 1 WHERE id = ?', (id,))
+        self._write('UPDATE errors SET resolved = 1 WHERE id = ?', (id,))
 
     def get_errors(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM errors ORDER BY timestamp DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM errors ORDER BY timestamp DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Updates
     @with_retry
-    def record_update(self, change: str, reason: Optional[str] = None) -> int:
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT INTO updates(change, reason) VALUES(?, ?)', (change, reason))
-                return cur.lastrowid
+    def record_update(self, change: str, reason: Optional[str] = None, deferred: bool = False) -> int:
+        return self._write('INSERT INTO updates(change, reason) VALUES(?, ?)', (change, reason), deferred=deferred)
 
     def get_updates(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM updates ORDER BY timestamp DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM updates ORDER BY timestamp DESC')
+            return [dict(r) for r in cur.fetchall()]
+
+    # Bulk inserts
+    @with_retry
+    def _bulk_insert(self, sql: str, rows: List[tuple]) -> int:
+        """executemany `rows` in one transaction.
+
+        The FTS sync triggers stay in place, so the index is updated row by row
+        inside the same commit (upserts fire the update triggers).
+        """
+        if not rows:
+            return 0
+        # keep ordering with anything still sitting in the group-commit queue
+        self.flush()
+        with self._write_lock:
+            with self._transaction() as cur:
+                cur.executemany(sql, rows)
+        return len(rows)
+
+    @staticmethod
+    def _normalize_rows(rows, columns: Tuple[str, ...], defaults: Dict[str, Any]) -> List[tuple]:
+        out = []
+        for r in rows:
+            if isinstance(r, dict):
+                out.append(tuple(r.get(c, defaults.get(c)) for c in columns))
+            else:
+                r = tuple(r)
+                out.append(r + tuple(defaults.get(c) for c in columns[len(r):]))
+        return out
+
+    def add_memories_many(self, rows) -> int:
+        """Insert many memories in one transaction.
+
+        Rows are dicts or (type, content[, emotion[, importance]]) tuples.
+        Returns the number of rows inserted.
+        """
+        cols = ('type', 'content', 'emotion', 'importance')
+        norm = []
+        for type_, content, emotion, importance in self._normalize_rows(rows, cols, {'importance': 1}):
+            content = content or ''
+            if len(content.encode('utf-8')) > MAX_CONTENT_BYTES:
+                content = content.encode('utf-8')[:MAX_CONTENT_BYTES].decode('utf-8', errors='ignore')
+            norm.append((type_, content, emotion, importance if importance is not None else 1))
+        return self._bulk_insert('INSERT INTO memories(type, content, emotion, importance) VALUES(?, ?, ?, ?)', norm)
+
+    def add_facts_many(self, rows) -> int:
+        """Insert many facts; rows are dicts or (subject, predicate, object[, source]) tuples."""
+        norm = []
+        for subject, predicate, object_, source in self._normalize_rows(rows, ('subject', 'predicate', 'object', 'source'), {}):
+            if subject is None:
+                raise AureliaError('subject required')
+            norm.append((subject, predicate, object_ if object_ is not None else '', source))
+        return self._bulk_insert('INSERT INTO facts(subject, predicate, object, source) VALUES(?, ?, ?, ?)', norm)
+
+    def add_vocab_many(self, rows) -> int:
+        """Insert or replace many words; rows are dicts or (word, definition[, examples]) tuples."""
+        norm = self._normalize_rows(rows, ('word', 'definition', 'examples'), {})
+        if any(not r[0] for r in norm):
+            raise AureliaError('word required')
+        count = self._bulk_insert(_VOCAB_UPSERT, norm)
+        self._remember_words([r[0] for r in norm])
+        return count
+
+    def add_concepts_many(self, rows) -> int:
+        """Insert many concepts; rows are dicts or (concept, description[, related_terms]) tuples."""
+        norm = self._normalize_rows(rows, ('concept', 'description', 'related_terms'), {})
+        if any(not r[0] for r in norm):
+            raise AureliaError('concept required')
+        return self._bulk_insert('INSERT INTO concepts(concept, description, related_terms) VALUES(?, ?, ?)', norm)
+
+    def add_emotions_many(self, rows) -> int:
+        """Insert many emotions; rows are dicts or (emotion[, intensity[, trigger]]) tuples."""
+        norm = self._normalize_rows(rows, ('emotion', 'intensity', 'trigger'), {'intensity': 1})
+        return self._bulk_insert('INSERT INTO emotions(emotion, intensity, trigger) VALUES(?, ?, ?)', norm)
+
+    def add_reflections_many(self, rows) -> int:
+        """Insert many reflections; rows are dicts or (thought[, tone[, cause]]) tuples."""
+        norm = self._normalize_rows(rows, ('thought', 'tone', 'cause'), {})
+        return self._bulk_insert('INSERT INTO reflections(thought, tone, cause) VALUES(?, ?, ?)', norm)
+
+    def store_identities_many(self, items) -> int:
+        """Store many identity key/values (dict or iterable of pairs) in one transaction."""
+        pairs = items.items() if isinstance(items, dict) else items
+        norm = []
+        for key, value in pairs:
+            if not key:
+                raise AureliaError('identity key required')
+            norm.append((key, '' if value is None else str(value)))
+        return self._bulk_insert('REPLACE INTO identity(key, value) VALUES(?, ?)', norm)
 
     # Crawling (parent-gated)
     def _sanitize_url(self, url: str) -> str:
@@ -832,8 +1405,11 @@ class MemoryManager:
             raise AureliaError('unsupported url scheme')
         return url
 
-    @with_retry
     def crawl_url(self, url: str, approved_by: str) -> Dict[str, Any]:
+        return self._store_crawl(self._fetch_crawl(url, approved_by))
+
+    def _fetch_crawl(self, url: str, approved_by: str) -> Dict[str, Any]:
+        """Network and parsing half of crawl_url; touches no tables."""
         if approved_by not in ('Father', 'Mother'):
             raise AureliaError('crawl must be approved by Father or Mother')
         url = self._sanitize_url(url)
@@ -870,21 +1446,8 @@ class MemoryManager:
         links = parser.get_links()
         links_json = json.dumps(links, ensure_ascii=False)
 
-        # store crawl
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('INSERT OR REPLACE INTO crawls(url, title, content, links, approved_by) VALUES(?, ?, ?, ?, ?)', (url, title, content, links_json, approved_by))
-                # get id
-                cur.execute('SELECT id, crawled_on FROM crawls WHERE url = ?', (url,))
-                row = cur.fetchone()
-                crawled_on = row['crawled_on'] if row else datetime.utcnow().isoformat()
-
         # derived knowledge
         first_200 = content[:200]
-        try:
-            self.add_fact(url, 'contains_text', first_200, source=url)
-        except Exception:
-            pass
 
         # summary: naive first 1-2 sentences
         summary = ''
@@ -905,51 +1468,68 @@ class MemoryManager:
         related = ','.join(h for h, _ in top_hosts)
         try:
             concept_name = title or urlparse(url).hostname or url
-            self.add_concept(concept_name, description=summary, related_terms=related)
-        except Exception:
-            pass
-
-        try:
-            self.log_event('crawl', f'url={url}; title={title}')
         except Exception:
-            pass
+            concept_name = url
+        return {'url': url, 'title': title, 'content': content, 'links': links, 'links_json': links_json,
+                'approved_by': approved_by, 'first_200': first_200, 'summary': summary,
+                'related': related, 'concept_name': concept_name}
 
-        return {'url': url, 'title': title, 'words': len(content.split()), 'links_count': len(links), 'crawled_on': crawled_on}
+    @with_retry
+    def _store_crawl(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Write a page from _fetch_crawl: crawl plus derived fact, concept and log row in one transaction."""
+        url, title, content = page['url'], page['title'], page['content']
+        self._write_unit([
+            (_CRAWL_UPSERT, (url, title, content, page['links_json'], page['approved_by'])),
+            ('INSERT INTO facts(subject, predicate, object, source) VALUES(?, ?, ?, ?)', (url, 'contains_text', page['first_200'], url)),
+            ('INSERT INTO concepts(concept, description, related_terms) VALUES(?, ?, ?)', (page['concept_name'], page['summary'], page['related'])),
+            ('INSERT INTO system_logs(event, details) VALUES(?, ?)', ('crawl', f'url={url}; title={title}')),
+        ])
+        row = self.get_crawl_by_url(url)
+        crawled_on = row['crawled_on'] if row else datetime.utcnow().isoformat()
+
+        return {'url': url, 'title': title, 'words': len(content.split()), 'links_count': len(page['links']), 'crawled_on': crawled_on}
 
     def get_crawl_by_url(self, url: str) -> Optional[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM crawls WHERE url = ?', (url,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM crawls WHERE url = ?', (url,))
+            row = cur.fetchone()
+            return dict(row) if row else None
 
     def get_crawls(self, limit: int = 50) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT * FROM crawls ORDER BY crawled_on DESC LIMIT ?', (limit,))
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM crawls ORDER BY crawled_on DESC LIMIT ?', (limit,))
+            return [dict(r) for r in cur.fetchall()]
 
     # API keys
     @with_retry
     def add_api_key(self, service: str, key: str):
         if not service or not key:
             raise AureliaError('service and key required')
-        with self._write_lock:
-            with self._transaction() as cur:
-                cur.execute('REPLACE INTO api_keys(service, key) VALUES(?, ?)', (service, key))
+        self._write('REPLACE INTO api_keys(service, key) VALUES(?, ?)', (service, key))
 
     def get_api_key(self, service: str) -> Optional[str]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT key FROM api_keys WHERE service = ?', (service,))
-        row = cur.fetchone()
-        return row['key'] if row else None
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT key FROM api_keys WHERE service = ?', (service,))
+            row = cur.fetchone()
+            return row['key'] if row else None
 
     def list_api_keys(self) -> List[Dict[str, Any]]:
-        cur = self._conn.cursor()
-        cur.execute('SELECT service, added_on FROM api_keys ORDER BY added_on DESC')
-        return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT service, added_on FROM api_keys ORDER BY added_on DESC')
+            return [dict(r) for r in cur.fetchall()]
 
     # Code generation (self-coding) - no auto-exec
-    @with_retry
     def generate_code(self, prompt: str, service: str = 'gpt-5-mini', filename_prefix: str = 'gen') -> Dict[str, Any]:
+        result = self._request_code(prompt, service, filename_prefix)
+        self._record_codegen(result)
+        return result
+
+    def _request_code(self, prompt: str, service: str = 'gpt-5-mini', filename_prefix: str = 'gen') -> Dict[str, Any]:
+        """Network and file half of generate_code; only reads the api key."""
         if not prompt:
             raise AureliaError('prompt required')
         key = self.get_api_key(service)
@@ -1046,15 +1626,16 @@ class MemoryManager:
         except Exception as e:
             raise AureliaError(f'failed saving code: {e}')
 
+        size = os.path.getsize(path)
+        return {'service': service, 'file_path': path, 'bytes': size, 'created_on': created_on}
+
+    def _record_codegen(self, result: Dict[str, Any]):
         try:
             self.record_update('code_generated', 'self-code')
-            self.log_event('codegen', f'service={service}; file={path}')
+            self.log_event('codegen', f"service={result['service']}; file={result['file_path']}")
         except Exception:
             pass
 
-        size = os.path.getsize(path)
-        return {'service': service, 'file_path': path, 'bytes': size, 'created_on': created_on}
-
     def list_generated_code(self, limit: int = 20) -> List[Dict[str, Any]]:
         gen_dir = os.path.join(os.getcwd(), 'generated')
         if not os.path.exists(gen_dir):
@@ -1074,39 +1655,340 @@ class MemoryManager:
     def search_memories(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         if not query:
             return []
-        try:
-            cur = self._conn.cursor()
-            cur.execute("SELECT memories.* FROM fts_memories JOIN memories ON fts_memories.rowid = memories.id WHERE fts_memories MATCH ? LIMIT ?", (query, limit))
-            return [dict(r) for r in cur.fetchall()]
-        except Exception:
-            # fallback to LIKE search
-            cur = self._conn.cursor()
-            cur.execute("SELECT * FROM memories WHERE content LIKE ? LIMIT ?", (f"%{query}%", limit))
-            return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT memories.* FROM fts_memories JOIN memories ON fts_memories.rowid = memories.id WHERE fts_memories MATCH ? ORDER BY fts_memories.rank LIMIT ?", (query, limit))
+                return [dict(r) for r in cur.fetchall()]
+            except Exception:
+                # fallback to LIKE search
+                cur = conn.cursor()
+                cur.execute("SELECT * FROM memories WHERE content LIKE ? LIMIT ?", (f"%{query}%", limit))
+                return [dict(r) for r in cur.fetchall()]
 
     def search_crawls(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         if not query:
             return []
-        try:
-            cur = self._conn.cursor()
-            cur.execute("SELECT crawls.* FROM fts_crawls JOIN crawls ON fts_crawls.rowid = crawls.id WHERE fts_crawls MATCH ? LIMIT ?", (query, limit))
-            return [dict(r) for r in cur.fetchall()]
-        except Exception:
-            cur = self._conn.cursor()
-            cur.execute("SELECT * FROM crawls WHERE content LIKE ? OR title LIKE ? LIMIT ?", (f"%{query}%", f"%{query}%", limit))
-            return [dict(r) for r in cur.fetchall()]
+        with self._reader() as conn:
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT crawls.* FROM fts_crawls JOIN crawls ON fts_crawls.rowid = crawls.id WHERE fts_crawls MATCH ? ORDER BY fts_crawls.rank LIMIT ?", (query, limit))
+                return [dict(r) for r in cur.fetchall()]
+            except Exception:
+                cur = conn.cursor()
+                cur.execute("SELECT * FROM crawls WHERE content LIKE ? OR title LIKE ? LIMIT ?", (f"%{query}%", f"%{query}%", limit))
+                return [dict(r) for r in cur.fetchall()]
 
     def search_vocab(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         if not query:
             return []
+        with self._reader() as conn:
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT vocab.* FROM fts_vocab JOIN vocab ON fts_vocab.rowid = vocab.rowid WHERE fts_vocab MATCH ? ORDER BY fts_vocab.rank LIMIT ?", (query, limit))
+                return [dict(r) for r in cur.fetchall()]
+            except Exception:
+                cur = conn.cursor()
+                cur.execute("SELECT * FROM vocab WHERE definition LIKE ? OR word LIKE ? LIMIT ?", (f"%{query}%", f"%{query}%", limit))
+                return [dict(r) for r in cur.fetchall()]
+
+    @staticmethod
+    def fts_query(text: str) -> str:
+        """Turn free text into an FTS5 query matching any of its words."""
+        tokens = dict.fromkeys(t.lower() for t in _FTS_TOKEN_RE.findall(text or ''))
+        return ' OR '.join(f'"{t}"' for t in tokens)
+
+    def search_bm25(self, source: str, query: str, limit: int = 20, snippet_tokens: int = 0,
+                    highlight: Tuple[str, str] = ('[', ']')) -> List[Dict[str, Any]]:
+        """Rows of `source` ('memories', 'crawls', 'vocab', 'facts') matching any word of `query`, best first.
+
+        Each row carries `_rowid` and `_bm25` (FTS5 bm25(); lower is better),
+        plus `_snippet` (best-matching fragment, matches wrapped in `highlight`)
+        when `snippet_tokens` > 0. Returns [] when FTS5 is unavailable.
+        """
+        fts, table, key = _FTS_SOURCES[source]
+        match = self.fts_query(query)
+        if not match:
+            return []
+        snippet = ''
+        params: List[Any] = []
+        if snippet_tokens > 0:
+            snippet = f", snippet({fts}, -1, ?, ?, '…', ?) AS _snippet"
+            params += [highlight[0], highlight[1], min(int(snippet_tokens), 64)]
+        with self._reader() as conn:
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    f"SELECT {table}.*, {fts}.rowid AS _rowid, bm25({fts}) AS _bm25{snippet} FROM {fts} "
+                    f"JOIN {table} ON {fts}.rowid = {table}.{key} WHERE {fts} MATCH ? ORDER BY _bm25 LIMIT ?",
+                    params + [match, limit],
+                )
+                return [dict(r) for r in cur.fetchall()]
+            except sqlite3.OperationalError:
+                return []
+
+    def search(self, query: str, sources: Optional[List[str]] = None, k: int = 10, semantic: bool = True,
+               snippet_tokens: int = 16, highlight: Tuple[str, str] = ('[', ']')) -> List[Dict[str, Any]]:
+        """Hybrid search over memories, crawls, vocab and facts, best first.
+
+        The bm25() ranking of each source and, when embeddings are enabled and
+        `semantic` is set, the vector ranking are fused with reciprocal-rank
+        fusion: score = sum(1 / (RRF_K + rank)). Each hit is
+        {'source', 'id', 'score', 'bm25', 'bm25_rank', 'similarity',
+        'vector_rank', 'snippet', 'row'}; `snippet` is the FTS5 snippet() of
+        the best-matching column, or the start of the row text for hits found
+        only by meaning.
+        """
+        if not query:
+            return []
+        sources = [s for s in (sources or list(_FTS_SOURCES)) if s in _FTS_SOURCES]
+        # each ranked list contributes its top `depth` entries
+        depth = max(k * 3, 20)
+        hits: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+
+        def hit(source, rid, row):
+            h = hits.get((source, rid))
+            if h is None:
+                h = hits[(source, rid)] = {'source': source, 'id': rid, 'score': 0.0, 'bm25': None, 'bm25_rank': None,
+                                           'similarity': None, 'vector_rank': None, 'snippet': None, 'row': row}
+            return h
+
+        for source in sources:
+            for rank, row in enumerate(self.search_bm25(source, query, depth, snippet_tokens, highlight), 1):
+                h = hit(source, row.pop('_rowid'), row)
+                h['bm25'], h['bm25_rank'], h['snippet'] = row.pop('_bm25'), rank, row.pop('_snippet', None)
+                h['score'] += 1.0 / (RRF_K + rank)
+        if semantic and self.vector_index() is not None:
+            for rank, v in enumerate(self.search_semantic(query, k=depth, sources=sources), 1):
+                v['row'].pop('_rowid', None)
+                h = hit(v['source'], v['id'], v['row'])
+                h['similarity'], h['vector_rank'] = v['similarity'], rank
+                h['score'] += 1.0 / (RRF_K + rank)
+                if h['snippet'] is None:
+                    h['snippet'] = ' '.join(memory_vectors.row_text(v['source'], v['row']).split()[:snippet_tokens or 16])
+        ranked = sorted(hits.values(), key=lambda h: h['score'], reverse=True)[:k]
+        for h in ranked:
+            h['score'] = round(h['score'], 6)
+        return ranked
+
+    # Semantic (vector) search
+    def set_embedder(self, embedder):
+        """Use `embedder` (anything with `name` and `embed(texts)`) for semantic search."""
+        with self._lock:
+            self._vectors = memory_vectors.VectorIndex(self.db_path, embedder) if embedder is not None else None
+            self._vectors_off = embedder is None
+            self._apply_vector_tracking(embedder is not None)
+
+    def vector_index(self) -> Optional['memory_vectors.VectorIndex']:
+        """The vector index next to the database, or None when embeddings are off."""
+        if self._vectors is None and not self._vectors_off:
+            with self._lock:
+                if self._vectors is None and not self._vectors_off:
+                    embedder = memory_vectors.make_embedder()
+                    if embedder is None:
+                        # configured but unavailable: stop logging changes
+                        self._vectors_off = True
+                        self._apply_vector_tracking(False)
+                    else:
+                        self._vectors = memory_vectors.VectorIndex(self.db_path, embedder)
+        return self._vectors
+
+    def sync_vectors(self, batch_size: int = 64, max_rows: Optional[int] = None) -> int:
+        """Embed rows added since the last sync (per-source rowid watermark).
+
+        Rows updated or deleted since they were embedded (logged by the
+        `vector_dirty` triggers) are re-embedded or dropped first. Returns the
+        number of vectors appended.
+        """
+        index = self.vector_index()
+        if index is None:
+            return 0
+        added = 0
+        with self._vector_sync_lock:
+            added += self._sync_dirty_vectors(index, batch_size)
+            for source, (_, table, key) in _FTS_SOURCES.items():
+                while max_rows is None or added < max_rows:
+                    with self._reader() as conn:
+                        cur = conn.cursor()
+                        cur.execute(f'SELECT {key} AS _rowid, * FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?',
+                                    (index.watermarks.get(source, 0), batch_size))
+                        rows = [dict(r) for r in cur.fetchall()]
+                    if not rows:
+                        break
+                    added += index.add(source, [r['_rowid'] for r in rows], [memory_vectors.row_text(source, r) for r in rows])
+        return added
+
+    def _sync_dirty_vectors(self, index, batch_size: int) -> int:
+        # caller holds _vector_sync_lock
+        added = 0
+        with self._reader() as conn:
+            if not conn.execute('SELECT 1 FROM vector_dirty LIMIT 1').fetchone():
+                return added
+        # rows past the watermark are picked up by the normal pass
+        self._write_unit([('DELETE FROM vector_dirty WHERE source = ? AND rid > ?', (source, index.watermarks.get(source, 0)))
+                          for source in _FTS_SOURCES])
+        while True:
+            with self._reader() as conn:
+                cur = conn.cursor()
+                cur.execute('SELECT id, source, rid FROM vector_dirty ORDER BY id LIMIT ?', (batch_size,))
+                dirty = cur.fetchall()
+            if not dirty:
+                return added
+            by_source: Dict[str, set] = {}
+            for _, source, rid in dirty:
+                if source in _FTS_SOURCES and rid <= index.watermarks.get(source, 0):
+                    by_source.setdefault(source, set()).add(rid)
+            for source, rids in by_source.items():
+                _, table, key = _FTS_SOURCES[source]
+                with self._reader() as conn:
+                    cur = conn.cursor()
+                    cur.execute(f"SELECT {key} AS _rowid, * FROM {table} WHERE {key} IN ({','.join('?' * len(rids))})", list(rids))
+                    rows = [dict(r) for r in cur.fetchall()]
+                index.remove(source, rids - {r['_rowid'] for r in rows})
+                added += index.add(source, [r['_rowid'] for r in rows], [memory_vectors.row_text(source, r) for r in rows])
+            self._write('DELETE FROM vector_dirty WHERE id <= ?', (dirty[-1][0],))
+
+    def start_vector_sync(self, interval_s: float = 30.0):
+        """Keep the vector index caught up from a background thread.
+
+        The thread syncs every `interval_s` seconds, and sooner when
+        `search_semantic` wakes it.
+        """
+        with self._lock:
+            if self._vector_thread is not None:
+                return
+            self._vector_stop.clear()
+
+            def run():
+                while not self._vector_stop.is_set():
+                    self._vector_wake.wait(interval_s)
+                    self._vector_wake.clear()
+                    if self._vector_stop.is_set():
+                        break
+                    try:
+                        self.sync_vectors()
+                    except Exception as e:
+                        print(f'[MemoryManager] vector sync failed: {e}')
+
+            self._vector_thread = threading.Thread(target=run, name='aurelia-vector-sync', daemon=True)
+            self._vector_thread.start()
+
+    def stop_vector_sync(self):
+        thread, self._vector_thread = getattr(self, '_vector_thread', None), None
+        if thread is not None:
+            self._vector_stop.set()
+            self._vector_wake.set()
+            thread.join(timeout=5)
+
+    def search_semantic(self, query: str, k: int = 10, sources: Optional[List[str]] = None,
+                        catch_up: bool = True) -> List[Dict[str, Any]]:
+        """Rows most similar in meaning to `query`, best first.
+
+        Each hit is {'source', 'id', 'similarity', 'row'}. Only rows already
+        in the vector index are searched; with `catch_up` the background
+        sync (started on first use) is woken to index newer rows for later
+        queries. Returns [] when embeddings are off or the embedder fails.
+        """
+        index = self.vector_index()
+        if index is None or not query:
+            return []
+        if catch_up:
+            self.start_vector_sync(float(os.environ.get('AURELIA_VECTOR_SYNC_S', '0') or 0) or 30.0)
+            self._vector_wake.set()
         try:
-            cur = self._conn.cursor()
-            cur.execute("SELECT vocab.* FROM fts_vocab JOIN vocab ON fts_vocab.rowid = vocab.rowid WHERE fts_vocab MATCH ? LIMIT ?", (query, limit))
-            return [dict(r) for r in cur.fetchall()]
-        except Exception:
-            cur = self._conn.cursor()
-            cur.execute("SELECT * FROM vocab WHERE definition LIKE ? OR word LIKE ? LIMIT ?", (f"%{query}%", f"%{query}%", limit))
-            return [dict(r) for r in cur.fetchall()]
+            hits = index.search(query, k=k, sources=sources)
+        except Exception as e:
+            print(f'[MemoryManager] semantic search failed: {e}')
+            return []
+        by_source: Dict[str, List[int]] = {}
+        for source, rid, _ in hits:
+            by_source.setdefault(source, []).append(rid)
+        rows: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        with self._reader() as conn:
+            cur = conn.cursor()
+            for source, rids in by_source.items():
+                _, table, key = _FTS_SOURCES[source]
+                cur.execute(f"SELECT {key} AS _rowid, * FROM {table} WHERE {key} IN ({','.join('?' * len(rids))})", rids)
+                for r in cur.fetchall():
+                    rows[(source, r['_rowid'])] = dict(r)
+        # rows deleted since they were embedded are skipped
+        return [{'source': s, 'id': rid, 'similarity': sim, 'row': rows[(s, rid)]}
+                for s, rid, sim in hits if (s, rid) in rows]
+
+
+class AsyncMemoryManager:
+    """Awaitable facade over `MemoryManager` for asyncio code (FastAPI handlers).
+
+    Every public MemoryManager method is exposed as a coroutine. Writes run on a
+    dedicated single-thread executor (there is only one writer connection
+    anyway), reads run on a separate pool of `readers` threads backed by the
+    manager's read-only connection pool, so slow disk I/O never blocks the
+    event loop and concurrent requests do not queue behind each other's reads.
+    `run_read` / `run_write` run arbitrary blocking callables the same way.
+    """
+
+    _READ_PREFIXES = ('get_', 'list_', 'search_')
+    # read-only methods the prefixes do not catch; anything else is a write
+    _READ_METHODS = {'search', 'fts_query', 'knows_word', 'vocab_words', 'pool_stats', 'write_queue_stats'}
+
+    def __init__(self, mm: Optional[MemoryManager] = None, readers: int = 4, **kwargs):
+        if mm is None:
+            kwargs.setdefault('read_pool_size', readers)
+            mm = MemoryManager(**kwargs)
+            self._owns_mm = True
+        else:
+            self._owns_mm = False
+        self.mm = mm
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aurelia-db-writer')
+        self._readers = ThreadPoolExecutor(max_workers=max(1, int(readers)), thread_name_prefix='aurelia-db-reader')
+
+    async def run_read(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, functools.partial(fn, *args, **kwargs))
+
+    async def run_write(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, functools.partial(fn, *args, **kwargs))
+
+    def _is_read(self, name: str) -> bool:
+        return name.startswith(self._READ_PREFIXES) or name in self._READ_METHODS
+
+    # Network-bound calls: the request runs on the reader pool so it does not
+    # hold up the writer thread; the rows it produces are written on the writer.
+    async def crawl_url(self, url: str, approved_by: str) -> Dict[str, Any]:
+        page = await self.run_read(self.mm._fetch_crawl, url, approved_by)
+        return await self.run_write(self.mm._store_crawl, page)
+
+    async def generate_code(self, prompt: str, service: str = 'gpt-5-mini', filename_prefix: str = 'gen') -> Dict[str, Any]:
+        result = await self.run_read(self.mm._request_code, prompt, service, filename_prefix)
+        await self.run_write(self.mm._record_codegen, result)
+        return result
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.mm, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        runner = self.run_read if self._is_read(name) else self.run_write
+
+        async def call(*args, **kwargs):
+            return await runner(attr, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = attr.__doc__
+        return call
+
+    def close(self):
+        """Wait for in-flight work, then close the manager if we opened it."""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        if self._owns_mm:
+            self.mm.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,385 @@
+"""CPU vector index for semantic search over `MemoryManager` rows.
+
+Embeddings come from the configured Ollama endpoint (`/api/embed`, falling back
+to `/api/embeddings`) or from a local sentence-transformers model. Vectors are
+L2-normalised and stored next to the database (e.g. aurelia_memory.db):
+
+- aurelia_memory.vec.f32   float32 matrix, one row per vector, memory-mapped for search
+- aurelia_memory.vec.ids   int64 (source, rowid) pairs in the same order
+- aurelia_memory.vec.json  dimension, model, row count and per-source rowid watermarks
+
+New vectors are appended to the end of the files; the row count in the JSON
+file is written last, so a torn append is discarded on the next load. Vectors
+are keyed on (source, rowid); vocab and crawls are written with upserts, so
+a word or url keeps its rowid. When a row is embedded again after an update
+its older vector is masked out, and rows deleted from the database are
+tombstoned (`remove`, recorded in the JSON file) until they are re-added.
+
+Search is a NumPy brute-force dot product by default. AURELIA_VECTOR_INDEX=ivf
+adds an inverted-file index (spherical k-means, `nprobe` lists scanned), and
+=hnsw uses hnswlib when it is installed (rebuilt in memory on load).
+
+Env: AURELIA_EMBED_BACKEND (off | ollama | local), AURELIA_EMBED_MODEL,
+AURELIA_VECTOR_INDEX (flat), AURELIA_VECTOR_NPROBE (8).
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import hnswlib
+except Exception:
+    hnswlib = None
+
+EMBED_BACKEND = os.environ.get('AURELIA_EMBED_BACKEND', 'off').lower()
+EMBED_MODEL = os.environ.get('AURELIA_EMBED_MODEL', '')
+INDEX_TYPE = os.environ.get('AURELIA_VECTOR_INDEX', 'flat').lower()
+NPROBE = int(os.environ.get('AURELIA_VECTOR_NPROBE', '8'))
+# below this many vectors brute force is as fast as any index
+IVF_MIN_ROWS = 20000
+
+SOURCE_CODES = {'memories': 0, 'crawls': 1, 'facts': 2, 'vocab': 3}
+SOURCE_NAMES = {v: k for k, v in SOURCE_CODES.items()}
+
+
+def _provider_base() -> str:
+    try:
+        from gateway import providers
+        base = providers.get_base_url()
+    except Exception:
+        base = os.environ.get('OLLAMA_BASE_URL', 'http://127.0.0.1:11434')
+    base = base.rstrip('/')
+    return base[:-3] if base.endswith('/v1') else base
+
+
+def row_text(source: str, row: Dict[str, Any]) -> str:
+    """Text that gets embedded for one row of `source`."""
+    if source == 'vocab':
+        return f"{row.get('word')}: {row.get('definition') or ''} {row.get('examples') or ''}".strip()
+    if source == 'facts':
+        return ' '.join(str(row.get(c) or '') for c in ('subject', 'predicate', 'object')).strip()
+    if source == 'crawls':
+        return f"{row.get('title') or ''}\n{(row.get('content') or '')[:2000]}".strip()
+    return (row.get('content') or '')[:2000]
+
+
+class OllamaEmbedder:
+    """Embeddings from an Ollama server."""
+
+    def __init__(self, base: Optional[str] = None, model: Optional[str] = None, timeout: float = 30.0):
+        self.base = (base or _provider_base()).rstrip('/')
+        self.model = model or EMBED_MODEL or 'nomic-embed-text'
+        self.timeout = timeout
+        self._batch_api = True
+
+    @property
+    def name(self) -> str:
+        return f'ollama:{self.model}'
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        if self._batch_api:
+            r = requests.post(f'{self.base}/api/embed', json={'model': self.model, 'input': list(texts)}, timeout=self.timeout)
+            if r.status_code != 404:
+                r.raise_for_status()
+                return r.json()['embeddings']
+            # older Ollama: one prompt per request
+            self._batch_api = False
+        out = []
+        for t in texts:
+            r = requests.post(f'{self.base}/api/embeddings', json={'model': self.model, 'prompt': t}, timeout=self.timeout)
+            r.raise_for_status()
+            out.append(r.json()['embedding'])
+        return out
+
+
+class LocalEmbedder:
+    """Embeddings from a local sentence-transformers model on the CPU."""
+
+    def __init__(self, model: Optional[str] = None):
+        from sentence_transformers import SentenceTransformer
+        self.model = model or EMBED_MODEL or 'all-MiniLM-L6-v2'
+        self._st = SentenceTransformer(self.model, device='cpu')
+
+    @property
+    def name(self) -> str:
+        return f'local:{self.model}'
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return self._st.encode(list(texts), batch_size=64, convert_to_numpy=True)
+
+
+def embeddings_enabled(backend: Optional[str] = None) -> bool:
+    """Whether `backend` (default AURELIA_EMBED_BACKEND) is configured, without loading it."""
+    return (backend or EMBED_BACKEND).lower() not in ('', 'off', 'none') and np is not None
+
+
+def make_embedder(backend: Optional[str] = None):
+    """Embedder for `backend` (default AURELIA_EMBED_BACKEND), or None when off/unavailable."""
+    backend = (backend or EMBED_BACKEND).lower()
+    if backend in ('', 'off', 'none') or np is None:
+        return None
+    try:
+        if backend == 'local':
+            return LocalEmbedder()
+        if backend == 'ollama':
+            return OllamaEmbedder()
+    except Exception as e:
+        print(f'[memory_vectors] embedder {backend!r} unavailable: {e}')
+        return None
+    print(f'[memory_vectors] unknown embed backend {backend!r}')
+    return None
+
+
+class VectorIndex:
+    """Append-only float32 vector store with flat, IVF or HNSW search.
+
+    `base_path` is the database path; None (or ':memory:') keeps the vectors in RAM.
+    """
+
+    def __init__(self, base_path: Optional[str], embedder, index_type: str = INDEX_TYPE, nprobe: int = NPROBE):
+        if np is None:
+            raise RuntimeError('numpy is required for the vector index')
+        self.embedder = embedder
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        if base_path and base_path != ':memory:':
+            stem = os.path.splitext(base_path)[0]
+            self._paths = {k: f'{stem}.vec.{k}' for k in ('f32', 'ids', 'json')}
+        else:
+            self._paths = None
+        self.dim = 0
+        self.count = 0
+        self.watermarks: Dict[str, int] = {}
+        # (source code, rowid) pairs whose rows were deleted
+        self._deleted: set = set()
+        self._ids = np.zeros((0, 2), dtype=np.int64)
+        self._live = np.zeros(0, dtype=bool)
+        self._latest: Dict[Tuple[int, int], int] = {}
+        self._ram = np.zeros((0, 0), dtype=np.float32)
+        self._mmap = None
+        self._centroids = None
+        self._assign = None
+        self._hnsw = None
+        self._load()
+
+    # Storage
+    def _load(self):
+        if not self._paths or not os.path.exists(self._paths['json']):
+            return
+        try:
+            with open(self._paths['json'], 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            meta = {}
+        if meta.get('model') != self.embedder.name:
+            # different embedding space: start over
+            print(f"[memory_vectors] model changed ({meta.get('model')} -> {self.embedder.name}); reindexing")
+            for p in self._paths.values():
+                if os.path.exists(p):
+                    os.remove(p)
+            return
+        self.dim = int(meta.get('dim') or 0)
+        self.count = int(meta.get('count') or 0)
+        self.watermarks = {k: int(v) for k, v in (meta.get('watermarks') or {}).items()}
+        self._deleted = {(int(c), int(r)) for c, r in meta.get('deleted') or []}
+        # drop anything appended after the last committed count
+        for key, width in (('f32', 4 * self.dim), ('ids', 16)):
+            with open(self._paths[key], 'ab') as f:
+                f.truncate(self.count * width)
+        self._ids = np.fromfile(self._paths['ids'], dtype=np.int64).reshape(-1, 2)
+        self._live = np.ones(self.count, dtype=bool)
+        for i, (code, rid) in enumerate(self._ids.tolist()):
+            prev = self._latest.get((code, rid))
+            if prev is not None:
+                self._live[prev] = False
+            self._latest[(code, rid)] = i
+        for key in self._deleted:
+            if key in self._latest:
+                self._live[self._latest[key]] = False
+
+    def _save_meta(self):
+        if not self._paths:
+            return
+        tmp = self._paths['json'] + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.embedder.name, 'dim': self.dim, 'count': self.count, 'watermarks': self.watermarks,
+                       'deleted': sorted(self._deleted)}, f)
+        os.replace(tmp, self._paths['json'])
+
+    def matrix(self):
+        """The (count, dim) float32 matrix (a read-only memory map when file-backed)."""
+        if not self._paths:
+            return self._ram
+        if self.count == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self._mmap is None or self._mmap.shape[0] != self.count:
+            self._mmap = np.memmap(self._paths['f32'], dtype=np.float32, mode='r', shape=(self.count, self.dim))
+        return self._mmap
+
+    # Writes
+    def _normalize(self, vecs):
+        vecs = np.asarray(vecs, dtype=np.float32)
+        if vecs.ndim == 1:
+            vecs = vecs[None, :]
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vecs / norms
+
+    def add(self, source: str, rowids: Sequence[int], texts: Sequence[str]) -> int:
+        """Embed `texts` and append them as the vectors of `source` rows `rowids`."""
+        if not rowids:
+            return 0
+        vecs = self._normalize(self.embedder.embed(list(texts)))
+        return self.add_vectors(source, rowids, vecs)
+
+    def add_vectors(self, source: str, rowids: Sequence[int], vecs) -> int:
+        vecs = self._normalize(vecs)
+        code = SOURCE_CODES[source]
+        ids = np.array([(code, int(r)) for r in rowids], dtype=np.int64).reshape(-1, 2)
+        with self._lock:
+            if self.dim == 0:
+                self.dim = vecs.shape[1]
+                self._ram = np.zeros((0, self.dim), dtype=np.float32)
+            if vecs.shape[1] != self.dim:
+                raise ValueError(f'embedding dimension {vecs.shape[1]} != index dimension {self.dim}')
+            start = self.count
+            if self._paths:
+                with open(self._paths['f32'], 'ab') as f:
+                    f.write(vecs.tobytes())
+                with open(self._paths['ids'], 'ab') as f:
+                    f.write(ids.tobytes())
+            else:
+                self._ram = np.vstack([self._ram, vecs])
+            self._ids = np.vstack([self._ids, ids])
+            self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+            for i, (c, r) in enumerate(ids.tolist(), start):
+                prev = self._latest.get((c, r))
+                if prev is not None:
+                    self._live[prev] = False
+                self._latest[(c, r)] = i
+                self._deleted.discard((c, r))
+            self.count += len(ids)
+            self.watermarks[source] = max(self.watermarks.get(source, 0), int(ids[:, 1].max()))
+            self._save_meta()
+            if self._centroids is not None:
+                self._assign = np.concatenate([self._assign, np.argmax(vecs @ self._centroids.T, axis=1).astype(np.int32)])
+            if self._hnsw is not None:
+                self._hnsw.resize_index(self.count)
+                self._hnsw.add_items(vecs, np.arange(start, self.count))
+        return len(ids)
+
+    def remove(self, source: str, rowids: Iterable[int]) -> int:
+        """Tombstone the vectors of deleted `source` rows; returns how many were live."""
+        code = SOURCE_CODES[source]
+        removed = 0
+        with self._lock:
+            for r in rowids:
+                i = self._latest.get((code, int(r)))
+                if i is None:
+                    continue
+                removed += int(self._live[i])
+                self._live[i] = False
+                self._deleted.add((code, int(r)))
+            if removed:
+                self._save_meta()
+        return removed
+
+    # Indexes
+    def build_ivf(self, nlist: Optional[int] = None, iterations: int = 8, sample: int = 20000):
+        """Cluster the vectors (spherical k-means) for inverted-file search."""
+        with self._lock:
+            m = self.matrix()
+            if self.count == 0:
+                return
+            nlist = nlist or max(1, int(4 * np.sqrt(self.count)))
+            nlist = min(nlist, self.count)
+            rng = np.random.default_rng(0)
+            train = np.asarray(m[np.sort(rng.choice(self.count, min(sample, self.count), replace=False))])
+            centroids = train[rng.choice(len(train), nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assign = np.argmax(train @ centroids.T, axis=1)
+                for j in range(nlist):
+                    members = train[assign == j]
+                    if len(members):
+                        centroids[j] = members.sum(axis=0)
+                centroids = self._normalize(centroids)
+            full = np.empty(self.count, dtype=np.int32)
+            for lo in range(0, self.count, 65536):
+                full[lo:lo + 65536] = np.argmax(np.asarray(m[lo:lo + 65536]) @ centroids.T, axis=1)
+            self._centroids, self._assign = centroids, full
+
+    def build_hnsw(self, m: int = 16, ef: int = 64):
+        if hnswlib is None:
+            raise RuntimeError('hnswlib is not installed')
+        with self._lock:
+            index = hnswlib.Index(space='ip', dim=self.dim)
+            index.init_index(max_elements=max(self.count, 1), M=m, ef_construction=200)
+            if self.count:
+                index.add_items(np.asarray(self.matrix()), np.arange(self.count))
+            index.set_ef(ef)
+            self._hnsw = index
+
+    def _ensure_index(self):
+        if self.index_type == 'ivf' and self._centroids is None and self.count >= IVF_MIN_ROWS:
+            self.build_ivf()
+        elif self.index_type == 'hnsw' and self._hnsw is None and self.count and hnswlib is not None:
+            self.build_hnsw()
+
+    # Search
+    def search_vector(self, query_vec, k: int = 10, sources: Optional[Iterable[str]] = None) -> List[Tuple[str, int, float]]:
+        """Top-k (source, rowid, cosine similarity) for an embedding."""
+        q = self._normalize(query_vec)[0]
+        with self._lock:
+            if self.count == 0:
+                return []
+            self._ensure_index()
+            m = self.matrix()
+            mask = self._live
+            if sources is not None:
+                mask = mask & np.isin(self._ids[:, 0], [SOURCE_CODES[s] for s in sources])
+            if self._hnsw is not None and sources is None:
+                labels, dists = self._hnsw.knn_query(q, k=min(self.count, k * 2))
+                cand = labels[0].astype(np.int64)
+                scores = 1.0 - dists[0]
+            else:
+                if self._centroids is not None:
+                    probes = np.argsort(-(self._centroids @ q))[:self.nprobe]
+                    cand = np.nonzero(np.isin(self._assign, probes) & mask)[0]
+                else:
+                    cand = np.nonzero(mask)[0]
+                if len(cand) == self.count:
+                    scores = np.asarray(m @ q)
+                else:
+                    scores = np.asarray(m[cand] @ q)
+            keep = mask[cand]
+            cand, scores = cand[keep], scores[keep]
+            if len(cand) > k:
+                top = np.argpartition(-scores, k)[:k]
+                cand, scores = cand[top], scores[top]
+            order = np.argsort(-scores)
+            ids = self._ids[cand[order]]
+            return [(SOURCE_NAMES[int(c)], int(r), float(s)) for (c, r), s in zip(ids.tolist(), scores[order])]
+
+    def search(self, query: str, k: int = 10, sources: Optional[Iterable[str]] = None) -> List[Tuple[str, int, float]]:
+        return self.search_vector(self.embedder.embed([query])[0], k=k, sources=sources)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'model': self.embedder.name,
+            'dim': self.dim,
+            'vectors': self.count,
+            'live': int(self._live.sum()),
+            'index': 'hnsw' if self._hnsw is not None else 'ivf' if self._centroids is not None else 'flat',
+            'file_backed': bool(self._paths),
+            'watermarks': dict(self.watermarks),
+        }
@@ -36,6 +36,44 @@ def load_json_file(path):
         return None
 
 
+def _rows(label, items, build):
+    """(key, row) pairs from `build(key, value)`; keys that fail are logged and skipped."""
+    rows = []
+    for key, value in items:
+        try:
+            row = build(key, value)
+        except Exception as e:
+            print(label, 'failed', key, e)
+            continue
+        if row is not None:
+            rows.append((key, row))
+    return rows
+
+
+def _insert_many(label, many, rows):
+    """Insert `rows` in one transaction; if that fails, row by row so only the bad keys are lost."""
+    if not rows:
+        return
+    try:
+        many([row for _, row in rows])
+    except Exception:
+        for key, row in rows:
+            try:
+                many([row])
+            except Exception as e:
+                print(label, 'failed', key, e)
+
+
+def _concept_row(name, data):
+    if not name or not isinstance(data, dict):
+        raise ValueError('expected a named object')
+    return (name, data.get('definition') or data.get('description'))
+
+
+def _emotion_row(e, v):
+    return (e, int(v.get('value') if isinstance(v, dict) and v.get('value') else 1), json.dumps(v) if isinstance(v, dict) else None)
+
+
 def migrate():
     mm = MemoryManager()
     try:
@@ -44,52 +82,46 @@ def migrate():
         if os.path.exists(core_path):
             core = load_json_file(core_path)
             if isinstance(core, dict):
-                for k, v in core.items():
-                    try:
-                        mm.store_identity(k, json.dumps(v, ensure_ascii=False))
-                    except Exception as e:
-                        print('identity store failed', k, e)
+                rows = _rows('identity store', core.items(), lambda k, v: (k, json.dumps(v, ensure_ascii=False)))
+                _insert_many('identity store', mm.store_identities_many, rows)
 
                 # If concepts exist in core
                 concepts = core.get('concepts') or {}
-                for name, data in concepts.items():
-                    mm.add_concept(name, data.get('definition') or data.get('description'))
-                    mm.add_vocab(name, data.get('definition') or data.get('description'))
+                if isinstance(concepts, dict):
+                    rows = _rows('concept store', concepts.items(), _concept_row)
+                    _insert_many('concept store', mm.add_concepts_many, rows)
+                    _insert_many('concept vocab store', mm.add_vocab_many, rows)
 
         # Conversations
         conv_path = os.path.join(LEGACY_DIR, 'conversations.json')
         if os.path.exists(conv_path):
             conv = load_json_file(conv_path)
             if isinstance(conv, dict):
-                for convo_id, messages in conv.items():
-                    try:
-                        mm.store_identity(f'conversation_{convo_id}', json.dumps(messages, ensure_ascii=False))
-                    except Exception as e:
-                        print('conv store failed', convo_id, e)
+                rows = _rows('conv store', conv.items(), lambda cid, messages: (f'conversation_{cid}', json.dumps(messages, ensure_ascii=False)))
+                _insert_many('conv store', mm.store_identities_many, rows)
 
         # Vocab
         vocab_path = os.path.join(LEGACY_DIR, 'vocab.json')
         if os.path.exists(vocab_path):
             vocab = load_json_file(vocab_path)
             if isinstance(vocab, dict):
-                for word, info in vocab.items():
-                    mm.add_vocab(word, info if isinstance(info, str) else json.dumps(info, ensure_ascii=False))
+                rows = _rows('vocab store', vocab.items(), lambda word, info: (word, info if isinstance(info, str) else json.dumps(info, ensure_ascii=False)))
+                _insert_many('vocab store', mm.add_vocab_many, rows)
 
         # Emotions
         emo_path = os.path.join(LEGACY_DIR, 'emotions.json')
         if os.path.exists(emo_path):
             emos = load_json_file(emo_path)
             if isinstance(emos, dict):
-                for e, v in emos.items():
-                    mm.add_emotion(e, int(v.get('value') if isinstance(v, dict) and v.get('value') else 1), json.dumps(v) if isinstance(v, dict) else None)
+                _insert_many('emotion store', mm.add_emotions_many, _rows('emotion store', emos.items(), _emotion_row))
 
         # Reflections
         ref_path = os.path.join(LEGACY_DIR, 'reflections.json')
         if os.path.exists(ref_path):
             refs = load_json_file(ref_path)
             if isinstance(refs, list):
-                for r in refs:
-                    mm.add_reflection(r if isinstance(r, str) else json.dumps(r, ensure_ascii=False))
+                rows = _rows('reflection store', enumerate(refs), lambda i, r: (r if isinstance(r, str) else json.dumps(r, ensure_ascii=False),))
+                _insert_many('reflection store', mm.add_reflections_many, rows)
 
         print('Migration complete.')
     finally:
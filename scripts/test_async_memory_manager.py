@@ -0,0 +1,78 @@
+"""AsyncMemoryManager routing: reads on the reader pool, every write (including crawl rows) on the writer thread."""
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from memory_manager import AsyncMemoryManager, MemoryManager
+
+PAGE = b'<html><head><title>Owls</title></head><body><p>Owls hunt at night. They fly silently.</p><a href="http://example.org/a">a</a></body></html>'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def _thread_log(mm, names):
+    """Record which thread runs each of `names` on `mm`."""
+    seen = {}
+    for name in names:
+        fn = getattr(mm, name)
+
+        def wrapped(*args, _fn=fn, _name=name, **kwargs):
+            seen[_name] = threading.current_thread().name
+            return _fn(*args, **kwargs)
+        setattr(mm, name, wrapped)
+    return seen
+
+
+def test_crawl_network_on_reader_rows_on_writer():
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    mm = MemoryManager(db_path=os.path.join(tempfile.mkdtemp(prefix='async_mm_test_'), 'mem.db'), read_pool_size=2)
+    amm = AsyncMemoryManager(mm, readers=2)
+    seen = _thread_log(mm, ['_fetch_crawl', '_store_crawl', 'get_memories', 'search'])
+    try:
+        async def go():
+            res = await amm.crawl_url(f'http://127.0.0.1:{srv.server_address[1]}/owls', 'Father')
+            await amm.get_memories('x', limit=1)
+            await amm.search('owls', semantic=False)
+            return res
+
+        res = asyncio.run(go())
+        assert res['title'] == 'Owls' and res['links_count'] == 1
+        assert seen['_fetch_crawl'].startswith('aurelia-db-reader')
+        assert seen['_store_crawl'].startswith('aurelia-db-writer')
+        assert seen['get_memories'].startswith('aurelia-db-reader')
+        # hybrid retrieval is read-only and must not queue behind writes
+        assert seen['search'].startswith('aurelia-db-reader')
+        assert mm.get_crawl_by_url(res['url'])['title'] == 'Owls'
+        assert not amm._is_read('crawl_url') and not amm._is_read('generate_code')
+    finally:
+        amm.close()
+        mm.close()
+        srv.shutdown()
+        srv.server_close()
+
+
+def run_tests():
+    print('--- AsyncMemoryManager routing ---')
+    test_crawl_network_on_reader_rows_on_writer()
+    print('routing OK')
+
+
+if __name__ == '__main__':
+    run_tests()
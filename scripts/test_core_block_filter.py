@@ -0,0 +1,108 @@
+"""Streaming CORE_MEMORY_UPDATE filtering and persistence in gateway.aurelia_persona_router."""
+import sys
+import os
+import asyncio
+import json
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gateway import aurelia_persona_router as router
+from gateway.aurelia_persona_router import _CoreBlockFilter
+
+REPLY = 'Hello there. CORE_MEMORY_UPDATE {"name": "Ada"} END_CORE_MEMORY_UPDATE Bye.'
+
+
+def _feed(chunks):
+    filt = _CoreBlockFilter()
+    shown = ''.join(filt.feed(c) for c in chunks) + filt.finish()
+    return filt, shown
+
+
+def test_block_hidden_at_every_split():
+    for size in range(1, len(REPLY) + 1):
+        chunks = [REPLY[i:i + size] for i in range(0, len(REPLY), size)]
+        filt, shown = _feed(chunks)
+        assert shown == 'Hello there.  Bye.', (size, shown)
+        assert filt.text == REPLY
+
+
+def test_case_and_length_changing_characters():
+    # 'ß'.upper() is 'SS': indexes into an upper-cased buffer would be off by one
+    text = 'Straße ist gut. core_memory_update {"a": 1} End_Core_Memory_Update ok'
+    for size in (1, 3, 7, len(text)):
+        _, shown = _feed([text[i:i + size] for i in range(0, len(text), size)])
+        assert shown == 'Straße ist gut.  ok', (size, shown)
+
+
+def test_unterminated_block_is_shown():
+    _, shown = _feed(['text CORE_MEM', 'ORY_UPDATE {"x"'])
+    assert shown == 'text CORE_MEMORY_UPDATE {"x"'
+    _, shown = _feed(['ends with CORE_'])
+    assert shown == 'ends with CORE_'
+
+
+def _run_stream(lines, fail, take=None):
+    stored = []
+
+    async def fake_stream(url, payload, headers=None, timeout=None):
+        for line in lines:
+            yield line
+        if fail:
+            raise RuntimeError('upstream closed')
+
+    async def fake_persist(conv_id, text):
+        stored.append(text)
+        return text, None
+
+    orig = router.stream_lines, router._persist_assistant
+    router.stream_lines, router._persist_assistant = fake_stream, fake_persist
+    try:
+        async def collect():
+            if take is None:
+                return [b async for b in router._stream_chat('http://x', {}, 'c1')]
+            # the client disconnects after `take` chunks
+            gen = router._stream_chat('http://x', {}, 'c1')
+            got = [await gen.__anext__() for _ in range(take)]
+            await gen.aclose()
+            await asyncio.sleep(0.01)
+            return got
+        out = asyncio.run(collect())
+    finally:
+        router.stream_lines, router._persist_assistant = orig
+    return stored, out
+
+
+def _line(text):
+    return 'data: ' + json.dumps({'choices': [{'delta': {'content': text}}]})
+
+
+def test_stream_failure_persistence():
+    stored, out = _run_stream([_line('Hi '), _line('there'), 'data: [DONE]'], fail=False)
+    assert stored == ['Hi there'] and out[-1] == b'data: [DONE]\n\n'
+
+    stored, out = _run_stream([], fail=True)
+    assert stored == []
+    assert any(b'Ollama forward error' in b for b in out)
+
+    stored, _ = _run_stream([_line('Half an ans')], fail=True)
+    assert stored == ['Half an ans' + router._INCOMPLETE_NOTE]
+
+    stored, out = _run_stream([_line('Half '), _line('an ans'), _line('wer'), 'data: [DONE]'], fail=False, take=2)
+    assert len(out) == 2
+    assert stored == ['Half an ans' + router._DISCONNECTED_NOTE]
+
+
+def run_tests():
+    print('--- Core block filter ---')
+    test_block_hidden_at_every_split()
+    test_case_and_length_changing_characters()
+    test_unterminated_block_is_shown()
+    print('filter OK')
+    print('\n--- Stream persistence ---')
+    test_stream_failure_persistence()
+    print('stream persistence OK')
+
+
+if __name__ == '__main__':
+    run_tests()
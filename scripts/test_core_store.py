@@ -0,0 +1,129 @@
+"""core.json snapshot + merge log (gateway.core_store) and the readers that go through it."""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gateway import core_store, diagnostics, memory_bootstrap
+
+
+def _core_path():
+    return Path(tempfile.mkdtemp(prefix='core_store_test_')) / 'core.json'
+
+
+def test_merge_log_and_compaction():
+    p = _core_path()
+    core_store.merge_into_core(p, {'name': 'Aurelia', 'likes': {'tea': True}})
+    core_store.merge_into_core(p, {'likes': {'rain': True}})
+    # merges live in the log until compaction; the snapshot is still empty
+    assert json.loads(p.read_text()) == {}
+    assert core_store.load_core(p)['aurelia'] == {'name': 'Aurelia', 'likes': {'tea': True, 'rain': True}}
+
+    # a torn last line is skipped
+    with core_store.log_path(p).open('ab') as f:
+        f.write(b'{"ns": "aurelia", "payload": {"x"')
+    core_store._cache.clear()
+    assert 'x' not in core_store.load_core(p)['aurelia']
+
+    log = core_store.log_path(p).read_bytes()
+    state = core_store.compact_core(p)
+    snapshot = json.loads(p.read_text())
+    assert snapshot.pop('_log_seq') == 2 and snapshot == state
+    assert core_store.log_path(p).stat().st_size == 0
+
+    # crash after the snapshot was replaced but before the log was truncated:
+    # the folded lines are skipped, not applied again
+    core_store.log_path(p).write_bytes(log)
+    core_store.append_to_core(p, {'likes': {'snow': True}})
+    core_store._cache.clear()
+    assert core_store.load_core(p)['aurelia'] == {'name': 'Aurelia', 'likes': {'tea': True, 'rain': True, 'snow': True}}
+
+
+def test_append_logs_only_the_new_items():
+    p = _core_path()
+    core_store.merge_into_core(p, {'memory': {'events': []}}, namespace=None)
+    sizes = []
+    for i in range(5):
+        before = core_store.log_path(p).stat().st_size
+        state = core_store.append_to_core(p, {'memory': {'events': [{'n': i}]}}, namespace=None)
+        sizes.append(core_store.log_path(p).stat().st_size - before)
+    assert [e['n'] for e in state['memory']['events']] == [0, 1, 2, 3, 4]
+    assert max(sizes) - min(sizes) <= 2
+    # appends survive compaction and a fresh replay exactly once
+    core_store.compact_core(p)
+    core_store.append_to_core(p, {'memory': {'events': [{'n': 5}]}}, namespace=None)
+    core_store._cache.clear()
+    assert [e['n'] for e in core_store.load_core(p)['memory']['events']] == [0, 1, 2, 3, 4, 5]
+
+
+def test_returned_state_is_a_copy():
+    p = _core_path()
+    payload = {'likes': {'tea': True}, 'events': [1]}
+    state = core_store.merge_into_core(p, payload)
+    payload['likes']['coffee'] = True
+    state['aurelia']['events'].append(2)
+    loaded = core_store.load_core(p)
+    loaded['aurelia']['likes']['rain'] = True
+    assert core_store.load_core(p)['aurelia'] == {'likes': {'tea': True}, 'events': [1]}
+
+
+def test_set_replaces_whole_keys():
+    p = _core_path()
+    core_store.merge_into_core(p, {'identity': {'name': 'Aurelia', 'role': 'assistant'}, 'mood': 'calm'}, namespace=None)
+    core_store.set_core_keys(p, {'identity': {'name': 'Aurelia II'}}, namespace=None)
+    core_store._cache.clear()
+    # no stale sub-keys, untouched keys kept (the save_core semantics)
+    assert core_store.load_core(p) == {'identity': {'name': 'Aurelia II'}, 'mood': 'calm'}
+
+
+def test_readers_replay_the_log():
+    p = _core_path()
+    core_store.merge_into_core(p, {'identity': {'name': 'Aurelia', 'role': 'assistant'}}, namespace=None)
+    orig = memory_bootstrap._source_paths
+    memory_bootstrap._source_paths = lambda: (p.with_name('persona.md'), p, p.with_name('digest.md'))
+    try:
+        sections = dict((name, content) for name, content, _ in memory_bootstrap._bootstrap_sections())
+        assert 'Aurelia' in sections['core']
+        # a later merge is picked up even though core.json itself did not change
+        core_store.merge_into_core(p, {'identity': {'name': 'Aurelia II'}}, namespace=None)
+        sections = dict((name, content) for name, content, _ in memory_bootstrap._bootstrap_sections())
+        assert 'Aurelia II' in sections['core']
+    finally:
+        memory_bootstrap._source_paths = orig
+
+
+def test_diagnostics_write_goes_through_the_log():
+    p = _core_path()
+    orig = diagnostics._core_path
+    diagnostics._core_path = lambda: p
+    try:
+        first = diagnostics.test_write('one')
+        second = diagnostics.test_write('two')
+    finally:
+        diagnostics._core_path = orig
+    assert first['events_count'] == 1 and second['events_count'] == 2
+    # each test write logs one line holding just its event
+    last = core_store.log_path(p).read_text().splitlines()[-1]
+    assert json.loads(last)['payload']['memory'] == {'events': [second['wrote']]}
+    state = core_store.load_core(p)
+    assert [e['note'] for e in state['memory']['events']] == ['one', 'two']
+    assert state['ai']['name'] == 'Aurelia' and state['memory']['facts'] == []
+
+
+def run_tests():
+    print('--- core_store ---')
+    test_merge_log_and_compaction()
+    test_returned_state_is_a_copy()
+    test_append_logs_only_the_new_items()
+    test_set_replaces_whole_keys()
+    test_readers_replay_the_log()
+    test_diagnostics_write_goes_through_the_log()
+    print('core_store OK')
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,113 @@
+"""Legacy JSON migration (gateway.legacy_migration): resuming and re-reading changed files without duplicates."""
+import sys
+import os
+import json
+import tempfile
+import pathlib
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gateway import legacy_migration
+from gateway import seedai_storage as storage
+from test_seedai_storage import _fresh_db
+
+
+def _legacy_dir(conversations, vocab):
+    d = pathlib.Path(tempfile.mkdtemp(prefix='legacy_test_'))
+    (d / 'conversations.json').write_text(json.dumps(conversations))
+    (d / 'vocab.json').write_text(json.dumps(vocab))
+    return d
+
+
+def _conv(n):
+    return {'messages': [{'role': 'user', 'content': f'line {j}'} for j in range(n)], 'title': 'T'}
+
+
+def _counts():
+    c = storage.get_conn()
+    return {
+        'messages': c.execute('SELECT COUNT(*) FROM messages').fetchone()[0],
+        'vocab': c.execute('SELECT COUNT(*) FROM vocab').fetchone()[0],
+        'a_count': c.execute("SELECT message_count FROM conversations WHERE id='a'").fetchone()[0],
+    }
+
+
+def test_changed_file_does_not_duplicate_rows():
+    _fresh_db()
+    try:
+        d = _legacy_dir({'a': _conv(3), 'b': _conv(2)}, {'apple': {'meaning': 'fruit'}})
+        assert legacy_migration.migrate(d, workers=0)['migrated'] == 2
+        assert _counts() == {'messages': 5, 'vocab': 1, 'a_count': 3}
+
+        # appended to: only the new rows are added
+        (d / 'conversations.json').write_text(json.dumps({'a': _conv(4), 'b': _conv(2)}))
+        (d / 'vocab.json').write_text(json.dumps({'apple': {'meaning': 'fruit'}, 'pear': {'meaning': 'fruit'}}))
+        legacy_migration.migrate(d, workers=0)
+        assert _counts() == {'messages': 6, 'vocab': 2, 'a_count': 4}
+
+        # touched only: nothing new
+        for name in ('conversations.json', 'vocab.json'):
+            st = (d / name).stat()
+            os.utime(d / name, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        report = legacy_migration.migrate(d, workers=0)
+        assert report['files']['conversations.json']['rows'] == 0
+        assert _counts() == {'messages': 6, 'vocab': 2, 'a_count': 4}
+    finally:
+        storage.close_db()
+
+
+def test_repeated_entries_are_kept():
+    _fresh_db()
+    try:
+        d = _legacy_dir({}, {})
+        same = {'title': 'note', 'body': 'logged twice'}
+        (d / 'reflections.json').write_text(json.dumps({'r1': same, 'r2': same}))
+        legacy_migration.migrate(d, workers=0)
+        count = lambda: storage.get_conn().execute('SELECT COUNT(*) FROM reflections').fetchone()[0]
+        assert count() == 2
+        # re-read after a change: the two existing entries are not added again
+        (d / 'reflections.json').write_text(json.dumps({'r1': same, 'r2': same, 'r3': same}))
+        legacy_migration.migrate(d, workers=0)
+        assert count() == 3
+    finally:
+        storage.close_db()
+
+
+def test_interrupted_run_resumes_at_checkpoint():
+    _fresh_db()
+    try:
+        d = _legacy_dir({f'c{i}': _conv(2) for i in range(5)}, {})
+        orig = legacy_migration._write_batch
+        calls = []
+
+        def failing(*args):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError('interrupted')
+            return orig(*args)
+        legacy_migration._write_batch = failing
+        try:
+            report = legacy_migration.migrate(d, batch_size=3, workers=0)
+        finally:
+            legacy_migration._write_batch = orig
+        assert report['files']['conversations.json']['status'] == 'failed'
+        assert storage.get_conn().execute('SELECT COUNT(*) FROM messages').fetchone()[0] == 4
+
+        report = legacy_migration.migrate(d, batch_size=3, workers=0)
+        assert report['files']['conversations.json']['resumed_at'] == 2
+        assert storage.get_conn().execute('SELECT COUNT(*) FROM messages').fetchone()[0] == 10
+    finally:
+        storage.close_db()
+
+
+def run_tests():
+    print('--- Legacy migration ---')
+    test_changed_file_does_not_duplicate_rows()
+    test_repeated_entries_are_kept()
+    test_interrupted_run_resumes_at_checkpoint()
+    print('legacy migration OK')
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -1,4 +1,4 @@
-"""Basic tests for MemoryManager: store/get identity, add/get memory, add vocab, resolve unknown word."""
+"""Basic tests for MemoryManager: store/get identity, add/get memory, add vocab, resolve unknown word, pooled reads, group commit."""
 import sys
 import os
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -28,8 +28,51 @@ def run_tests():
         mm.resolve_unknown_word('foobar', 'a test word', 'example uses')
         v = mm.get_vocab('foobar')
         assert v and v['word'] == 'foobar'
+        assert mm.knows_word('foobar') and not mm.knows_word('no-such-word-xyz')
         print('unknown->vocab resolve OK')
 
+        print('\n--- Bulk inserts ---')
+        mm.add_vocab('bulkword', 'zzoldmeaning')
+        assert mm.add_vocab_many([('bulkword', 'zznewmeaning'), ('bulkword2', 'zzothermeaning')]) == 2
+        assert mm.add_memories_many([('test', 'zzbulkmemory')]) == 1
+        fts = lambda q: [r[0] for r in mm._conn.execute('SELECT word FROM fts_vocab WHERE fts_vocab MATCH ?', (q,))]
+        # the FTS triggers stay in place: the overwritten definition is gone
+        assert fts('zzoldmeaning') == [] and fts('zznewmeaning') == ['bulkword']
+        assert mm._conn.execute("SELECT COUNT(*) FROM fts_memories WHERE fts_memories MATCH 'zzbulkmemory'").fetchone()[0] >= 1
+        triggers = {r[0] for r in mm._conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        assert {'memories_ai', 'vocab_ai', 'facts_ai'} <= triggers
+        print('bulk inserts OK')
+
+        print('\n--- Pooled reads ---')
+        pooled = MemoryManager(db_path=mm.db_path, read_pool_size=2)
+        try:
+            assert any(m['id'] == mid for m in pooled.get_memories('test', limit=10))
+            stats = pooled.pool_stats()
+            assert stats['pooled'] and stats['checkouts'] >= 1
+            print('pooled read OK', stats)
+        finally:
+            pooled.close()
+
+        print('\n--- Group commit ---')
+        mm.start_write_queue(interval_ms=20, max_batch=100)
+        futs = [mm.log_event('test_batch', str(i), deferred=True) for i in range(250)]
+        assert mm.flush(timeout=10)
+        assert all(isinstance(f.result(), int) for f in futs)
+        # a queued vocab write only joins the word set once it has committed
+        mm.vocab_words()
+        mm._write("CREATE TRIGGER IF NOT EXISTS test_reject_vocab BEFORE INSERT ON vocab WHEN NEW.word = 'zzrejected' "
+                  "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+        try:
+            bad = mm.add_vocab('zzrejected', 'never stored', deferred=True)
+            good = mm.add_vocab('zzqueued', 'stored later', deferred=True)
+            assert mm.flush(timeout=10)
+            assert bad.exception() is not None and good.exception() is None
+            assert not mm.knows_word('zzrejected') and mm.knows_word('zzqueued')
+        finally:
+            mm._write('DROP TRIGGER IF EXISTS test_reject_vocab')
+        mm.stop_write_queue()
+        print('queued writes OK')
+
         print('\nAll basic tests passed')
     finally:
         mm.close()
@@ -0,0 +1,144 @@
+"""Vector index sync for MemoryManager: updates, deletes, upserted vocab and background catch-up."""
+import sys
+import os
+import re
+import hashlib
+import tempfile
+import time
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import memory_vectors
+from memory_manager import MemoryManager
+
+
+class HashEmbedder:
+    """Bag-of-words vectors from hashed tokens: deterministic and offline."""
+    name = 'hash:test'
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for w in re.findall(r'\w+', t.lower()):
+                out[i, int(hashlib.md5(w.encode()).hexdigest(), 16) % self.dim] += 1
+        return out
+
+
+def _manager():
+    mm = MemoryManager(db_path=os.path.join(tempfile.mkdtemp(prefix='vectors_test_'), 'mem.db'))
+    mm.set_embedder(HashEmbedder())
+    return mm
+
+
+def _ids(hits):
+    return [(h['source'], h['id']) for h in hits]
+
+
+def test_vocab_upsert_keeps_one_live_vector():
+    mm = _manager()
+    try:
+        mm.add_vocab('apple', 'a red fruit')
+        rowid = mm._conn.execute("SELECT rowid FROM vocab WHERE word='apple'").fetchone()[0]
+        assert mm.sync_vectors() == 1
+        mm.add_vocab('apple', 'a green orchard fruit')
+        mm.add_vocab_many([('apple', 'a crisp orchard fruit'), ('pear', 'another fruit')])
+        assert mm._conn.execute("SELECT rowid FROM vocab WHERE word='apple'").fetchone()[0] == rowid
+        mm.sync_vectors()
+        stats = mm.vector_index().stats()
+        # one live vector per word; the older apple vectors are masked
+        assert stats['live'] == 2, stats
+        hits = mm.search_semantic('crisp orchard', k=5, sources=['vocab'], catch_up=False)
+        assert hits[0]['row']['word'] == 'apple' and 'crisp' in hits[0]['row']['definition']
+    finally:
+        mm.close()
+
+
+def test_deleted_rows_are_tombstoned():
+    mm = _manager()
+    try:
+        keep = mm.add_memory('note', 'the garden has tomatoes', 'calm', 1)
+        gone = mm.add_memory('note', 'the garden has cucumbers', 'calm', 1)
+        mm.sync_vectors()
+        mm._write('DELETE FROM memories WHERE id = ?', (gone,))
+        mm.sync_vectors()
+        index = mm.vector_index()
+        assert index.stats()['live'] == 1
+        assert _ids(mm.search_semantic('garden cucumbers', k=5, catch_up=False)) == [('memories', keep)]
+        # the tombstone survives a reload of the index files
+        reloaded = memory_vectors.VectorIndex(mm.db_path, HashEmbedder())
+        assert reloaded.stats()['live'] == 1
+    finally:
+        mm.close()
+
+
+def test_queries_do_not_embed_new_rows():
+    mm = _manager()
+    try:
+        mm.add_memory('note', 'first row about owls', 'calm', 1)
+        mm.sync_vectors()
+        later = mm.add_memory('note', 'second row about herons', 'calm', 1)
+        # searched without catch-up: only what is already indexed
+        assert ('memories', later) not in _ids(mm.search_semantic('herons', k=5, catch_up=False))
+        # with catch-up the background sync indexes it for later queries
+        mm.search_semantic('herons', k=5)
+        deadline = time.time() + 5
+        while time.time() < deadline and mm.vector_index().count < 2:
+            time.sleep(0.05)
+        assert ('memories', later) in _ids(mm.search_semantic('herons', k=5, catch_up=False))
+    finally:
+        mm.close()
+
+
+def _dirty_rows(mm):
+    return mm._conn.execute("SELECT COUNT(*) FROM vector_dirty WHERE source != '*'").fetchone()[0]
+
+
+def test_no_dirty_log_without_embeddings():
+    mm = MemoryManager(db_path=os.path.join(tempfile.mkdtemp(prefix='vectors_test_'), 'mem.db'))
+    try:
+        assert mm.vector_index() is None
+        for i in range(50):
+            mm.add_vocab(f'word{i % 5}', f'meaning {i}')
+        mm._write('DELETE FROM vocab WHERE word = ?', ('word0',))
+        assert _dirty_rows(mm) == 0
+    finally:
+        mm.close()
+
+
+def test_reenabled_embeddings_catch_up():
+    mm = _manager()
+    try:
+        rid = mm.add_memory('note', 'the pond has frogs', 'calm', 1)
+        mm.sync_vectors()
+        # switched off: changes are no longer logged one by one
+        mm.set_embedder(None)
+        mm._write('UPDATE memories SET content = ? WHERE id = ?', ('the pond has newts', rid))
+        assert _dirty_rows(mm) == 0
+        mm.set_embedder(HashEmbedder())
+        mm.sync_vectors()
+        hits = mm.search_semantic('newts', k=1, catch_up=False)
+        # re-embedded from the new text, not the stale vector for 'frogs'
+        assert _ids(hits) == [('memories', rid)] and hits[0]['similarity'] > 0.3
+        assert mm._conn.execute('SELECT COUNT(*) FROM vector_dirty').fetchone()[0] == 0
+    finally:
+        mm.close()
+
+
+def run_tests():
+    print('--- Vector sync ---')
+    test_vocab_upsert_keeps_one_live_vector()
+    test_deleted_rows_are_tombstoned()
+    test_queries_do_not_embed_new_rows()
+    test_no_dirty_log_without_embeddings()
+    test_reenabled_embeddings_catch_up()
+    print('vector sync OK')
+
+
+if __name__ == '__main__':
+    run_tests()
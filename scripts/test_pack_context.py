@@ -0,0 +1,78 @@
+"""Token budgets of gateway.memory_bootstrap.pack_context."""
+import sys
+import os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gateway import memory_bootstrap
+from gateway.memory_bootstrap import count_tokens, pack_context
+
+# memory sections off, so only the history budget applies
+NO_MEMORY = {'persona': 0, 'core': 0, 'digest': 0}
+
+
+def _msg(role, n_tokens, tag):
+    # default tokenizer: ~4 characters per token
+    return {'role': role, 'content': (tag + ' ' + 'x' * (4 * n_tokens))[:4 * n_tokens]}
+
+
+def _thread(turns, tokens_each=100):
+    return [_msg('user' if i % 2 == 0 else 'assistant', tokens_each, f't{i}') for i in range(turns)]
+
+
+def test_history_keeps_newest_turns():
+    history = _thread(10)
+    out = pack_context(history, budgets=dict(NO_MEMORY, history=350))
+    assert out == history[-3:]
+    assert sum(count_tokens(m['content']) for m in out) <= 350
+
+
+def test_last_message_always_kept():
+    big = [_msg('user', 50, 'old'), _msg('user', 1000, 'huge')]
+    out = pack_context(big, budgets=dict(NO_MEMORY, history=100))
+    assert out == big[-1:]
+
+
+def test_leading_system_messages_reserved():
+    system = [_msg('system', 50, 'client prompt'), _msg('system', 80, 'Summary of earlier')]
+    history = system + _thread(10)
+    out = pack_context(history, budgets=dict(NO_MEMORY, history=400))
+    # system messages stay first; turns get what is left (400 - 130 -> 2 turns)
+    assert out[:2] == system
+    assert out[2:] == history[-2:]
+    # even when the system messages alone use the budget, they and the newest turn stay
+    out = pack_context(history, budgets=dict(NO_MEMORY, history=100))
+    assert out == system + history[-1:]
+
+
+def test_memory_budget_carries_over():
+    history = _thread(10)
+    orig = memory_bootstrap._bootstrap_sections
+    # no persona/core/digest files: only the persona passed in
+    memory_bootstrap._bootstrap_sections = lambda: []
+    try:
+        out = pack_context(history, persona='p' * 40, budgets={'persona': 110, 'core': 0, 'digest': 0, 'history': 200})
+    finally:
+        memory_bootstrap._bootstrap_sections = orig
+    assert out[0] == {'role': 'system', 'content': 'p' * 40}
+    # 100 persona tokens unused -> history gets 300
+    assert out[1:] == history[-3:]
+
+
+def test_default_history_cap():
+    assert memory_bootstrap.section_budgets()['history'] == int(os.environ.get('AURELIA_BUDGET_HISTORY', 3000))
+
+
+def run_tests():
+    print('--- pack_context budgets ---')
+    test_history_keeps_newest_turns()
+    test_last_message_always_kept()
+    test_leading_system_messages_reserved()
+    test_memory_budget_carries_over()
+    test_default_history_cap()
+    print('pack_context OK')
+
+
+if __name__ == '__main__':
+    run_tests()
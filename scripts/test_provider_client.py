@@ -0,0 +1,127 @@
+"""Retry policy of gateway.provider_client: POSTs are not resent after the provider saw them, GETs are."""
+import sys
+import os
+import asyncio
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gateway import provider_client
+from gateway.provider_client import ProviderError, ProviderTimeout
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # path -> (status, delay seconds)
+    routes = {}
+    hits = {}
+
+    def _answer(self):
+        self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        status, delay = self.routes.get(self.path, (200, 0))
+        if delay:
+            threading.Event().wait(delay)
+        body = json.dumps({'ok': status == 200}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # the client hangs up on /slow before it is answered
+        pass
+
+
+def _serve():
+    srv = _Server(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f'http://127.0.0.1:{srv.server_address[1]}'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _expect(exc, coro):
+    try:
+        _run(coro)
+    except exc:
+        return
+    raise AssertionError(f'expected {exc.__name__}')
+
+
+def test_retry_policy():
+    provider_client.BACKOFF = 0.01
+    _Handler.routes = {'/busy': (503, 0), '/slow': (200, 1.0), '/limited': (429, 0), '/ok': (200, 0)}
+    _Handler.hits = {}
+    srv, base = _serve()
+    try:
+        # 5xx and timeouts on a POST are not resent: the provider may have done the work
+        _expect(ProviderError, provider_client.post_json(base + '/busy', {}, retries=2))
+        assert _Handler.hits['/busy'] == 1
+        _expect(ProviderTimeout, provider_client.post_json(base + '/slow', {}, timeout=0.3, retries=2))
+        assert _Handler.hits['/slow'] == 1
+
+        # 429 means the request was refused, so it is safe to send again
+        _expect(ProviderError, provider_client.post_json(base + '/limited', {}, retries=2))
+        assert _Handler.hits['/limited'] == 3
+
+        # GETs and explicit opt-in retry everything
+        _Handler.hits = {}
+        _expect(ProviderError, provider_client.get_json(base + '/busy', retries=2))
+        assert _Handler.hits['/busy'] == 3
+        _expect(ProviderError, provider_client.post_json(base + '/busy', {}, retries=1, idempotent=True))
+        assert _Handler.hits['/busy'] == 5
+
+        assert _run(provider_client.post_json(base + '/ok', {})) == {'ok': True}
+
+        # streamed POSTs follow the same rules
+        async def drain(path, **kwargs):
+            return [line async for line in provider_client.stream_lines(base + path, {}, **kwargs)]
+        _Handler.routes['/gateway'] = (502, 0)
+        _Handler.hits = {}
+        _expect(ProviderError, drain('/gateway', retries=2))
+        assert _Handler.hits['/gateway'] == 1
+        _expect(ProviderError, drain('/limited', retries=2))
+        assert _Handler.hits['/limited'] == 3
+        _expect(ProviderError, drain('/gateway', retries=1, idempotent=True))
+        assert _Handler.hits['/gateway'] == 3
+        assert _run(drain('/ok')) == ['{"ok": true}']
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    # nothing listening: connect failures are retried even for POSTs, then surface
+    _expect(ProviderError, provider_client.post_json(f'http://127.0.0.1:{_free_port()}/x', {}, retries=1))
+
+
+def run_tests():
+    print('--- Provider retry policy ---')
+    test_retry_policy()
+    print('retry policy OK')
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,114 @@
+"""Batched concept exploration in seedai_reasoner: reply parsing, JSON-mode fallback, retries and staging."""
+import sys
+import os
+import json
+import tempfile
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# seedai_memory opens aurelia_memory.db in the working directory on import
+os.chdir(tempfile.mkdtemp(prefix='explore_test_'))
+
+from seedai_reasoner import CONCEPT_FACETS, Reasoner
+
+FACETS = {key: f'{key} answer' for key, _ in CONCEPT_FACETS}
+
+
+class FakeLLM:
+    """Answers exploration prompts from a script of canned replies."""
+
+    def __init__(self, reject_json=False, reply=None):
+        self.reject_json = reject_json
+        self.reply = reply
+        self.calls = []
+
+    def chat(self, messages, timeout=10, response_format=None):
+        self.calls.append(response_format)
+        if response_format and self.reject_json:
+            return {'error': 'provider_error', 'status_code': 400, 'provider': {'error': 'response_format'}}
+        prompt = messages[0]['content']
+        words = prompt.split('Words: ', 1)[1].split('\n', 1)[0].split(', ')
+        text = self.reply(words) if self.reply else json.dumps({w: FACETS for w in words})
+        return {'choices': [{'message': {'content': text}}]}
+
+
+class FakeMemory:
+    def __init__(self):
+        self.staged = []
+
+    def knows_word(self, word):
+        return False
+
+    def extract_unknown_words(self, text):
+        pass
+
+    def stage_learning_drafts(self, facts):
+        self.staged.append(list(facts))
+
+    def save_all(self):
+        pass
+
+
+def _reasoner(llm):
+    r = Reasoner.__new__(Reasoner)
+    r.llm, r.memory, r._explore_json_mode = llm, FakeMemory(), True
+    return r
+
+
+def test_parse_exploration():
+    parse = Reasoner._parse_exploration
+    reply = 'Sure! {"Apple": {"definition": "a fruit"}, "pear": {"definition": "another"}, "x": 1} done'
+    assert parse(reply, ['apple', 'pear', 'plum']) == {'apple': {'definition': 'a fruit'}, 'pear': {'definition': 'another'}}
+    # one word answered without the outer object
+    assert parse('{"definition": "a fruit", "usage": "eating"}', ['apple']) == {'apple': {'definition': 'a fruit', 'usage': 'eating'}}
+    assert parse('not json {', ['apple']) == {}
+    assert parse('{"apple": "just a string"}', ['apple']) == {}
+    assert parse(None, ['apple']) == {}
+
+
+def test_json_mode_fallback():
+    llm = FakeLLM(reject_json=True)
+    r = _reasoner(llm)
+    found = r._explore_batch(['apple', 'pear'])
+    assert set(found) == {'apple', 'pear'}
+    # rejected once with response_format, then plain requests only
+    assert llm.calls == [{'type': 'json_object'}, None]
+    r._explore_batch(['plum'])
+    assert llm.calls[-1] is None and len(llm.calls) == 3
+
+
+def test_dropped_words_retried_once_each():
+    # the batch reply drops "pear"; single-word replies are complete
+    llm = FakeLLM(reply=lambda ws: json.dumps({w: FACETS for w in ws if len(ws) == 1 or w != 'pear'}))
+    r = _reasoner(llm)
+    assert set(r._explore_batch(['apple', 'pear', 'plum'])) == {'apple', 'pear', 'plum'}
+    assert len(llm.calls) == 2
+
+    # a failed request is not repeated word by word
+    failing = FakeLLM()
+    failing.chat = lambda *a, **k: failing.calls.append(1) or {'error': 'timeout'}
+    r = _reasoner(failing)
+    assert r._explore_batch(['apple', 'pear', 'plum']) == {}
+    assert len(failing.calls) == 1
+
+
+def test_drafts_staged_once():
+    r = _reasoner(FakeLLM())
+    results = r.explore_concepts(['Apple', 'pear', 'apple', ''])
+    assert set(results) == {'apple', 'pear'}
+    assert len(r.memory.staged) == 1
+    assert [w for w, _ in r.memory.staged[0]] == ['apple', 'pear']
+
+
+def run_tests():
+    print('--- Concept exploration ---')
+    test_parse_exploration()
+    test_json_mode_fallback()
+    test_dropped_words_retried_once_each()
+    test_drafts_staged_once()
+    print('exploration OK')
+
+
+if __name__ == '__main__':
+    run_tests()
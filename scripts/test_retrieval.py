@@ -0,0 +1,63 @@
+"""Retriever confidence (seedai_retrieval): when local memory is trusted to answer without the LLM."""
+import sys
+import os
+import tempfile
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from memory_manager import MemoryManager
+from seedai_retrieval import Retriever, content_words
+
+
+def _retriever():
+    mm = MemoryManager(db_path=os.path.join(tempfile.mkdtemp(prefix='retrieval_test_'), 'mem.db'))
+    mm.add_memory('diary', 'I walked to the market today and bought bread', 'happy', 1)
+    mm.add_vocab('apple', 'a round fruit that grows on trees', 'an apple a day')
+    return mm, Retriever(mm, semantic=False)
+
+
+def test_single_content_word_is_not_confident():
+    mm, r = _retriever()
+    try:
+        assert content_words('how are you today') == ['today']
+        ctx = r.retrieve('how are you today')
+        # the diary row mentions "today", but one shared word is not an answer
+        assert ctx and ctx['passages'][0]['source'] == 'memories'
+        assert ctx['passages'][0]['coverage'] == 1.0
+        assert not ctx['confident'] and ctx['confidence'] < r.min_confidence
+    finally:
+        mm.close()
+
+
+def test_vocab_headword_is_confident():
+    mm, r = _retriever()
+    try:
+        ctx = r.retrieve('what is apple')
+        assert ctx['confident'] and ctx['passages'][0]['source'] == 'vocab'
+    finally:
+        mm.close()
+
+
+def test_several_matched_terms_are_confident():
+    mm, r = _retriever()
+    try:
+        ctx = r.retrieve('market today bread')
+        assert ctx['confident'] and ctx['passages'][0]['matched'] == 3
+        # two of four content words is below the threshold
+        assert not r.retrieve('market today cheese wine')['confident']
+        assert r.retrieve('how are you') is None
+    finally:
+        mm.close()
+
+
+def run_tests():
+    print('--- Retrieval confidence ---')
+    test_single_content_word_is_not_confident()
+    test_vocab_headword_is_confident()
+    test_several_matched_terms_are_confident()
+    print('retrieval confidence OK')
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,291 @@
+"""seedai_storage on a throwaway database: conversation pages and the /api/conversations routes."""
+import sys
+import os
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gateway import seedai_storage as storage
+
+
+def _fresh_db():
+    storage.close_db()
+    path = os.path.join(tempfile.mkdtemp(prefix='seedai_test_'), 'store.sqlite3')
+    storage.init_db(path)
+    return path
+
+
+def _seed_conversations(n, messages_each=3):
+    for i in range(n):
+        storage.append_messages(f'c{i:02d}', [('user', f'hello {i} {j}') for j in range(messages_each)])
+
+
+def test_conversation_pages():
+    _fresh_db()
+    try:
+        _seed_conversations(7)
+        seen, cursor = [], None
+        while True:
+            page = storage.list_conversations_page(limit=3, cursor=cursor)
+            assert len(page['items']) <= 3
+            seen += [c['id'] for c in page['items']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        # every conversation exactly once, in the same order as the full list
+        assert seen == [c['id'] for c in storage.list_conversations()]
+        assert len(set(seen)) == 7
+        assert page['items'][-1]['message_count'] == 3
+        assert page['items'][-1]['last_message']['preview'].startswith('hello')
+
+        storage.append_messages('long', [('user', f'm{j}') for j in range(5)])
+        texts, cursor = [], None
+        while True:
+            page = storage.load_conversation_page('long', limit=2, cursor=cursor)
+            texts += [m['text'] for m in page['messages']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        assert texts == [f'm{j}' for j in range(5)]
+
+        try:
+            storage.list_conversations_page(cursor='not-a-cursor')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('malformed cursor accepted')
+    finally:
+        storage.close_db()
+
+
+def test_conversation_routes_keep_old_shape():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from gateway.routes import storage_routes
+
+    _fresh_db()
+    try:
+        _seed_conversations(3)
+        app = FastAPI()
+        app.include_router(storage_routes.router)
+        client = TestClient(app)
+
+        # no limit/cursor: the original list and full conversation
+        body = client.get('/api/conversations').json()
+        assert isinstance(body, list) and len(body) == 3
+        conv = client.get('/api/conversations/c00').json()
+        assert len(conv['messages']) == 3 and 'next_cursor' not in conv
+
+        page = client.get('/api/conversations', params={'limit': 2}).json()
+        assert len(page['items']) == 2 and page['next_cursor']
+        rest = client.get('/api/conversations', params={'cursor': page['next_cursor']}).json()
+        assert [c['id'] for c in page['items'] + rest['items']] == [c['id'] for c in body]
+        assert client.get('/api/conversations', params={'cursor': 'bad'}).status_code == 400
+    finally:
+        storage.close_db()
+
+
+def test_core_versions_unique_across_connections():
+    path = _fresh_db()
+    storage.close_db()
+
+    def writer(n):
+        # a separate connection per thread stands in for another process
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        for j in range(20):
+            storage._write_core_keys(conn.cursor(), {f'k{n}': j})
+            conn.commit()
+        conn.close()
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    conn = sqlite3.connect(path)
+    try:
+        versions = [r[0] for r in conn.execute('SELECT version FROM core_history')]
+        assert len(versions) == 80 and len(set(versions)) == 80
+    finally:
+        conn.close()
+
+
+def test_core_history_is_capped():
+    _fresh_db()
+    keep, storage.CORE_HISTORY_KEEP = storage.CORE_HISTORY_KEEP, 3
+    try:
+        for j in range(6):
+            storage.save_core({'mood': j, 'name': 'Aurelia'} if j == 0 else {'mood': j})
+        rows = storage.get_conn().execute('SELECT key, value_json FROM core_history ORDER BY version').fetchall()
+        assert [v for k, v in rows if k == 'mood'] == ['3', '4', '5']
+        assert [k for k, _ in rows].count('name') == 1
+        assert storage.load_core() == {'mood': 5, 'name': 'Aurelia'}
+    finally:
+        storage.CORE_HISTORY_KEEP = keep
+        storage.close_db()
+
+
+def test_ingest_skips_resent_messages():
+    _fresh_db()
+    try:
+        thread = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}, {'role': 'user', 'content': 'yes'}]
+        assert storage.ingest_messages('t', thread) == 3
+        # the client resends the whole thread each turn
+        assert storage.ingest_messages('t', thread) == 0
+        thread += [{'role': 'assistant', 'content': 'ok'}, {'role': 'user', 'content': 'yes'}]
+        assert storage.ingest_messages('t', thread) == 2
+        conv = storage.load_conversation('t')
+        assert [m['text'] for m in conv['messages']] == ['hi', 'hello', 'yes', 'ok', 'yes']
+        assert {c['id']: c['message_count'] for c in storage.list_conversations_page()['items']} == {'t': 5}
+        # a role filter skips rows but keeps the chain
+        assert storage.ingest_messages('u', thread, roles=('user',)) == 3
+        assert storage.ingest_messages('u', thread) == 2
+    finally:
+        storage.close_db()
+
+
+def test_incremental_export():
+    path = _fresh_db()
+    out = os.path.join(os.path.dirname(path), 'export.ndjson.gz')
+    try:
+        storage.save_core({'name': 'Aurelia'})
+        storage.save_memory_entry({'type': 'note', 'key': 'a', 'value': 'first'})
+        storage.append_messages('c1', [('user', 'one'), ('assistant', 'two')])
+        first = storage.export_memory_json(out, fmt='ndjson', compress=True, incremental=True)
+        assert first['counts'] == {'core_keys': 1, 'memories': 1, 'conversations': 1, 'messages': 2}
+
+        storage.save_core({'mood': 'calm'})
+        storage.save_memory_entry({'type': 'note', 'key': 'b', 'value': 'second'})
+        storage.append_messages('c1', [('user', 'three')])
+        second = storage.export_memory_json(out, fmt='ndjson', compress=True, incremental=True)
+        # only what was written since the first export
+        assert second['counts'] == {'core_keys': 1, 'memories': 1, 'conversations': 1, 'messages': 1}
+        with gzip.open(out, 'rt', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        assert [r['text'] for r in records if r['kind'] == 'message'] == ['three']
+        assert [r['key'] for r in records if r['kind'] == 'core'] == ['mood']
+
+        # nothing new; a full export still has everything
+        assert sum(storage.export_memory_json(out, incremental=True)['counts'].values()) == 0
+        full = storage.export_memory_json(out)
+        assert full['counts'] == {'core_keys': 2, 'memories': 2, 'conversations': 1, 'messages': 3}
+        with open(out, encoding='utf-8') as f:
+            doc = json.load(f)
+        assert [m['text'] for m in doc['conversations'][0]['messages']] == ['one', 'two', 'three']
+    finally:
+        storage.close_db()
+
+
+def _thread(*turns):
+    out = [{'role': 'system', 'content': 'be nice'}]
+    for i, t in enumerate(turns):
+        out.append({'role': 'user' if i % 2 == 0 else 'assistant', 'content': t})
+    return out
+
+
+def test_window_follows_the_request_thread():
+    _fresh_db()
+    calls = []
+    orig = storage._summarizer
+
+    def counting(previous, messages):
+        calls.append([m['content'] for m in messages])
+        return orig(previous, messages)
+    storage._summarizer = counting
+    try:
+        thread = _thread('u1', 'a1', 'u2', 'a2', 'u3', 'a3', 'u4')
+        storage.ingest_messages('w', thread)
+        window = storage.conversation_window('w', thread, keep_turns=2)
+        assert [m['content'] for m in window[1:]] == ['u3', 'a3', 'u4']
+        assert window[0]['role'] == 'system' and 'u1' in window[0]['content'] and 'a2' in window[0]['content']
+        storage.append_message('w', 'assistant', 'a4')
+
+        # regenerate: same thread resent, nothing new stored; the window still
+        # ends on the user turn and the cached summary is reused
+        window = storage.conversation_window('w', thread, keep_turns=2)
+        assert window[-1] == {'role': 'user', 'content': 'u4'}
+        assert len(calls) == 1
+
+        # edit of u3: a new branch; the abandoned turns stay out of the prompt
+        edited = _thread('u1', 'a1', 'u2', 'a2', 'u3 edited')
+        storage.ingest_messages('w', edited)
+        window = storage.conversation_window('w', edited, keep_turns=2)
+        assert [m['content'] for m in window[1:]] == ['u2', 'a2', 'u3 edited']
+        text = ' '.join(m['content'] for m in window)
+        assert 'a3' not in text and 'u4' not in text and 'a4' not in text
+        # edit of u1: the summary is rebuilt from this thread only
+        rewritten = _thread('u1 edited', 'b1', 'u2', 'a2', 'u3', 'a3', 'u4')
+        window = storage.conversation_window('w', rewritten, keep_turns=2)
+        assert 'u1 edited' in window[0]['content'] and 'a1' not in window[0]['content']
+    finally:
+        storage._summarizer = orig
+        storage.close_db()
+
+
+def test_async_paths_use_the_pool():
+    import asyncio
+    _fresh_db()
+    try:
+        assert storage._read_pool is not None
+
+        def where(fn):
+            def wrapped(*args, **kwargs):
+                return threading.current_thread().name, fn(*args, **kwargs)
+            return wrapped
+
+        async def go():
+            w = await storage.run_write(where(storage.save_core), {'name': 'Aurelia'})
+            r = await storage.run_read(where(storage.load_core))
+            p = await storage.run_read(where(storage.list_conversations_page))
+            return w, r, p
+        (w_thread, saved), (r_thread, core), (p_thread, page) = asyncio.run(go())
+        assert w_thread.startswith('seedai-db-writer') and saved == {'name': 'Aurelia'}
+        assert r_thread.startswith('seedai-db-reader') and core == {'name': 'Aurelia'}
+        assert p_thread.startswith('seedai-db-reader') and page['items'] == []
+        # the core cache is validated on its own read-only connection
+        assert storage._core_conn is not None and storage._core_conn is not storage.get_conn()
+        try:
+            storage._core_conn.execute("DELETE FROM core_kv")
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError('core reader is writable')
+        # another connection's write is picked up
+        other = sqlite3.connect(storage.DB_PATH)
+        storage._write_core_keys(other.cursor(), {'mood': 'calm'})
+        other.commit()
+        other.close()
+        assert storage.load_core() == {'name': 'Aurelia', 'mood': 'calm'}
+    finally:
+        storage.close_db()
+
+
+def run_tests():
+    print('--- Conversation pages ---')
+    test_conversation_pages()
+    test_conversation_routes_keep_old_shape()
+    print('pagination OK')
+    print('--- Ingest ---')
+    test_ingest_skips_resent_messages()
+    print('ingest dedup OK')
+    print('--- History window ---')
+    test_window_follows_the_request_thread()
+    print('history window OK')
+    print('--- Async paths ---')
+    test_async_paths_use_the_pool()
+    print('async paths OK')
+    print('--- Export ---')
+    test_incremental_export()
+    print('incremental export OK')
+    print('--- Core versions ---')
+    test_core_versions_unique_across_connections()
+    test_core_history_is_capped()
+    print('core versions OK')
+
+
+if __name__ == '__main__':
+    run_tests()
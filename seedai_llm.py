@@ -6,7 +6,8 @@ Behavior:
 - Reads provider config via `gateway.providers` if available, otherwise falls back
   to `config/llm_config.json` or env vars.
 - Exposes `LocalLLM` with `chat(messages, model=None, timeout=10)` that forwards
-  OpenAI-compatible chat payloads to the provider's `/v1/chat/completions`.
+  OpenAI-compatible chat payloads to the provider's `/v1/chat/completions`, and
+  `ask(prompt)` which returns just the reply text.
 """
 
 from __future__ import annotations
@@ -48,11 +49,13 @@ class LocalLLM:
             headers['Authorization'] = f'Bearer {self.api_key}'
         return headers
 
-    def chat(self, messages: List[Dict[str, Any]], model: Optional[str] = None, timeout: int = 10) -> Dict[str, Any]:
+    def chat(self, messages: List[Dict[str, Any]], model: Optional[str] = None, timeout: int = 10,
+             response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Send OpenAI-compatible chat messages to the provider and return provider JSON.
 
         messages: list of {role: string, content: string | list}
         model: optional model id to override default
+        response_format: e.g. {'type': 'json_object'} to request JSON output
         """
         target_model = model or self.default_model
         if not target_model:
@@ -63,6 +66,8 @@ class LocalLLM:
             'messages': [],
             'stream': False,
         }
+        if response_format:
+            payload['response_format'] = response_format
 
         for m in messages:
             # support structured content (vision) or plain string
@@ -91,6 +96,16 @@ class LocalLLM:
         else:
             return {'error': 'provider_error', 'status_code': r.status_code, 'provider': data}
 
+    def ask(self, prompt: str, model: Optional[str] = None, timeout: int = 60, json_mode: bool = False) -> Optional[str]:
+        """Single-turn wrapper around `chat`: return the reply text, or None on error."""
+        res = self.chat([{'role': 'user', 'content': prompt}], model=model, timeout=timeout,
+                        response_format={'type': 'json_object'} if json_mode else None)
+        try:
+            return res['choices'][0]['message']['content']
+        except Exception:
+            print(f"[LocalLLM] no reply: {res.get('error') or res}")
+            return None
+
 
 if __name__ == '__main__':
     # quick local test when executed directly
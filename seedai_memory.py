@@ -34,10 +34,9 @@ class SQLiteMemory:
         # convert list of dicts to dict by concept name
         self.memory['concepts'] = {c['concept']: {'description': c.get('description'), 'related_terms': c.get('related_terms')} for c in concepts}
 
-        # Load vocab words
+        # Load vocab words (also primes the manager's membership index)
         try:
-            for v in self.mm.get_all_vocab():
-                self.vocab.add(v.get('word'))
+            self.vocab.update(self.mm.vocab_words())
         except Exception:
             pass
 
@@ -53,7 +52,8 @@ class SQLiteMemory:
 
     # Word helpers
     def knows_word(self, word: str) -> bool:
-        return word in self.vocab or bool(self.mm.get_vocab(word))
+        # answered from memory; no query per token
+        return word in self.vocab or self.mm.knows_word(word)
 
     def extract_unknown_words(self, text: str):
         import re
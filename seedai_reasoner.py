@@ -4,10 +4,27 @@ import re
 import threading
 import time
 import json
+import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 from seedai_llm import LocalLLM
 from seedai_memory import SQLiteMemory as Memory
 from seedai_crawler import WebCrawler
+from seedai_retrieval import Retriever
+
+# Batched concept exploration: words per LLM request, concurrent requests, request timeout (s)
+EXPLORE_BATCH_WORDS = int(os.environ.get("AURELIA_EXPLORE_BATCH", "5"))
+EXPLORE_WORKERS = int(os.environ.get("AURELIA_EXPLORE_WORKERS", "3"))
+EXPLORE_TIMEOUT = int(os.environ.get("AURELIA_EXPLORE_TIMEOUT", "120"))
+
+# facet key -> question, in the order learned knowledge is recorded
+CONCEPT_FACETS = [
+    ("definition", "What is '{w}'?"),
+    ("sentence", "Can you use '{w}' in a sentence?"),
+    ("usage", "When is '{w}' used?"),
+    ("similar", "What words are similar to '{w}'?"),
+    ("opposite", "What is the opposite of '{w}'?"),
+]
 
 
 class Reasoner:
@@ -15,6 +32,10 @@ class Reasoner:
         self.logger = self._setup_logger()
         self.memory = Memory()
         self.llm = LocalLLM()
+        # embeddings are optional (AURELIA_EMBED_BACKEND); keyword ranking works without them
+        self.retriever = Retriever(self.memory.mm)
+        # cleared when the provider rejects response_format=json_object
+        self._explore_json_mode = True
         self.ask_permission = True  # Hard rule: always ask before LLM
         self.thread_to_conversation = {}  # Map thread_id to conversation_id
         self.queued_urls = []  # Enqueued URLs for explicit crawling
@@ -76,17 +97,15 @@ class Reasoner:
 
     def scan_memory_for_unknowns(self):
         print("[Scan] Scanning memory for unknown words...")
-        scanned = []
         for key, entry in self.memory.memory.get("learned", {}).items():
             self.memory.extract_unknown_words(entry)
-        new_words = self.memory.unknown_words.copy()
+        new_words = [w for w in self.memory.unknown_words.copy() if not self.memory.knows_word(w)]
+        if new_words:
+            print(f"[Scan] Reflecting on: {', '.join(new_words)}")
+        results = self.explore_concepts(new_words)
         for word in new_words:
-            if not self.memory.knows_word(word):
-                print(f"[Scan] Reflecting on: {word}")
-                result = self.explore_concept(word)
-                scanned.append(result)
-                if word in self.memory.unknown_words:
-                    self.memory.unknown_words.remove(word)
+            self.memory.unknown_words.discard(word)
+        scanned = [results[w] for w in new_words if w in results]
         return "\n".join(scanned) if scanned else "No unknown words found."
 
     def handle_turn(self, user_input, meta=None):
@@ -161,32 +180,127 @@ class Reasoner:
         topic = topic.strip().lower()
         if self.memory.knows_word(topic):
             return f"I already remember what '{topic}' means."
+        return self.explore_concepts([topic])[topic]
+
+    def explore_concepts(self, topics):
+        """Learn several words at once; returns {word: what was learned}.
+
+        Each LLM request covers up to EXPLORE_BATCH_WORDS words and asks for
+        all five facets as one JSON object; requests run on up to
+        EXPLORE_WORKERS threads. Everything learned is staged in one write.
+        """
+        results = {}
+        words = []
+        for topic in topics:
+            if not isinstance(topic, str) or not topic.strip():
+                continue
+            word = topic.strip().lower()
+            if word in results or word in words:
+                continue
+            if self.memory.knows_word(word):
+                results[word] = f"I already remember what '{word}' means."
+            else:
+                words.append(word)
+        if not words:
+            return results
+
+        batches = [words[i:i + EXPLORE_BATCH_WORDS] for i in range(0, len(words), EXPLORE_BATCH_WORDS)]
+        learned = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(EXPLORE_WORKERS, len(batches)))) as pool:
+            for found in pool.map(self._explore_batch, batches):
+                learned.update(found)
+
+        drafts = []
+        for word in words:
+            results[word], knowledge = self._record_concept(word, learned.get(word) or {})
+            if knowledge:
+                drafts.append((word, knowledge))
+        if drafts:
+            self.memory.stage_learning_drafts(drafts)
+        self.memory.save_all()
+        return results
+
+    def _explore_prompt(self, words):
+        questions = "\n".join(f"- {key}: {q.format(w='<word>')}" for key, q in CONCEPT_FACETS)
+        keys = ", ".join(f'"{key}"' for key, _ in CONCEPT_FACETS)
+        return (
+            "For each word below, answer these questions briefly:\n"
+            f"{questions}\n"
+            f"Words: {', '.join(words)}\n"
+            f"Reply with only a JSON object mapping each word to an object with the keys {keys}."
+        )
+
+    @staticmethod
+    def _parse_exploration(reply, words):
+        """{word: {facet: answer}} for the words the reply covers."""
+        if not reply:
+            return {}
+        start, end = reply.find("{"), reply.rfind("}")
+        if start < 0 or end <= start:
+            return {}
+        try:
+            data = json.loads(reply[start:end + 1])
+        except Exception:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        data = {str(k).strip().lower(): v for k, v in data.items()}
+        if len(words) == 1 and words[0] not in data and any(key in data for key, _ in CONCEPT_FACETS):
+            # a single word answered without the outer object
+            data = {words[0]: data}
+        return {w: data[w] for w in words if isinstance(data.get(w), dict)}
+
+    def _explore_request(self, words):
+        """Reply text for one exploration prompt, or None if the request failed."""
+        prompt = [{"role": "user", "content": self._explore_prompt(words)}]
+        json_mode = self._explore_json_mode
+        res = self.llm.chat(prompt, timeout=EXPLORE_TIMEOUT,
+                            response_format={"type": "json_object"} if json_mode else None)
+        if json_mode and res.get("error") in ("provider_error", "invalid_response") and 400 <= (res.get("status_code") or 0) < 500:
+            # e.g. LM Studio answers 400 to response_format; the prompt already asks for JSON
+            print(f"[Reasoner] provider rejected JSON mode ({res.get('status_code')}); retrying without it")
+            self._explore_json_mode = False
+            res = self.llm.chat(prompt, timeout=EXPLORE_TIMEOUT)
+        try:
+            return res["choices"][0]["message"]["content"]
+        except Exception:
+            print(f"[Reasoner] explore request failed: {res.get('error') or res}")
+            return None
 
-        questions = [
-            f"What is '{topic}'?",
-            f"Can you use '{topic}' in a sentence?",
-            f"When is '{topic}' used?",
-            f"What words are similar to '{topic}'?",
-            f"What is the opposite of '{topic}'?"
-        ]
-
+    def _explore_batch(self, words):
+        print(f"🧠 [LLM PROMPT] explore: {', '.join(words)}")
+        reply = self._explore_request(words)
+        if reply is None:
+            # timeouts and provider errors would only repeat per word
+            return {}
+        print(f"💬 [LLM RESPONSE] {reply.strip()}")
+        found = self._parse_exploration(reply, words)
+        missing = [w for w in words if w not in found]
+        if len(words) > 1 and missing:
+            # words the reply dropped (or all, if it was not valid JSON): one
+            # request each, in parallel, without further retries
+            with ThreadPoolExecutor(max_workers=max(1, min(EXPLORE_WORKERS, len(missing)))) as pool:
+                for word, reply in zip(missing, pool.map(lambda w: self._explore_request([w]), missing)):
+                    found.update(self._parse_exploration(reply, [word]))
+        return found
+
+    def _record_concept(self, topic, facets):
+        """(message, knowledge) for what was learned about `topic`; knowledge is '' if nothing."""
         responses = []
-        for q in questions:
-            print(f"🧠 [LLM PROMPT] {q}")
-            reply = self.llm.ask(q)
-            if reply:
-                cleaned = reply.strip()
-                print(f"💬 [LLM RESPONSE] {cleaned}")
-                responses.append(f"Q: {q}\nA: {cleaned}")
+        for key, question in CONCEPT_FACETS:
+            answer = facets.get(key)
+            if isinstance(answer, list):
+                answer = ", ".join(str(a) for a in answer)
+            cleaned = str(answer).strip() if answer else ""
+            if cleaned:
+                responses.append(f"Q: {question.format(w=topic)}\nA: {cleaned}")
                 self.memory.extract_unknown_words(cleaned)
 
         if responses:
             full_knowledge = "\n\n".join(responses)
-            self.memory.queue_learn(topic, full_knowledge)
-            self.memory.save_all()
-            return f"Here's what I learned about '{topic}':\n\n{full_knowledge}"
+            return f"Here's what I learned about '{topic}':\n\n{full_knowledge}", full_knowledge
         else:
-            return f"I couldn't learn much about '{topic}' right now."
+            return f"I couldn't learn much about '{topic}' right now.", ""
 
     def crawl_and_digest(self, url):
         crawler = WebCrawler()
@@ -293,16 +407,27 @@ class Reasoner:
         return None
 
     def _rag_retrieve(self, user_input, k=8):
-        """Phase 3: RAG retrieval (stub for now)"""
-        # TODO: Implement actual RAG service call
-        # For now, return None to force LLM usage when needed
-        self.logger.info(f"RAG retrieval for: {user_input} (k={k})")
-        return None  # Stub implementation
+        """Phase 3: Local retrieval over memories, crawls, facts and vocab"""
+        try:
+            ctx = self.retriever.retrieve(user_input, k=k)
+        except Exception as e:
+            self.logger.error(f"RAG retrieval failed: {e}")
+            return None
+        if ctx:
+            self.logger.info(json.dumps({
+                "event": "rag",
+                "k": k,
+                "hits": len(ctx["passages"]),
+                "confidence": ctx["confidence"],
+                "top": [[p["source"], p["id"], p["score"]] for p in ctx["passages"][:3]],
+            }))
+        return ctx
 
     def _synthesize_from_context(self, ctx, mem_hit, emotion):
-        """Phase 3: Synthesize answer from context"""
-        # TODO: Implement context synthesis
-        return "Synthesized from RAG context"
+        """Phase 3: Answer from the passages that cover the question best"""
+        passages = ctx.get("passages") or []
+        best = [p["text"] for p in passages if p["confidence"] >= ctx["confidence"]][:3]
+        return "\n".join(best) if best else "Synthesized from RAG context"
 
     def _guarded_llm_query(self, user_input, ctx):
         """Phase 4: LLM with permission check"""
@@ -320,7 +445,9 @@ class Reasoner:
     def _compose_llm_prompt(self, user_input, ctx):
         """Compose LLM prompt with context"""
         context_str = ""
-        if ctx:
+        if ctx and ctx.get("passages"):
+            context_str = "Context:\n" + "".join(f"- {p['snippet']}\n" for p in ctx["passages"])
+        elif ctx:
             context_str = f"Context: {ctx}\n"
 
         beliefs = self.memory.get_recent_beliefs()
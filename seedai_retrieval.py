@@ -0,0 +1,109 @@
+# seedai_retrieval.py
+
+"""Local retrieval over Aurelia's memory tables (memories, crawls, facts, vocab).
+
+`Retriever.retrieve(query, k)` gets the top-k candidates from the hybrid
+`MemoryManager.search` (FTS5 bm25() per source fused with vector similarity
+when embeddings are enabled) and returns them as passages with scores, the
+FTS5 snippet to pack into prompts, and a confidence value the reasoner uses
+to answer from memory instead of the LLM:
+
+    {"query": ..., "passages": [{"source", "id", "text", "snippet", "score", "coverage", ...}],
+     "confidence": 0.0-1.0, "confident": bool}
+
+Confidence is the share of the query's content words found in the best
+passage, or its cosine similarity to the query when that is higher. Fewer
+than AURELIA_RAG_MIN_TERMS matched words scale the word share down, so a
+chatty query with one content word ("how are you today" -> "today") is not
+answered from whatever row mentions it; a vocab row whose headword is the
+query's only content word still counts as a full match.
+
+Env: AURELIA_RAG_MIN_CONFIDENCE (0.8), AURELIA_RAG_MIN_TERMS (2),
+AURELIA_RAG_PASSAGE_CHARS (400), AURELIA_RAG_SNIPPET_TOKENS (24).
+"""
+
+from __future__ import annotations
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+MIN_CONFIDENCE = float(os.environ.get('AURELIA_RAG_MIN_CONFIDENCE', '0.8'))
+MIN_TERMS = int(os.environ.get('AURELIA_RAG_MIN_TERMS', '2'))
+PASSAGE_CHARS = int(os.environ.get('AURELIA_RAG_PASSAGE_CHARS', '400'))
+SNIPPET_TOKENS = int(os.environ.get('AURELIA_RAG_SNIPPET_TOKENS', '24'))
+SOURCES = ('memories', 'crawls', 'facts', 'vocab')
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset("""
+a an and are as at be but by can could did do does for from had has have how i if in is it its
+me my of on or please say tell that the their them then there these they this to was we were
+what when where which who whom why will with would you your about know remember mean means
+""".split())
+
+def content_words(text: str) -> List[str]:
+    words = [w.lower() for w in _WORD_RE.findall(text or '')]
+    return [w for w in dict.fromkeys(words) if w not in _STOPWORDS and len(w) > 1]
+
+
+def passage_text(source: str, row: Dict[str, Any]) -> str:
+    """Readable text of one row of `source`."""
+    if source == 'vocab':
+        text = f"{row.get('word')}: {row.get('definition') or ''}"
+        if row.get('examples'):
+            text += f" (e.g. {row['examples']})"
+    elif source == 'facts':
+        text = ' '.join(str(row.get(c) or '') for c in ('subject', 'predicate', 'object')).strip()
+    elif source == 'crawls':
+        title = row.get('title') or row.get('url') or ''
+        text = f"{title}: {row.get('content') or ''}" if title else (row.get('content') or '')
+    else:
+        text = row.get('content') or ''
+    text = ' '.join(text.split())
+    if len(text) > PASSAGE_CHARS:
+        text = text[:PASSAGE_CHARS - 3] + '...'
+    return text
+
+
+class Retriever:
+    """Top-k passage retrieval over a `MemoryManager`."""
+
+    def __init__(self, mm, semantic: bool = True, min_confidence: float = MIN_CONFIDENCE,
+                 sources: Tuple[str, ...] = SOURCES, min_terms: int = MIN_TERMS):
+        self.mm = mm
+        self.semantic = semantic
+        self.min_confidence = min_confidence
+        self.sources = sources
+        self.min_terms = max(1, min_terms)
+
+    def retrieve(self, query: str, k: int = 8) -> Optional[Dict[str, Any]]:
+        """Top-k passages for `query`, or None when nothing matches."""
+        terms = content_words(query)
+        if not terms:
+            return None
+        # stopwords would match nearly every row
+        hits = self.mm.search(' '.join(terms), sources=list(self.sources), k=k, semantic=self.semantic,
+                              snippet_tokens=SNIPPET_TOKENS, highlight=('', ''))
+        if not hits:
+            return None
+
+        passages = []
+        for h in hits:
+            # passages are compared across sources on query-word coverage
+            text = passage_text(h['source'], h['row'])
+            words = set(content_words(text))
+            matched = sum(1 for t in terms if t in words)
+            coverage = matched / len(terms)
+            headword = h['source'] == 'vocab' and terms == [str(h['row'].get('word') or '').lower()]
+            # one shared word is weak evidence unless it is the word being defined
+            lexical = coverage if headword else coverage * min(1.0, matched / self.min_terms)
+            sim = h['similarity']
+            confidence = lexical if sim is None else max(lexical, sim)
+            # vocab and facts rows are short; a one-column snippet would lose their meaning
+            snippet = h['snippet'] if h['source'] in ('memories', 'crawls') and h['snippet'] else text
+            passages.append({'source': h['source'], 'id': h['id'], 'text': text, 'snippet': snippet,
+                             'score': h['score'], 'coverage': round(coverage, 4), 'matched': matched, 'bm25': h['bm25'],
+                             'similarity': sim, 'confidence': round(confidence, 4)})
+        passages.sort(key=lambda p: (p['confidence'], p['score']), reverse=True)
+        confidence = passages[0]['confidence']
+        return {'query': query, 'passages': passages, 'confidence': confidence,
+                'confident': confidence >= self.min_confidence}